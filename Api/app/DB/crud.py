@@ -0,0 +1,263 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.DB import models
+from app.Utils.constants import LLM0_promptModel
+
+
+async def get_navigation_configurations(db: AsyncSession) -> Optional[models.NavigationLinksGlobalConfiguration]:
+    result = await db.execute(
+        select(models.NavigationLinksGlobalConfiguration)
+        .order_by(models.NavigationLinksGlobalConfiguration.id.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+async def get_all_global_configurations(db: AsyncSession) -> List[models.GlobalConfigurations]:
+    result = await db.execute(select(models.GlobalConfigurations).order_by(models.GlobalConfigurations.Id))
+    return list(result.scalars())
+
+
+async def get_all_screen_configurations(db: AsyncSession) -> List[models.ScreenConfiguration]:
+    result = await db.execute(select(models.ScreenConfiguration).order_by(models.ScreenConfiguration.Id))
+    return list(result.scalars())
+
+
+async def get_all_screen_default_schemas(db: AsyncSession) -> List[models.ScreenDefaultSchemas]:
+    result = await db.execute(select(models.ScreenDefaultSchemas).order_by(models.ScreenDefaultSchemas.Id))
+    return list(result.scalars())
+
+
+async def get_configuration_versions(db: AsyncSession) -> Tuple:
+    """max(UpdatedAt) and row count of every configuration table, in a single round-trip."""
+    tables = [
+        (models.NavigationLinksGlobalConfiguration, models.NavigationLinksGlobalConfiguration.id),
+        (models.GlobalConfigurations, models.GlobalConfigurations.Id),
+        (models.ScreenConfiguration, models.ScreenConfiguration.Id),
+        (models.ScreenDefaultSchemas, models.ScreenDefaultSchemas.Id),
+    ]
+    columns = []
+    for model, key in tables:
+        columns.append(select(func.max(model.UpdatedAt)).scalar_subquery())
+        columns.append(select(func.count(key)).scalar_subquery())
+    result = await db.execute(select(*columns))
+    return tuple(result.one())
+
+
+async def get_navigation_by_name(db: AsyncSession, name: str) -> Optional[models.NavigationLinks]:
+    result = await db.execute(
+        select(models.NavigationLinks)
+        .where(models.NavigationLinks.name == name, models.NavigationLinks.IsActive == True)
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+async def get_navigation_by_names(db: AsyncSession, names: Iterable[str]) -> Dict[str, models.NavigationLinks]:
+    """Resolves many navigation names with one IN query; the first active row per name wins."""
+    names = list(set(names))
+    if not names:
+        return {}
+    result = await db.execute(
+        select(models.NavigationLinks)
+        .where(models.NavigationLinks.name.in_(names), models.NavigationLinks.IsActive == True)
+        .order_by(models.NavigationLinks.Id)
+    )
+    links = {}
+    for link in result.scalars():
+        links.setdefault(link.name, link)
+    return links
+
+
+async def get_all_navigation_links(db: AsyncSession) -> List[models.NavigationLinks]:
+    result = await db.execute(
+        select(models.NavigationLinks).where(models.NavigationLinks.IsActive == True).order_by(models.NavigationLinks.Id)
+    )
+    return list(result.scalars())
+
+
+async def get_navigation_links_version(db: AsyncSession) -> Tuple[Optional[datetime], int]:
+    """Latest UpdatedAt and row count of NavigationLinks; changes whenever a link is edited, added or removed."""
+    result = await db.execute(
+        select(func.max(models.NavigationLinks.UpdatedAt), func.count(models.NavigationLinks.Id))
+    )
+    return tuple(result.one())
+
+
+async def get_promptname_by_id(db: AsyncSession, prompt_id: int) -> Optional[str]:
+    result = await db.execute(
+        select(models.PromptConfigurationsVersion.name).where(models.PromptConfigurationsVersion.Id == prompt_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_entity_search_system_prompt_by_id(db: AsyncSession, prompt_id: int, prompt_version: Optional[int] = None) -> Optional[models.PromptConfigurationsHistory]:
+    history = models.PromptConfigurationsHistory
+    version = models.PromptConfigurationsVersion
+    if prompt_version is None:
+        query = select(history).join(version, version.PromptHistoryId == history.Id).where(version.Id == prompt_id)
+    else:
+        query = select(history).join(version, version.name == history.name).where(
+            version.Id == prompt_id,
+            history.VersionNumber == prompt_version
+        )
+    result = await db.execute(query.limit(1))
+    return result.scalars().first()
+
+
+async def get_active_prompt_by_name(db: AsyncSession, name: str) -> Optional[models.PromptConfigurationsHistory]:
+    history = models.PromptConfigurationsHistory
+    version = models.PromptConfigurationsVersion
+    result = await db.execute(
+        select(history).join(version, version.PromptHistoryId == history.Id).where(version.name == name).limit(1)
+    )
+    return result.scalars().first()
+
+
+async def get_prompt_configurations(db: AsyncSession) -> Tuple[List[models.PromptConfigurationsVersion], List[models.PromptConfigurationsHistory]]:
+    """Every prompt (its PromptConfigurationsVersion row) and every published version of it."""
+    versions = await db.execute(select(models.PromptConfigurationsVersion))
+    history = await db.execute(select(models.PromptConfigurationsHistory))
+    return list(versions.scalars()), list(history.scalars())
+
+
+async def get_prompt_configurations_version(db: AsyncSession) -> Tuple:
+    """
+        max(UpdatedAt) and row count of PromptConfigurationsHistory, plus the
+        count and sum of the active PromptHistoryIds, in a single round-trip;
+        publishing or activating a version changes at least one of them.
+    """
+    history = models.PromptConfigurationsHistory
+    version = models.PromptConfigurationsVersion
+    result = await db.execute(select(
+        select(func.max(history.UpdatedAt)).scalar_subquery(),
+        select(func.count(history.Id)).scalar_subquery(),
+        select(func.count(version.Id)).scalar_subquery(),
+        select(func.sum(version.PromptHistoryId)).scalar_subquery(),
+    ))
+    return tuple(result.one())
+
+
+async def get_last_llm0_response(db: AsyncSession, conversationId: int) -> Optional[models.ConversationPrompt]:
+    result = await db.execute(
+        select(models.ConversationPrompt)
+        .join(models.PromptConfigurationsVersion, models.ConversationPrompt.PromptId == models.PromptConfigurationsVersion.Id)
+        .where(
+            models.ConversationPrompt.ConversationId == conversationId,
+            models.PromptConfigurationsVersion.name == LLM0_promptModel
+        )
+        .order_by(models.ConversationPrompt.Id.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+def process_all_prompts_and_screens(debug_request_body: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    """
+        Fills in the active configuration of every prompt not already pinned
+        by the debug request, in the shape read by get_prompt_config.
+    """
+    requested = {p.get("name"): p for p in debug_request_body.get("prompt", []) if isinstance(p, dict)}
+    prompts = []
+    for version in db.query(models.PromptConfigurationsVersion).all():
+        if version.name in requested:
+            prompts.append(requested[version.name])
+            continue
+        history = version.Version
+        prompts.append({
+            "name": version.name,
+            "id": version.Id,
+            "version": history.VersionNumber if history else None,
+            "model_deployment": history.model if history else None,
+        })
+    return {"prompt": prompts}
+
+
+async def get_chat_ids_by_session(db: AsyncSession, session_ids: Iterable[str]) -> Dict[str, int]:
+    """Chats.Id of each session that already has a chat, in one query."""
+    session_ids = list(session_ids)
+    if not session_ids:
+        return {}
+    result = await db.execute(
+        select(models.Chat.SessionId, models.Chat.Id).where(models.Chat.SessionId.in_(session_ids))
+    )
+    return {session_id: chat_id for session_id, chat_id in result.all()}
+
+
+async def insert_chats(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[int]:
+    """Inserts Chats rows with one multi-row INSERT, returning their ids in the order given."""
+    if not rows:
+        return []
+    result = await db.execute(insert(models.Chat).returning(models.Chat.Id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
+async def insert_conversation_records(db: AsyncSession, records) -> List[int]:
+    """
+        Inserts a batch of ConversationRecords: one multi-row INSERT for the
+        Conversations, whose generated ids are then set on the prompts,
+        analytics and errors, each inserted with a single executemany.
+    """
+    if not records:
+        return []
+    result = await db.execute(
+        insert(models.Conversation).returning(models.Conversation.Id, sort_by_parameter_order=True),
+        [record.conversation for record in records]
+    )
+    ids = list(result.scalars())
+    children = {models.ConversationPrompt: [], models.Analytics: [], models.ConversationError: []}
+    for conversation_id, record in zip(ids, records):
+        children[models.ConversationPrompt].extend({**row, "ConversationId": conversation_id} for row in record.prompts)
+        children[models.ConversationError].extend({**row, "ConversationId": conversation_id} for row in record.errors)
+        if record.analytics is not None:
+            children[models.Analytics].append({**record.analytics, "ConversationId": conversation_id})
+    for model, rows in children.items():
+        if rows:
+            await db.execute(insert(model), rows)
+    return ids
+
+
+async def get_active_token_prices(db: AsyncSession) -> List[models.TokenPrice]:
+    result = await db.execute(
+        select(models.TokenPrice).where(models.TokenPrice.Status == True).order_by(models.TokenPrice.StartDate)
+    )
+    return list(result.scalars())
+
+
+async def get_token_prices_version(db: AsyncSession) -> Tuple:
+    """max(UpdatedAt) and row count of TokenPrices and ClientRegionMapping, in a single round-trip."""
+    result = await db.execute(select(
+        select(func.max(models.TokenPrice.UpdatedAt)).scalar_subquery(),
+        select(func.count(models.TokenPrice.Id)).scalar_subquery(),
+        select(func.max(models.ClientRegionMapping.UpdatedAt)).scalar_subquery(),
+        select(func.count(models.ClientRegionMapping.Id)).scalar_subquery(),
+    ))
+    return tuple(result.one())
+
+
+async def get_client_regions(db: AsyncSession) -> Dict[str, str]:
+    result = await db.execute(select(models.ClientRegionMapping.ClientId, models.ClientRegionMapping.Region))
+    return {client_id: region for client_id, region in result.all()}
+
+
+async def get_active_questions(db: AsyncSession) -> List[models.Question]:
+    result = await db.execute(
+        select(models.Question).where(models.Question.Active == True).order_by(models.Question.RankOrder)  # noqa: E712
+    )
+    return list(result.scalars().all())
+
+
+async def get_questions_version(db: AsyncSession, prompt_name: str) -> Tuple:
+    """max(UpdatedAt) and row count of Questions, and the active VersionNumber of `prompt_name`, in a single round-trip."""
+    history = models.PromptConfigurationsHistory
+    version = models.PromptConfigurationsVersion
+    result = await db.execute(select(
+        select(func.max(models.Question.UpdatedAt)).scalar_subquery(),
+        select(func.count(models.Question.Id)).scalar_subquery(),
+        select(history.VersionNumber).join(version, version.PromptHistoryId == history.Id)
+        .where(version.name == prompt_name).limit(1).scalar_subquery(),
+    ))
+    return tuple(result.one())
@@ -0,0 +1,79 @@
+from time import perf_counter
+from sqlalchemy import BigInteger, create_engine, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from app.Utils.metrics import DB_QUERY_SECONDS
+from app.extractEnvVariables import DATABASE_URL, ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+
+# Async drivers for the sync URLs we deploy with
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mssql+pyodbc": "mssql+aioodbc",
+    "mssql": "mssql+aioodbc",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def pool_options(url: str) -> dict:
+    options = {"pool_pre_ping": True}
+    # In-memory SQLite uses a single-connection pool that takes no sizing options
+    if ":memory:" not in url:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+
+@compiles(BigInteger, "sqlite")
+def compile_sqlite_biginteger(type_, compiler, **kw):
+    # SQLite only autoincrements INTEGER PRIMARY KEY columns, so local databases need INTEGER ids
+    return "INTEGER"
+
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_database_url = ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+async_engine = create_async_engine(async_database_url, **pool_options(async_database_url))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
+
+
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = perf_counter()
+
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is not None:
+        # SELECT / INSERT / UPDATE / DELETE ...
+        DB_QUERY_SECONDS.labels(statement.lstrip()[:6].upper()).observe(perf_counter() - started)
+
+
+for _engine in (engine, async_engine.sync_engine):
+    event.listen(_engine, "before_cursor_execute", _query_started)
+    event.listen(_engine, "after_cursor_execute", _query_finished)
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
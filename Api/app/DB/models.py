@@ -23,6 +23,8 @@ class Chat(Base):
     CreatedAt = Column(DateTime, server_default=func.now())
     UpdatedAt = Column(DateTime, server_default=func.now(), onupdate=func.now())  
     DocumentAnalysis = Column(UnicodeText)                                               
+    # Session the chat belongs to, so every worker maps a session to the same row
+    SessionId = Column(String(100), nullable=True)
 
     # Completions = relationship("Completion", back_populates="Chat")
     Conversation = relationship("Conversation", back_populates="Chat")
@@ -30,6 +32,9 @@ class Chat(Base):
     ClientRegionMapping = relationship("ClientRegionMapping", back_populates="Chat")    
 
     Index("idx_chat_customer_platform", CustomerId,Platform)
+    # Unique among chats that have a session; older rows without one are left alone
+    Index("idx_chat_session", SessionId, unique=True, mssql_where=SessionId.isnot(None),
+          sqlite_where=SessionId.isnot(None), postgresql_where=SessionId.isnot(None))
 
     @hybrid_property
     def region(self):
@@ -4,8 +4,25 @@ from pydantic import BaseModel
 class ChatRequest(BaseModel):
     session_id: str | None = None
     user_message: str
+    client_id: str | None = None
+    # Scope of the suggested Questions this request may be answered from
+    platform: str | None = None
+    user_role: str | None = None
 
 
 class ChatResponse(BaseModel):
     session_id: str
     reply: str
+    from_cache: bool = False
+
+
+class ChatPrefetchResponse(BaseModel):
+    session_id: str
+    # scheduled | ready | cached | too_short | capped | disabled
+    status: str
+
+
+class ChatCreate(BaseModel):
+    session_id: str | None = None
+    user_message: str
+    debugRequestBody: dict | None = None
@@ -0,0 +1,16 @@
+from typing import Optional
+from fastapi import APIRouter, Query
+from app.Service.conversationWriter import conversation_writer
+from app.Service.costAccounting import cost_accounting
+
+analyticsRouter = APIRouter(prefix="/analytics")
+
+@analyticsRouter.get("/spend")
+async def get_client_spend(window_seconds: Optional[int] = Query(None, gt=0)):
+    # Rolling per-client LLM cost of the turns persisted by this worker
+    return {
+        "window_seconds": min(window_seconds or cost_accounting.spend.window_seconds, cost_accounting.spend.window_seconds),
+        "spend": cost_accounting.spend.totals(window_seconds),
+        "pricing": {**cost_accounting.stats, "prices": len(cost_accounting.prices)},
+        "writer": {**conversation_writer.stats, "pending": conversation_writer.pending()},
+    }
@@ -1,11 +1,55 @@
 import uuid
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
 from app.DB import schemas
-from app.Service.chatService import chat_with_bot_service
+from app.Service.chatService import chat_with_bot_service, chat_stream_service, chat_prefetch_service
+from app.Utils.utils import stream_processor_text, stream_processor_json
+from app.Utils.metrics import CHAT_REQUEST_SECONDS
 
 chatRouter = APIRouter()
 
+SSE_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+chat_seconds = CHAT_REQUEST_SECONDS.labels("/chat")
+chat_stream_seconds = CHAT_REQUEST_SECONDS.labels("/chat/stream")
+
+
+async def timed_stream(body):
+    # Stream latency runs until the last chunk has been handed to the server
+    with chat_stream_seconds.time():
+        async for chunk in body:
+            yield chunk
+
 @chatRouter.post("/chat", response_model=schemas.ChatResponse)
-async def chat_with_bot(request: schemas.ChatRequest):
-    print("inside /chat endpoint ", request)    
-    return chat_with_bot_service(request)
\ No newline at end of file
+async def chat_with_bot(request: schemas.ChatRequest, http_request: Request):
+    with chat_seconds.time():
+        return await chat_with_bot_service(request, http_request)
+
+@chatRouter.post("/chat/prefetch", response_model=schemas.ChatPrefetchResponse)
+async def chat_prefetch(request: schemas.ChatRequest):
+    # Called by the widget, debounced, with the text typed so far
+    return await chat_prefetch_service(request)
+
+@chatRouter.post("/chat/stream")
+async def chat_with_bot_stream(
+    request: schemas.ChatRequest,
+    http_request: Request,
+    format: Optional[str] = Query(None, pattern="^(sse|ndjson)$")
+):
+    # Explicit ?format= wins, otherwise negotiate on the Accept header (SSE by default)
+    if format is None:
+        format = "ndjson" if NDJSON_MEDIA_TYPE in http_request.headers.get("accept", "") else "sse"
+
+    session_id, chunks = chat_stream_service(request)
+    if format == "ndjson":
+        body, media_type = stream_processor_json(chunks, session_id), NDJSON_MEDIA_TYPE
+    else:
+        body, media_type = stream_processor_text(chunks, session_id), SSE_MEDIA_TYPE
+
+    return StreamingResponse(
+        timed_stream(body),
+        media_type=media_type,
+        headers={"X-Session-Id": session_id, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
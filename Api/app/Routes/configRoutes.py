@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.Utils.adminAuth import require_admin_key
+from app.Service.configSnapshot import config_snapshot
+from app.Service.navigationCache import navigation_cache
+from app.Service.promptRegistry import prompt_registry
+from app.Service.questionWarmer import question_warmer
+
+configRouter = APIRouter(prefix="/config")
+
+@configRouter.get("/snapshot")
+async def get_config_snapshot_metrics():
+    return {"snapshot": config_snapshot.metrics(), "navigation_links": navigation_cache.stats}
+
+@configRouter.post("/invalidate", dependencies=[Depends(require_admin_key)])
+async def invalidate_config_snapshot():
+    # Reload immediately instead of waiting for the next UpdatedAt check
+    navigation_cache.invalidate()
+    try:
+        await config_snapshot.invalidate()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Configuration reload failed: {e}")
+    return {"snapshot": config_snapshot.metrics()}
+
+@configRouter.get("/prompts")
+async def get_prompt_registry_metrics():
+    return prompt_registry.metrics()
+
+@configRouter.post("/prompts/reload", dependencies=[Depends(require_admin_key)])
+async def reload_prompt_registry():
+    # Pick up a newly published prompt version now instead of at the next check
+    try:
+        await prompt_registry.refresh(force=True)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Prompt reload failed: {e}")
+    return prompt_registry.metrics()
+
+@configRouter.get("/questions/warming")
+async def get_question_warming_metrics():
+    return question_warmer.metrics()
+
+@configRouter.post("/questions/warm", dependencies=[Depends(require_admin_key)])
+async def warm_questions():
+    # Reload the Questions catalog and answer whatever is missing or stale now
+    try:
+        await question_warmer.refresh(force=True)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Question warming failed: {e}")
+    return question_warmer.metrics()
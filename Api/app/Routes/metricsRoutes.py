@@ -0,0 +1,90 @@
+import time
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.Service.llmClient import llm_semaphore
+from app.Service.llmRouter import llm_router
+from app.Service.singleFlight import llm_single_flight
+from app.Service.chatPrefetch import chat_prefetcher
+from app.Service.questionWarmer import question_warmer
+from app.Service.responseCache import response_cache
+from app.Service.navigationCache import navigation_cache
+from app.Service.configSnapshot import config_snapshot
+from app.Service.promptRegistry import prompt_registry
+from app.Service.conversationWriter import conversation_writer
+from app.Service.debugTraceStore import debug_trace_store
+from app.Service.costAccounting import cost_accounting
+from app.Utils import logConfig
+from app.Utils.metrics import REGISTRY, CallbackMetric
+
+metricsRouter = APIRouter()
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _stats(stats: dict, keys) -> dict:
+    return {(key,): stats[key] for key in keys}
+
+
+# Read from the services' own stats at scrape time
+CallbackMetric("chatbot_response_cache_events_total", "Response cache lookups, hits, writes and embedding calls",
+               lambda: _stats(response_cache.stats, ("lookups", "exact_hits", "semantic_hits", "writes", "embeddings")),
+               ["event"], type="counter")
+CallbackMetric("chatbot_response_cache_hit_ratio", "Share of response cache lookups served from the cache",
+               response_cache.hit_rate)
+CallbackMetric("chatbot_navigation_cache_events_total", "Navigation cache hits, misses and reloads",
+               lambda: _stats(navigation_cache.stats, ("hits", "misses", "reloads")), ["event"], type="counter")
+CallbackMetric("chatbot_config_snapshot_events_total", "Config snapshot hits, loads and refresh errors",
+               lambda: _stats(config_snapshot.stats, ("hits", "loads", "refresh_errors")), ["event"], type="counter")
+CallbackMetric("chatbot_prompt_registry_events_total", "Prompt registry lookups found or missed, loads and refresh errors",
+               lambda: _stats(prompt_registry.stats, ("hits", "misses", "loads", "refresh_errors")), ["event"], type="counter")
+CallbackMetric("chatbot_prompt_active_version", "Active VersionNumber of every prompt in the registry",
+               lambda: {(name,): entry.version or 0 for name, entry in prompt_registry.current().by_name.items()}, ["prompt"])
+CallbackMetric("chatbot_conversation_queue_depth", "Conversation records waiting to be written",
+               conversation_writer.pending)
+CallbackMetric("chatbot_conversation_records_total", "Conversation records by outcome",
+               lambda: _stats(conversation_writer.stats, ("submitted", "written", "failed", "dropped")),
+               ["outcome"], type="counter")
+CallbackMetric("chatbot_debug_trace_queue_depth", "Debug trace lines waiting to be written",
+               debug_trace_store.pending)
+CallbackMetric("chatbot_debug_trace_dropped_total", "Debug trace lines dropped because the queue was full",
+               lambda: debug_trace_store.stats["dropped"], type="counter")
+CallbackMetric("chatbot_llm_in_flight", "LLM calls currently holding a concurrency slot",
+               llm_semaphore.in_flight)
+CallbackMetric("chatbot_question_answers", "Active questions with a warm answer for the current prompt version, or not",
+               lambda: {(state,): question_warmer.metrics()[state] for state in ("warm", "stale")}, ["state"])
+CallbackMetric("chatbot_question_warming_progress_ratio", "Share of active questions with a warm answer",
+               lambda: question_warmer.metrics()["progress"])
+CallbackMetric("chatbot_question_warming_pending", "Question answers being computed by the running warm-up",
+               lambda: question_warmer.metrics()["pending"])
+CallbackMetric("chatbot_question_answer_oldest_seconds", "Age of the oldest warm answer being served",
+               lambda: question_warmer.metrics()["oldest_answer_seconds"])
+CallbackMetric("chatbot_question_warming_events_total", "Warm answers served, computed and failed",
+               lambda: _stats(question_warmer.stats, ("hits", "warmed", "failed")), ["event"], type="counter")
+CallbackMetric("chatbot_llm_single_flight_total", "LLM calls that went upstream or joined an identical call in flight",
+               lambda: _stats(llm_single_flight.stats, ("calls", "coalesced")), ["outcome"], type="counter")
+CallbackMetric("chatbot_chat_prefetch_total", "Speculative replies by outcome",
+               lambda: _stats(chat_prefetcher.stats, ("requested", "debounced", "started", "superseded", "capped",
+                                                      "hits", "misses", "expired", "failed")), ["outcome"], type="counter")
+CallbackMetric("chatbot_chat_prefetch_hit_ratio", "Share of turns with a prefetch that were answered from it",
+               chat_prefetcher.hit_rate)
+CallbackMetric("chatbot_chat_prefetch_tokens_total", "Tokens used by prefetch calls, in total and for replies never used",
+               lambda: {("used",): chat_prefetcher.stats["tokens"], ("wasted",): chat_prefetcher.stats["wasted_tokens"]},
+               ["kind"], type="counter")
+CallbackMetric("chatbot_chat_prefetch_saved_seconds_total", "LLM time already done by a prefetch when its turn arrived",
+               lambda: chat_prefetcher.stats["saved_seconds"], type="counter")
+CallbackMetric("chatbot_llm_deployment_in_flight", "LLM calls in flight per routed deployment",
+               lambda: {(d.name,): d.in_flight for d in llm_router.deployments()}, ["deployment"])
+CallbackMetric("chatbot_llm_deployment_circuit_open", "1 while a deployment's circuit breaker is open",
+               lambda: {(d.name,): d.circuit == "open" for d in llm_router.deployments()}, ["deployment"])
+CallbackMetric("chatbot_llm_deployment_quota_remaining_ratio", "Rate-limit quota left per deployment, from response headers",
+               lambda: {(d.name,): d.quota_fraction(time.monotonic()) for d in llm_router.deployments()}, ["deployment"])
+CallbackMetric("chatbot_llm_prompts_priced_total", "LLM prompts priced or left unpriced by cost accounting",
+               lambda: _stats(cost_accounting.stats, ("priced", "unpriced")), ["outcome"], type="counter")
+
+CallbackMetric("chatbot_log_records_dropped_total", "Log records dropped because the logging queue was full",
+               lambda: logConfig.queue_handler.dropped if logConfig.queue_handler else 0, type="counter")
+
+
+@metricsRouter.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_MEDIA_TYPE)
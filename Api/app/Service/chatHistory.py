@@ -0,0 +1,193 @@
+import sys
+import zlib
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.Service.contextWindow import count_message_tokens, REPLY_PRIMING_TOKENS
+from app.extractEnvVariables import SESSION_HOT_TOKENS, SESSION_COLD_BLOCK_MESSAGES
+
+Message = Dict[str, str]
+
+# Stored as one byte per message; materialized messages share these string objects
+ROLES = ("system", "user", "assistant", "tool", "developer")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+_EXTRA = 255  # anything but a plain {"role", "content": str} message is kept as a dict
+
+
+class ChatHistory:
+    """
+        Append-only message log of one session in parallel arrays: a role
+        code and a token count per message, plus the content strings. Once
+        the newest `hot_tokens` tokens no longer reach a block of
+        `block_size` old messages, that block's contents are joined and
+        zlib-compressed; they are only decompressed when read again (a long
+        session that no longer fits the context window, or a summary).
+    """
+    __slots__ = ("_roles", "_tokens", "_blocks", "_hot", "_hot_tokens", "_extras", "hot_tokens", "block_size")
+
+    def __init__(self, messages: Iterable[Message] = (), hot_tokens: int = SESSION_HOT_TOKENS,
+                 block_size: int = SESSION_COLD_BLOCK_MESSAGES):
+        self.hot_tokens = hot_tokens
+        self.block_size = max(1, block_size)
+        self._roles = bytearray()
+        self._tokens = array("I")
+        # Compressed blocks, oldest first: (zlib data, character length of each content)
+        self._blocks: List[Tuple[bytes, array]] = []
+        self._hot: List[Optional[str]] = []
+        self._hot_tokens = 0
+        self._extras: Optional[Dict[int, Message]] = None
+        self.extend(messages)
+
+    def __len__(self):
+        return len(self._roles)
+
+    @property
+    def cold_count(self) -> int:
+        return len(self._blocks) * self.block_size
+
+    def append(self, message: Message):
+        role, content = message.get("role"), message.get("content")
+        code = _ROLE_CODES.get(role, _EXTRA)
+        if code == _EXTRA or len(message) != 2 or not isinstance(content, str):
+            if self._extras is None:
+                self._extras = {}
+            self._extras[len(self._roles)] = dict(message)
+            code, content = _EXTRA, None
+        tokens = count_message_tokens(message)
+        self._roles.append(code)
+        self._tokens.append(tokens)
+        self._hot.append(content)
+        self._hot_tokens += tokens
+        self._compress_cold()
+
+    def extend(self, messages: Iterable[Message]):
+        for message in messages:
+            self.append(message)
+
+    def _compress_cold(self):
+        while len(self._hot) > self.block_size:
+            start = self.cold_count
+            block_tokens = sum(self._tokens[start:start + self.block_size])
+            # Only blocks entirely older than the newest `hot_tokens` tokens
+            if self._hot_tokens - block_tokens < self.hot_tokens:
+                return
+            contents = [c or "" for c in self._hot[:self.block_size]]
+            lengths = array("I", (len(c) for c in contents))
+            self._blocks.append((zlib.compress("".join(contents).encode("utf-8")), lengths))
+            del self._hot[:self.block_size]
+            self._hot_tokens -= block_tokens
+
+    def _block_contents(self, index: int) -> List[str]:
+        data, lengths = self._blocks[index]
+        text = zlib.decompress(data).decode("utf-8")
+        contents, offset = [], 0
+        for length in lengths:
+            contents.append(text[offset:offset + length])
+            offset += length
+        return contents
+
+    def view(self) -> "HistoryView":
+        return HistoryView(self, 0, len(self))
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the stored messages (arrays, content strings and compressed blocks)."""
+        size = sys.getsizeof(self._roles) + sys.getsizeof(self._tokens) + sys.getsizeof(self._hot) + sys.getsizeof(self._blocks)
+        size += sum(sys.getsizeof(c) for c in self._hot if c is not None)
+        size += sum(sys.getsizeof(block) + sys.getsizeof(block[0]) + sys.getsizeof(block[1]) for block in self._blocks)
+        if self._extras:
+            size += sys.getsizeof(self._extras) + sum(sys.getsizeof(m) for m in self._extras.values())
+        return size
+
+
+class HistoryView(Sequence):
+    """
+        Read-only snapshot of a ChatHistory (plus messages added with `+`)
+        that builds the OpenAI {"role", "content"} dicts only for the
+        messages actually read, so trimming a long history to the context
+        window doesn't copy or decompress the part that is dropped. Slices
+        and concatenation return views; `list(view)` gives the final messages.
+    """
+    __slots__ = ("_history", "_start", "_stop", "_tail", "_block")
+
+    def __init__(self, history: ChatHistory, start: int, stop: int, tail: Tuple[Message, ...] = ()):
+        self._history = history
+        self._start = start
+        self._stop = stop
+        self._tail = tail
+        self._block: Optional[Tuple[int, List[str]]] = None  # last decompressed block, for sequential reads
+
+    def __len__(self):
+        return self._stop - self._start + len(self._tail)
+
+    def _message(self, index: int) -> Message:
+        history = self._history
+        code = history._roles[index]
+        if code == _EXTRA:
+            return dict(history._extras[index])
+        cold = history.cold_count
+        if index >= cold:
+            content = history._hot[index - cold]
+        else:
+            block = index // history.block_size
+            if self._block is None or self._block[0] != block:
+                self._block = (block, history._block_contents(block))
+            content = self._block[1][index % history.block_size]
+        return {"role": ROLES[code], "content": content}
+
+    def __getitem__(self, index):
+        stored = self._stop - self._start
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            stop = max(start, stop)
+            return HistoryView(
+                self._history, self._start + min(start, stored), self._start + min(stop, stored),
+                self._tail[max(start - stored, 0):max(stop - stored, 0)]
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if index >= stored:
+            return self._tail[index - stored]
+        return self._message(self._start + index)
+
+    def _messages(self, indexes: range):
+        # Hot messages are built inline; this is what trimming to the context window walks every turn
+        history = self._history
+        roles, hot, cold, extras = history._roles, history._hot, history.cold_count, history._extras
+        for index in indexes:
+            code = roles[index]
+            if code == _EXTRA:
+                yield dict(extras[index])
+            elif index >= cold:
+                yield {"role": ROLES[code], "content": hot[index - cold]}
+            else:
+                yield self._message(index)
+
+    def __iter__(self):
+        yield from self._messages(range(self._start, self._stop))
+        yield from self._tail
+
+    def __reversed__(self):
+        yield from reversed(self._tail)
+        yield from self._messages(range(self._stop - 1, self._start - 1, -1))
+
+    def __add__(self, other):
+        if not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return HistoryView(self._history, self._start, self._stop, self._tail + tuple(other))
+
+    def __radd__(self, other):
+        if not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return list(other) + list(self)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def prompt_tokens(self) -> int:
+        """count_prompt_tokens of these messages from the stored per-message counts, without reading them."""
+        return (REPLY_PRIMING_TOKENS + sum(self._history._tokens[self._start:self._stop])
+                + sum(count_message_tokens(m) for m in self._tail))
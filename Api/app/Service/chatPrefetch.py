@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Set
+from app.Utils.lruCache import LRUTTLCache
+from app.extractEnvVariables import (
+    PREFETCH_ENABLED, PREFETCH_DEBOUNCE_SECONDS, PREFETCH_TTL_SECONDS, PREFETCH_MAX_CALLS_PER_SESSION,
+    PREFETCH_MAX_TOKENS_PER_SESSION, PREFETCH_MAX_CALLS_PER_CLIENT, PREFETCH_MAX_TOKENS_PER_CLIENT,
+    PREFETCH_BUDGET_WINDOW, PREFETCH_MAX_IN_FLIGHT
+)
+
+
+class Prefetch:
+    __slots__ = ("key", "task", "launched", "started", "elapsed", "tokens")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.task: Optional[asyncio.Task] = None
+        self.launched = False  # past the debounce, the LLM call has started
+        self.started = 0.0
+        self.elapsed: Optional[float] = None
+        self.tokens = 0
+
+    def succeeded(self) -> bool:
+        return self.task.done() and not self.task.cancelled() and self.task.exception() is None
+
+
+class ChatPrefetcher:
+    """
+        Speculative replies, at most one per session. `schedule` waits
+        `debounce` seconds and then runs the reply factory, replacing (and
+        cancelling) whatever the session had scheduled before, so only the
+        input the user paused on reaches the LLM. `take` hands the /chat
+        request the prefetch when its key (model, prompt version, messages,
+        parameters) is exactly the one the turn computed, and cancels it
+        otherwise. Each session may start `max_calls` prefetch calls using
+        `max_tokens` tokens per budget window, each client `max_client_calls`
+        and `max_client_tokens` across its sessions, and at most
+        `max_in_flight` prefetches run at once over all clients; past any
+        of these, prefetch is skipped.
+    """
+
+    def __init__(self, enabled: bool = PREFETCH_ENABLED, debounce: float = PREFETCH_DEBOUNCE_SECONDS,
+                 ttl_seconds: float = PREFETCH_TTL_SECONDS, max_calls: int = PREFETCH_MAX_CALLS_PER_SESSION,
+                 max_tokens: int = PREFETCH_MAX_TOKENS_PER_SESSION, max_client_calls: int = PREFETCH_MAX_CALLS_PER_CLIENT,
+                 max_client_tokens: int = PREFETCH_MAX_TOKENS_PER_CLIENT, budget_window: float = PREFETCH_BUDGET_WINDOW,
+                 max_in_flight: int = PREFETCH_MAX_IN_FLIGHT, max_sessions: int = 10000):
+        self.enabled = enabled
+        self.debounce = debounce
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.max_client_calls = max_client_calls
+        self.max_client_tokens = max_client_tokens
+        self.max_in_flight = max_in_flight
+        self._prefetches = LRUTTLCache(max_sessions, ttl_seconds, on_evict=lambda _, p: self._discard(p, "expired"))
+        # session id / client id -> [calls started, tokens used] within the budget window
+        self._budgets = LRUTTLCache(max_sessions, budget_window)
+        self._client_budgets = LRUTTLCache(max_sessions, budget_window)
+        # Prefetches debouncing or calling the LLM, over all sessions
+        self._running: Set[Prefetch] = set()
+        self.stats = {"requested": 0, "debounced": 0, "started": 0, "superseded": 0, "capped": 0, "hits": 0,
+                      "misses": 0, "expired": 0, "failed": 0, "tokens": 0, "wasted_tokens": 0, "saved_seconds": 0.0}
+
+    @staticmethod
+    def _budget(budgets: LRUTTLCache, owner: str) -> List[int]:
+        budget = budgets.get(owner)
+        if budget is None:
+            budget = [0, 0]
+            budgets.set(owner, budget)
+        return budget
+
+    def _discard(self, prefetch: Prefetch, reason: str):
+        # Cancelled during the debounce it cost nothing; afterwards its tokens (when known) were spent for nothing
+        if not prefetch.launched:
+            self.stats["debounced"] += 1
+        else:
+            self.stats[reason] += 1
+            if prefetch.succeeded():
+                self.stats["wasted_tokens"] += prefetch.tokens
+        self._running.discard(prefetch)
+        prefetch.task.cancel()
+
+    def schedule(self, session_id: str, key: str, factory: Callable[[], Awaitable], client_id: Optional[str] = None) -> str:
+        """
+            `factory()` returns (reply, usage). Returns "scheduled", or why nothing
+            was: "disabled", "capped" or "ready" (this exact input is already prefetched).
+        """
+        if not self.enabled:
+            return "disabled"
+        self.stats["requested"] += 1
+        previous = self._prefetches.get(session_id)
+        if previous is not None:
+            if previous.key == key and not (previous.task.done() and not previous.succeeded()):
+                return "ready"
+            self._prefetches.pop(session_id)
+            self._discard(previous, "superseded")
+        # Session ids are chosen by the caller, so the client's budget bounds it across sessions
+        budgets = [(self._budget(self._budgets, session_id), self.max_calls, self.max_tokens)]
+        if client_id:
+            budgets.append((self._budget(self._client_budgets, client_id), self.max_client_calls, self.max_client_tokens))
+        if len(self._running) >= self.max_in_flight or any(b[0] >= calls or b[1] >= tokens for b, calls, tokens in budgets):
+            self.stats["capped"] += 1
+            return "capped"
+        prefetch = Prefetch(key)
+        prefetch.task = asyncio.create_task(self._run(prefetch, [b for b, _, _ in budgets], factory))
+        self._running.add(prefetch)
+        prefetch.task.add_done_callback(lambda _: self._finished(prefetch))
+        self._prefetches.set(session_id, prefetch)
+        return "scheduled"
+
+    def _finished(self, prefetch: Prefetch):
+        self._running.discard(prefetch)
+        # Failures are counted in _run; nobody may await a prefetch that is never taken
+        if not prefetch.task.cancelled():
+            prefetch.task.exception()
+
+    async def _run(self, prefetch: Prefetch, budgets: List[List[int]], factory: Callable[[], Awaitable]):
+        # Keystrokes arriving within the debounce replace this prefetch before it costs anything
+        await asyncio.sleep(self.debounce)
+        prefetch.launched = True
+        prefetch.started = time.perf_counter()
+        for budget in budgets:
+            budget[0] += 1
+        self.stats["started"] += 1
+        try:
+            reply, usage = await factory()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            logging.warning(f"Chat prefetch failed: {e}")
+            raise
+        prefetch.elapsed = time.perf_counter() - prefetch.started
+        prefetch.tokens = usage.total_tokens if usage is not None else 0
+        for budget in budgets:
+            budget[1] += prefetch.tokens
+        self.stats["tokens"] += prefetch.tokens
+        return reply, usage
+
+    def take(self, session_id: str, key: str) -> Optional[Prefetch]:
+        """
+            The session's prefetch if it was made for exactly this turn; any other
+            prefetch is cancelled, and one past its time to live counts as expired.
+            Await its `task` for (reply, usage).
+        """
+        prefetch = self._prefetches.pop(session_id)
+        if prefetch is None:
+            return None
+        # Still debouncing: the turn's own call starts sooner than waiting it out
+        usable = prefetch.launched and prefetch.key == key and not prefetch.task.cancelled()
+        if usable and prefetch.task.done() and prefetch.task.exception() is not None:
+            usable = False
+        if not usable:
+            self._discard(prefetch, "misses")
+            return None
+        self.stats["hits"] += 1
+        self.stats["saved_seconds"] += prefetch.elapsed if prefetch.elapsed is not None else time.perf_counter() - prefetch.started
+        return prefetch
+
+    def hit_rate(self) -> float:
+        taken = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / taken if taken else 0.0
+
+    def pending(self) -> int:
+        return len(self._prefetches)
+
+
+chat_prefetcher = ChatPrefetcher()
@@ -1,42 +1,298 @@
-from typing import Dict, List
+from typing import AsyncIterator, Optional, Tuple
+import logging
+import time
 import uuid
-from fastapi import HTTPException
+from datetime import datetime
+from fastapi import HTTPException, Request
 from app.DB import schemas
-from app.extractEnvVariables import api_key
-from openai import OpenAI
+from app.extractEnvVariables import CHAT_PROMPT_NAME, CHAT_MODEL, CHAT_PARAMS, PIPELINE_STAGE_TIMEOUTS, PREFETCH_MIN_CHARS
+from app.Service.llmClient import create_chat_completion, run_until_disconnected, stream_chat_completion
+from app.Service.sessionStore import create_session_store
+from app.Service.contextWindow import create_context_strategy, get_token_budget, count_prompt_tokens, count_text_tokens
+from app.Service.conversationWriter import conversation_writer, conversation_record
+from app.Service.responseCache import CachePolicy, response_cache
+from app.Service.questionWarmer import question_warmer
+from app.Service.stageGraph import Stage, StageGraph, StageFailed
+from app.Service.chatPrefetch import chat_prefetcher
+from app.Service.singleFlight import flight_key
+from app.Utils.logConfig import bind_log_context, log_payload
+from openai.types.chat import ChatCompletionChunk
 
-print(f"API Key: {api_key}")  # Debug print to check if the API key is loaded correctly
-aiClient = OpenAI(api_key= api_key)
+session_store = create_session_store()
+context_strategy = create_context_strategy()
 
-chat_sessions: Dict[str, List[Dict[str, str]]] = {}
+async def store_turn(session_id: str, history, messages, bot_reply: str):
+    # A strategy that folded old turns into a new summary replaces the stored history
+    assistant_turn = {"role": "assistant", "content": bot_reply}
+    if context_strategy.rewrites_history(history, messages):
+        await session_store.replace(session_id, messages + [assistant_turn])
+    else:
+        await session_store.append(session_id, [messages[-1], assistant_turn])
 
-def chat_with_bot_service(request: schemas.ChatRequest):
+def chat_prompt(messages, reply: str, started_at: datetime, ended_at: datetime, policy: CachePolicy, from_cache: bool = False, usage=None):
+    # ConversationPrompt columns of the chat LLM call; counted locally when the API reports no usage
+    if from_cache:
+        prompt_tokens, completion_tokens = 0, 0
+    elif usage is not None:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+    else:
+        prompt_tokens, completion_tokens = count_prompt_tokens(messages), count_text_tokens(reply or "")
+    return {
+        "PromptId": policy.prompt_id,
+        "PromptVersion": policy.prompt_version,
+        "RequestPromptParameters": {"model": CHAT_MODEL, **CHAT_PARAMS},
+        "Response": reply,
+        "FromCache": from_cache,
+        "PromptTokens": prompt_tokens,
+        "CompletionTokens": completion_tokens,
+        "StartTime": started_at,
+        "EndTime": ended_at,
+    }
+
+def turn_record(request: schemas.ChatRequest, session_id: str, prompts, started_at: datetime, ended_at: datetime, **kwargs):
+    return conversation_record(
+        request.user_message, prompts, started_at, ended_at, client_id=request.client_id, session_id=session_id,
+        platform=request.platform, user_role=request.user_role, **kwargs
+    )
+
+def cached_chunk(reply: str, chunk_id: str = "cache") -> ChatCompletionChunk:
+    # A cache hit (or finished prefetch) is replayed to stream consumers as one complete chunk
+    return ChatCompletionChunk.model_validate({
+        "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": CHAT_MODEL,
+        "choices": [{"index": 0, "delta": {"role": "assistant", "content": reply}, "finish_reason": "stop"}]
+    })
+
+# Stages of a chat turn; policy doesn't depend on the session, so it overlaps loading the history
+async def load_history(session_id: str):
+    return await session_store.get(session_id)
+
+async def fit_messages(history, user_turn):
+    # Keep the prompt within the model's token budget; only the messages kept are built into dicts
+    return list(await context_strategy.fit(history + [user_turn], get_token_budget(CHAT_MODEL)))
+
+async def load_cache_policy():
+    return await response_cache.get_policy(CHAT_PROMPT_NAME)
+
+async def find_cached_reply(request: schemas.ChatRequest, history, messages, policy):
+    # A suggested question opening a session may have a precomputed answer
+    if not history:
+        logging.debug("Starting a new session")
+        cached = question_warmer.lookup(request.user_message, request.platform, request.user_role)
+        if cached is not None:
+            return cached
+    return await response_cache.lookup(policy, CHAT_MODEL, messages, CHAT_PARAMS)
+
+async def peek_cached_reply(request: schemas.ChatRequest, history, messages, policy):
+    # Prefetch runs per keystroke: exact lookups only, with no embeddings call and no hit counted
+    if not history:
+        cached = question_warmer.peek(request.user_message, request.platform, request.user_role)
+        if cached is not None:
+            return cached
+    return response_cache.peek(policy, CHAT_MODEL, messages, CHAT_PARAMS)
+
+def reply_key(messages, policy: CachePolicy) -> str:
+    # Everything the reply depends on; a prefetch is only reused for exactly the same call
+    return flight_key(CHAT_MODEL, policy.prompt_version, messages, CHAT_PARAMS)
+
+async def call_chat_llm(messages, policy: CachePolicy, stage: str = "Chat", store: bool = True):
+    started = time.perf_counter()
+    response = await create_chat_completion(
+        stage=stage, prompt_version=policy.prompt_version, model=CHAT_MODEL, messages=messages, **CHAT_PARAMS
+    )
+    log_payload("LLM response", response)
+    bot_reply = response.choices[0].message.content
+    if store:
+        await response_cache.store(policy, CHAT_MODEL, messages, CHAT_PARAMS, bot_reply, time.perf_counter() - started)
+    return bot_reply, response.usage
+
+async def take_prefetched_reply(session_id: str, http_request: Optional[Request], messages, policy: CachePolicy):
+    """The reply prefetched for exactly this turn, or None; a prefetch for other input is cancelled."""
+    prefetch = chat_prefetcher.take(session_id, reply_key(messages, policy))
+    if prefetch is None:
+        return None
+    try:
+        bot_reply, usage = await run_until_disconnected(http_request, prefetch.task)
+    except HTTPException as e:
+        if e.status_code == 499:
+            raise
+        logging.warning(f"Prefetched reply failed, calling the LLM again: {e.detail}")
+        return None
+    except Exception as e:
+        logging.warning(f"Prefetched reply failed, calling the LLM again: {e}")
+        return None
+    # Cached only once a turn uses it, so replies to input the user never submitted stay out of the cache
+    await response_cache.store(policy, CHAT_MODEL, messages, CHAT_PARAMS, bot_reply, prefetch.elapsed or 0.0)
+    return bot_reply, usage
+
+async def generate_reply(session_id: str, http_request: Optional[Request], messages, policy, cached):
+    if cached is not None:
+        return cached.reply, None
+    prefetched = await take_prefetched_reply(session_id, http_request, messages, policy)
+    if prefetched is not None:
+        return prefetched
+    # Call OpenAI with the trimmed history; the event loop stays free while we wait
+    return await run_until_disconnected(http_request, call_chat_llm(messages, policy))
+
+def stage(name: str, run, inputs=(), **kwargs) -> Stage:
+    return Stage(name, run, tuple(inputs), timeout=PIPELINE_STAGE_TIMEOUTS.get(name), **kwargs)
+
+# A slow or failing cache only costs the cache hit, never the turn
+prepare_stages = [
+    stage("history", load_history, ["session_id"]),
+    stage("messages", fit_messages, ["history", "user_turn"]),
+    stage("policy", load_cache_policy, required=False, fallback=CachePolicy()),
+    stage("cached", find_cached_reply, ["request", "history", "messages", "policy"], required=False),
+]
+turn_graph = StageGraph(
+    prepare_stages + [stage("reply", generate_reply, ["session_id", "http_request", "messages", "policy", "cached"])],
+    seeds=["session_id", "user_turn", "request", "http_request"]
+)
+stream_prepare_graph = StageGraph(prepare_stages, seeds=["session_id", "user_turn", "request"])
+prefetch_graph = StageGraph(
+    prepare_stages[:-1] + [stage("cached", peek_cached_reply, ["request", "history", "messages", "policy"], required=False)],
+    seeds=["session_id", "user_turn", "request"]
+)
+
+async def chat_with_bot_service(request: schemas.ChatRequest, http_request: Optional[Request] = None):
     # If no session_id provided, create one
     session_id = request.session_id or str(uuid.uuid4())
-    print(f"Session ID: {session_id}")
-    # Initialize history if new session
-    if session_id not in chat_sessions:
-        print("inside new session")
-        chat_sessions[session_id] = []
+    started_at = datetime.now()
+    bind_log_context(session_id=session_id)
+    user_turn = {"role": "user", "content": request.user_message}
+
+    # One turn at a time per session so concurrent requests don't interleave
+    async with session_store.lock(session_id):
+        try:
+            stages = await turn_graph.run(session_id=session_id, user_turn=user_turn, request=request, http_request=http_request)
+        except StageFailed as e:
+            error = e.error if isinstance(e.error, HTTPException) else HTTPException(status_code=500, detail=str(e.error))
+            await conversation_writer.submit(turn_record(
+                request, session_id, [], started_at, datetime.now(), error=error
+            ))
+            raise error
+        messages, cache_policy, cached = stages["messages"].value, stages["policy"].value, stages["cached"].value
+        log_payload("Chat history", messages)
+        bot_reply, usage = stages["reply"].value
+        # Store the user message and bot reply together
+        await store_turn(session_id, stages["history"].value, messages, bot_reply)
+
+    # Queued for the background writer, so the DB round-trips don't delay the reply
+    ended_at = datetime.now()
+    logging.info("Chat turn completed", extra={
+        "from_cache": cached is not None, "duration_ms": round((ended_at - started_at).total_seconds() * 1000)
+    })
+    # The prompt row spans the stage that produced the reply: the LLM call, or the cache lookup that replaced it
+    answered = stages["cached"] if cached is not None else stages["reply"]
+    await conversation_writer.submit(turn_record(
+        request, session_id,
+        [chat_prompt(messages, bot_reply, answered.started_at, answered.ended_at, cache_policy, cached is not None, usage)],
+        started_at, ended_at, from_cache=cached is not None
+    ))
+    return schemas.ChatResponse(session_id=session_id, reply=bot_reply, from_cache=cached is not None)
+
+
+def chat_stream_service(request: schemas.ChatRequest) -> Tuple[str, AsyncIterator]:
+    """
+        Streaming counterpart of chat_with_bot_service. Returns the session id
+        and an async iterator of completion chunks; the turn is stored once
+        the stream has been fully consumed.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    user_turn = {"role": "user", "content": request.user_message}
+
+    async def chunks():
+        started_at = datetime.now()
+        bind_log_context(session_id=session_id)
+        async with session_store.lock(session_id):
+            try:
+                stages = await stream_prepare_graph.run(session_id=session_id, user_turn=user_turn, request=request)
+            except StageFailed as e:
+                await conversation_writer.submit(turn_record(
+                    request, session_id, [], started_at, datetime.now(), error=e.error
+                ))
+                raise e.error
+            messages, cache_policy, cached = stages["messages"].value, stages["policy"].value, stages["cached"].value
+            if cached is not None:
+                yield cached_chunk(cached.reply)
+                await store_turn(session_id, stages["history"].value, messages, cached.reply)
+                ended_at = datetime.now()
+                await conversation_writer.submit(turn_record(
+                    request, session_id,
+                    [chat_prompt(messages, cached.reply, stages["cached"].started_at, stages["cached"].ended_at,
+                                 cache_policy, from_cache=True)],
+                    started_at, ended_at, from_cache=True
+                ))
+                return
+            stream_started_at = datetime.now()
+            prefetched = await take_prefetched_reply(session_id, None, messages, cache_policy)
+            if prefetched is not None:
+                bot_reply, usage = prefetched
+                yield cached_chunk(bot_reply, "prefetch")
+                await store_turn(session_id, stages["history"].value, messages, bot_reply)
+                ended_at = datetime.now()
+                await conversation_writer.submit(turn_record(
+                    request, session_id,
+                    [chat_prompt(messages, bot_reply, stream_started_at, ended_at, cache_policy, usage=usage)],
+                    started_at, ended_at
+                ))
+                return
+            started = time.perf_counter()
+            parts = []
+            try:
+                async for chunk in stream_chat_completion(
+                    prompt_version=cache_policy.prompt_version,
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    **CHAT_PARAMS
+                ):
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                    yield chunk
+            except Exception as e:
+                await conversation_writer.submit(turn_record(
+                    request, session_id, [], started_at, datetime.now(), error=e
+                ))
+                raise
+            bot_reply = "".join(parts)
+            log_payload("Streamed reply", bot_reply)
+            await response_cache.store(cache_policy, CHAT_MODEL, messages, CHAT_PARAMS, bot_reply, time.perf_counter() - started)
+            stream_ended_at = datetime.now()
+            await store_turn(session_id, stages["history"].value, messages, bot_reply)
+            ended_at = datetime.now()
+            await conversation_writer.submit(turn_record(
+                request, session_id,
+                [chat_prompt(messages, bot_reply, stream_started_at, stream_ended_at, cache_policy)],
+                started_at, ended_at
+            ))
 
-    # Append user message
-    chat_sessions[session_id].append({"role": "user", "content": request.user_message})
+    return session_id, chunks()
 
-    print(f"Chat History: {chat_sessions[session_id]}")
-    # Call OpenAI with full history
+
+async def chat_prefetch_service(request: schemas.ChatRequest) -> schemas.ChatPrefetchResponse:
+    """
+        Speculatively computes the reply to the input typed so far. The
+        /chat request for the same session reuses it when the submitted text
+        (and so the whole prompt) turns out identical, and cancels it otherwise.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    if not chat_prefetcher.enabled:
+        return schemas.ChatPrefetchResponse(session_id=session_id, status="disabled")
+    if len(request.user_message.strip()) < PREFETCH_MIN_CHARS:
+        return schemas.ChatPrefetchResponse(session_id=session_id, status="too_short")
+    bind_log_context(session_id=session_id)
+    # Read-only: no session lock. If a turn lands in between, the history changes and so does the key
     try:
-        response = aiClient.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=chat_sessions[session_id],
-            temperature=0.7
+        stages = await prefetch_graph.run(
+            session_id=session_id, user_turn={"role": "user", "content": request.user_message}, request=request
         )
-        print(f"OpenAI Response: {response}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    bot_reply = response.choices[0].message.content
-    print(f"Bot Reply: {bot_reply}")
-    # Append bot reply to history
-    chat_sessions[session_id].append({"role": "assistant", "content": bot_reply})
-
-    return schemas.ChatResponse(session_id=session_id, reply=bot_reply)
\ No newline at end of file
+    except StageFailed as e:
+        raise HTTPException(status_code=503, detail=f"Prefetch unavailable: {e.error}")
+    messages, policy = stages["messages"].value, stages["policy"].value
+    if stages["cached"].value is not None:
+        # The turn will be answered from a cache anyway
+        return schemas.ChatPrefetchResponse(session_id=session_id, status="cached")
+    status = chat_prefetcher.schedule(
+        session_id, reply_key(messages, policy), lambda: call_chat_llm(messages, policy, stage="Prefetch", store=False),
+        client_id=request.client_id
+    )
+    return schemas.ChatPrefetchResponse(session_id=session_id, status=status)
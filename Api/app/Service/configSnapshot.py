@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
+from app.DB import crud
+from app.DB.database import AsyncSessionLocal
+from app.extractEnvVariables import CONFIG_REFRESH_INTERVAL
+
+
+def freeze(value: Any) -> Any:
+    """Read-only deep copy: dicts become mapping proxies and lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def parse_json_text(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    # NavigationLinksGlobalConfiguration.data of the latest row: field label -> navigation name
+    navigation_labels: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    # GlobalConfigurations by name, data pre-parsed when it is JSON
+    global_configurations: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    # ScreenConfigurations by primarySchema
+    screen_configurations: Mapping[str, Mapping[str, Any]] = field(default_factory=lambda: MappingProxyType({}))
+    # ScreenDefaultSchemas by screenName, schemas pre-parsed
+    screen_default_schemas: Mapping[str, Mapping[str, Any]] = field(default_factory=lambda: MappingProxyType({}))
+    version: Optional[Tuple] = None
+    loaded_at: Optional[datetime] = None
+
+
+async def load_snapshot(db, version: Optional[Tuple] = None) -> ConfigSnapshot:
+    navigation = await crud.get_navigation_configurations(db)
+    global_configurations = {
+        row.name: parse_json_text(row.data) for row in await crud.get_all_global_configurations(db)
+    }
+    screen_configurations = {
+        row.primarySchema: {
+            "Id": row.Id,
+            "alias": row.alias,
+            "entityType": row.entityType,
+            "metaFieldNames": row.metaFieldNames,
+            "nestedScreenSpec": row.nestedScreenSpec,
+            "promptSpec": parse_json_text(row.promptSpec),
+            "screenSelectionSpec": parse_json_text(row.screenSelectionSpec),
+            "DefaultSchemaId": row.DefaultSchemaId,
+            "SuggestionActions": row.SuggestionActions,
+            "screenDescription": row.screenDescription,
+        }
+        for row in await crud.get_all_screen_configurations(db)
+    }
+    screen_default_schemas = {
+        row.screenName: {
+            "Id": row.Id,
+            "defaultNestedJsonSchema": parse_json_text(row.defaultNestedJsonSchema),
+            "newDefaultJsonSchema": parse_json_text(row.newDefaultJsonSchema),
+        }
+        for row in await crud.get_all_screen_default_schemas(db)
+    }
+    return ConfigSnapshot(
+        navigation_labels=freeze(json.loads(navigation.data) if navigation and navigation.data else {}),
+        global_configurations=freeze(global_configurations),
+        screen_configurations=freeze(screen_configurations),
+        screen_default_schemas=freeze(screen_default_schemas),
+        version=version,
+        loaded_at=datetime.now(),
+    )
+
+
+class ConfigSnapshotService:
+    """
+        Holds one pre-parsed, read-only ConfigSnapshot per worker. A background
+        task compares the configuration tables' max(UpdatedAt) and row counts
+        every `refresh_interval` seconds and swaps in a new snapshot when they
+        advance, so request handlers never query these tables themselves.
+    """
+
+    def __init__(self, refresh_interval: float = CONFIG_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "loads": 0, "checks": 0, "refresh_errors": 0, "last_refresh_seconds": 0.0}
+
+    async def current(self) -> ConfigSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Only before the first successful load (e.g. the DB was down at startup)
+            snapshot = await self.refresh(force=True)
+        self.stats["hits"] += 1
+        return snapshot
+
+    async def refresh(self, force: bool = False) -> ConfigSnapshot:
+        async with self._lock:
+            started = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                self.stats["checks"] += 1
+                version = await crud.get_configuration_versions(db)
+                if force or self._snapshot is None or version != self._snapshot.version:
+                    self._snapshot = await load_snapshot(db, version)
+                    self.stats["loads"] += 1
+                    self.stats["last_refresh_seconds"] = time.perf_counter() - started
+            return self._snapshot
+
+    async def invalidate(self) -> ConfigSnapshot:
+        return await self.refresh(force=True)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.stats["refresh_errors"] += 1
+                logging.warning(f"Configuration snapshot refresh failed, keeping the current one: {e}")
+
+    async def start(self):
+        try:
+            await self.refresh(force=True)
+        except Exception as e:
+            self.stats["refresh_errors"] += 1
+            logging.warning(f"Initial configuration snapshot load failed: {e}")
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            **self.stats,
+            "loaded_at": snapshot.loaded_at.isoformat() if snapshot and snapshot.loaded_at else None,
+            "version": [v.isoformat() if isinstance(v, datetime) else v for v in snapshot.version] if snapshot and snapshot.version else None,
+        }
+
+
+config_snapshot = ConfigSnapshotService()
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, List, Sequence
+from app.extractEnvVariables import CONTEXT_STRATEGY, CONTEXT_TOKEN_BUDGET, CONTEXT_MODEL_BUDGETS
+from app.Service.llmClient import create_chat_completion
+from app.Utils.utils import get_SummaryLLM_ModelName
+
+Message = Dict[str, str]
+
+# Per-message framing tokens added by the chat format (role, separators) and reply priming
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # Reads (and on first use downloads, unless TIKTOKEN_CACHE_DIR holds it) the BPE file;
+    # load_encoding() does this at startup so the first fit() doesn't block the event loop
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logging.warning(f"tiktoken unavailable, counting tokens as len(text) // 4 + 1: {e}")
+        return None
+
+
+async def load_encoding():
+    """Loads the tokenizer in a worker thread; called from the app lifespan."""
+    await asyncio.to_thread(_encoding)
+
+
+@lru_cache(maxsize=65536)
+def count_text_tokens(text: str) -> int:
+    # Cached per distinct message text, so a history is only tokenized once
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(message: Message) -> int:
+    return MESSAGE_OVERHEAD_TOKENS + count_text_tokens(message.get("content") or "")
+
+
+def count_prompt_tokens(messages: List[Message]) -> int:
+    # Stored histories (chatHistory.HistoryView) keep a count per message and needn't be read
+    prompt_tokens = getattr(messages, "prompt_tokens", None)
+    if prompt_tokens is not None:
+        return prompt_tokens()
+    return REPLY_PRIMING_TOKENS + sum(count_message_tokens(m) for m in messages)
+
+
+def get_token_budget(model: str) -> int:
+    return CONTEXT_MODEL_BUDGETS.get(model, CONTEXT_TOKEN_BUDGET)
+
+
+def _recent_that_fit(messages: List[Message], budget: int) -> List[Message]:
+    """Longest suffix of `messages` within `budget`; the last message is always kept."""
+    kept = []
+    used = REPLY_PRIMING_TOKENS
+    for message in reversed(messages):
+        cost = count_message_tokens(message)
+        if kept and used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+class ContextStrategy(ABC):
+    @abstractmethod
+    async def fit(self, messages: List[Message], budget: int) -> List[Message]:
+        """Returns the messages to send, fitting within `budget` prompt tokens."""
+
+    def rewrites_history(self, history: Sequence[Message], fitted: List[Message]) -> bool:
+        """True when `fitted` should replace the stored `history` (e.g. a new summary was folded in)."""
+        return False
+
+
+class SlidingWindowStrategy(ContextStrategy):
+    async def fit(self, messages: List[Message], budget: int) -> List[Message]:
+        if count_prompt_tokens(messages) <= budget:
+            return messages
+        return _recent_that_fit(messages, budget)
+
+
+class SystemAndRecentStrategy(ContextStrategy):
+    """Always keeps the leading system messages, then as many recent turns as fit."""
+
+    async def fit(self, messages: List[Message], budget: int) -> List[Message]:
+        if count_prompt_tokens(messages) <= budget:
+            return messages
+        split = 0
+        while split < len(messages) and messages[split].get("role") == "system":
+            split += 1
+        system, rest = messages[:split], messages[split:]
+        remaining = budget - sum(count_message_tokens(m) for m in system)
+        return system + _recent_that_fit(rest, remaining)
+
+
+class RollingSummaryStrategy(ContextStrategy):
+    """
+        Folds the turns that no longer fit into a single system summary message,
+        produced by the Summary_LLM deployment. The summary replaces those turns
+        in the stored history, so each turn is summarized at most once.
+    """
+
+    # Share of the budget kept verbatim as recent turns; the rest is room for the summary
+    RECENT_SHARE = 0.6
+    SUMMARY_MAX_TOKENS = 512
+
+    def __init__(self, debugInfo: Dict = None):
+        self.debugInfo = debugInfo or {}
+
+    async def summarize(self, previous_summary: str, messages: List[Message]) -> str:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        if previous_summary:
+            transcript = f"{SUMMARY_PREFIX}{previous_summary}\n{transcript}"
+        response = await create_chat_completion(
+            stage="Summary",
+            model=get_SummaryLLM_ModelName(self.debugInfo),
+            messages=[
+                {"role": "system", "content": "Summarize the conversation below in a few sentences. Keep names, ids, entities and open questions the assistant will need later."},
+                {"role": "user", "content": transcript}
+            ],
+            temperature=0,
+            max_tokens=self.SUMMARY_MAX_TOKENS
+        )
+        return response.choices[0].message.content
+
+    @staticmethod
+    def _is_summary(message: Message) -> bool:
+        return message.get("role") == "system" and (message.get("content") or "").startswith(SUMMARY_PREFIX)
+
+    async def fit(self, messages: List[Message], budget: int) -> List[Message]:
+        if count_prompt_tokens(messages) <= budget:
+            return messages
+        summary_message = None
+        if messages and self._is_summary(messages[0]):
+            summary_message = messages[0]
+            messages = messages[1:]
+
+        recent = _recent_that_fit(messages, int(budget * self.RECENT_SHARE))
+        older = messages[:len(messages) - len(recent)]
+        previous_summary = summary_message["content"][len(SUMMARY_PREFIX):] if summary_message else ""
+        try:
+            summary = await self.summarize(previous_summary, older)
+        except Exception as e:
+            # Never fail the turn because of the summary; send the previous summary and a plain window
+            logging.warning(f"Rolling summary failed, using sliding window: {e}")
+            if summary_message is None:
+                return _recent_that_fit(messages, budget)
+            return [summary_message] + _recent_that_fit(messages, budget - count_message_tokens(summary_message))
+        return [{"role": "system", "content": SUMMARY_PREFIX + summary}] + recent
+
+    def rewrites_history(self, history: Sequence[Message], fitted: List[Message]) -> bool:
+        # Only a newly produced summary replaces the turns it covers; otherwise the turn is appended
+        # and the stored history (older turns, previous summary) stays as it was
+        return bool(fitted) and self._is_summary(fitted[0]) and (not history or fitted[0] != history[0])
+
+
+CONTEXT_STRATEGIES = {
+    "sliding": SlidingWindowStrategy,
+    "system_recent": SystemAndRecentStrategy,
+    "summary": RollingSummaryStrategy,
+}
+
+
+def create_context_strategy(name: str = CONTEXT_STRATEGY) -> ContextStrategy:
+    try:
+        return CONTEXT_STRATEGIES[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown context strategy: {name}")
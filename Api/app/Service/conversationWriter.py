@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from app.DB import crud
+from app.DB.database import AsyncSessionLocal
+from app.Service.costAccounting import cost_accounting
+from app.Utils.lruCache import LRUTTLCache
+from app.extractEnvVariables import (
+    PERSISTENCE_MODE, PERSISTENCE_QUEUE_SIZE, PERSISTENCE_BATCH_SIZE, PERSISTENCE_FLUSH_INTERVAL,
+    PERSISTENCE_ENQUEUE_TIMEOUT, PERSISTENCE_DRAIN_TIMEOUT, SESSION_MAX_SESSIONS, SESSION_TTL_SECONDS
+)
+
+
+@dataclass
+class ConversationRecord:
+    """
+        Column values of one turn; ChatId is filled in by the writer from the
+        session and ConversationId when the Conversation row is inserted.
+    """
+    conversation: Dict[str, Any]
+    prompts: List[Dict[str, Any]] = field(default_factory=list)
+    analytics: Optional[Dict[str, Any]] = None
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    # Used for pricing (ClientRegionMapping) and per-client spend; not stored on the Conversation
+    client_id: Optional[str] = None
+    region: Optional[str] = None
+    # Chats row of the session, created with the session's first written turn
+    session_id: Optional[str] = None
+    chat: Optional[Dict[str, Any]] = None
+
+
+def conversation_record(user_prompt: str, prompts: List[Dict[str, Any]], started_at: datetime, ended_at: datetime,
+                        from_cache: bool = False, error: Optional[Exception] = None, error_code: Optional[int] = None,
+                        client_id: Optional[str] = None, session_id: Optional[str] = None,
+                        platform: Optional[str] = None, user_role: Optional[str] = None) -> ConversationRecord:
+    return ConversationRecord(
+        conversation={"UserPrompt": user_prompt, "IsError": error is not None, "FromCache": from_cache},
+        prompts=prompts,
+        analytics={
+            "TotalPromptTokens": sum(p.get("PromptTokens") or 0 for p in prompts),
+            "TotalCompletionTokens": sum(p.get("CompletionTokens") or 0 for p in prompts),
+            "ResponseStartTime": started_at,
+            "ResponseEndTime": ended_at,
+        },
+        errors=[] if error is None else [{
+            "Error": type(error).__name__,
+            "ErrorDetails": str(getattr(error, "detail", None) or error),
+            "ErrorCode": error_code or getattr(error, "status_code", 500),
+        }],
+        client_id=client_id,
+        session_id=session_id,
+        chat={"StartDate": started_at, "CustomerId": client_id, "Platform": platform, "Role": user_role, "Type": "Chat",
+              "SessionId": session_id},
+    )
+
+
+class ConversationWriter:
+    """
+        Write-behind persistence of chat turns. Requests only enqueue a
+        ConversationRecord; a background task collects up to `batch_size`
+        records or waits at most `flush_interval` seconds, then inserts the
+        whole batch in one transaction. A full queue makes `submit` wait up to
+        `enqueue_timeout` seconds (backpressure) before the record is dropped.
+        `mode="inline"` writes each record before returning instead.
+    """
+
+    def __init__(self, mode: str = PERSISTENCE_MODE, max_queue: int = PERSISTENCE_QUEUE_SIZE,
+                 batch_size: int = PERSISTENCE_BATCH_SIZE, flush_interval: float = PERSISTENCE_FLUSH_INTERVAL,
+                 enqueue_timeout: float = PERSISTENCE_ENQUEUE_TIMEOUT):
+        self.mode = mode.lower()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "asyncio.Queue[ConversationRecord]" = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        # session id -> Chats.Id, for as long as the session itself is kept; the
+        # Chats.SessionId lookup covers sessions first written by another worker
+        self._chat_ids = LRUTTLCache(SESSION_MAX_SESSIONS, SESSION_TTL_SECONDS)
+        self.stats = {"submitted": 0, "written": 0, "batches": 0, "failed": 0, "dropped": 0, "chats": 0,
+                      "last_batch_seconds": 0.0}
+
+    async def submit(self, record: ConversationRecord):
+        if self.mode == "off":
+            return
+        self.stats["submitted"] += 1
+        if self.mode == "inline" or self._task is None:
+            await self._write([record])
+            return
+        try:
+            await asyncio.wait_for(self._queue.put(record), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["dropped"] += 1
+            logging.warning("Conversation write queue full, dropping a conversation record")
+
+    async def _write(self, batch: List[ConversationRecord]):
+        started = time.perf_counter()
+        try:
+            # Fills in Analytics costs before the rows are inserted
+            await cost_accounting.apply(batch)
+            for attempt in range(2):
+                try:
+                    async with AsyncSessionLocal() as db:
+                        chat_ids, created = await self._assign_chats(db, batch)
+                        await crud.insert_conversation_records(db, batch)
+                        await db.commit()
+                    break
+                except IntegrityError:
+                    # Another worker created the Chats row of one of these sessions first; the retry finds it
+                    if attempt:
+                        raise
+            # Only counted once committed; a failed batch creates the Chats rows again next time
+            # and its costs never reach the spend totals
+            for session_id, chat_id in chat_ids.items():
+                self._chat_ids.set(session_id, chat_id)
+            self.stats["chats"] += created
+            cost_accounting.record_spend(batch)
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            logging.warning(f"Failed to persist {len(batch)} conversation records: {e}")
+            return
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["last_batch_seconds"] = time.perf_counter() - started
+
+    async def _assign_chats(self, db, batch: List[ConversationRecord]) -> Tuple[Dict[str, int], int]:
+        """
+            Sets ChatId on every record with a session. Sessions this process
+            hasn't seen are looked up by Chats.SessionId, and only those
+            without a chat get one, inserted in one statement. Returns the
+            chat ids resolved from the database and how many were created.
+        """
+        known: Dict[str, int] = {}
+        unseen: Dict[str, Dict[str, Any]] = {}
+        for record in batch:
+            if record.session_id and record.session_id not in known and record.session_id not in unseen:
+                chat_id = self._chat_ids.get(record.session_id)
+                if chat_id is None:
+                    unseen[record.session_id] = record.chat
+                else:
+                    known[record.session_id] = chat_id
+        resolved = await crud.get_chat_ids_by_session(db, unseen)
+        new_rows = {session_id: chat for session_id, chat in unseen.items() if session_id not in resolved}
+        resolved.update(zip(new_rows, await crud.insert_chats(db, list(new_rows.values()))))
+        known.update(resolved)
+        for record in batch:
+            if record.session_id:
+                record.conversation["ChatId"] = known[record.session_id]
+        return resolved, len(new_rows)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self):
+        if self.mode == "queued" and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = PERSISTENCE_DRAIN_TIMEOUT):
+        """Writes out everything already queued, then stops the background task."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Conversation write queue not drained on shutdown, {self.pending()} records lost")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+conversation_writer = ConversationWriter()
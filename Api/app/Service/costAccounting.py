@@ -0,0 +1,212 @@
+import heapq
+import logging
+import time
+from bisect import bisect_right
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from app.DB import crud
+from app.DB.database import AsyncSessionLocal
+from app.extractEnvVariables import (
+    TOKEN_PRICE_UNIT, DEFAULT_PRICING_REGION, TOKEN_PRICE_CHECK_INTERVAL, SPEND_WINDOW_SECONDS, SPEND_BUCKET_SECONDS
+)
+
+
+@dataclass(frozen=True)
+class Price:
+    start: datetime
+    end: Optional[datetime]  # exclusive; open-ended when None
+    input_price: float
+    output_price: float
+    currency: Optional[str] = None
+
+
+def _key(model: Optional[str], region: Optional[str]) -> Tuple[str, str]:
+    return (model or "").strip().lower(), (region or "").strip().lower()
+
+
+class PriceIndex:
+    """
+        Active TokenPrices by (model, region). Overlapping validity intervals
+        are flattened once into disjoint segments, each carrying the price of
+        the latest-starting interval in force there, so a lookup is one dict
+        probe and a bisect. Rows are indexed under both their Model and
+        DeploymentName.
+    """
+
+    def __init__(self, rows: Iterable = ()):
+        intervals: Dict[Tuple[str, str], List[Price]] = defaultdict(list)
+        for row in rows:
+            price = Price(row.StartDate or datetime.min, row.EndDate, row.InputTokensPrice or 0.0,
+                          row.OutputTokensPrice or 0.0, row.Currency)
+            for name in {row.Model, row.DeploymentName}:
+                if name:
+                    intervals[_key(name, row.Region)].append(price)
+        self._count = sum(len(p) for p in intervals.values())
+        self._starts: Dict[Tuple[str, str], List[datetime]] = {}
+        self._segments: Dict[Tuple[str, str], List[Tuple[Optional[datetime], Price]]] = {}
+        for key, prices in intervals.items():
+            prices.sort(key=lambda p: p.start)
+            starts, segments = self._flatten(prices)
+            self._starts[key] = starts
+            self._segments[key] = segments
+
+    @staticmethod
+    def _flatten(prices: List[Price]) -> Tuple[List[datetime], List[Tuple[Optional[datetime], Price]]]:
+        # Sweep over every start and end; of the intervals covering a stretch, the latest-starting
+        # one wins (the later row on equal starts). Prices are sorted by start, so that is the highest index
+        bounds = sorted({p.start for p in prices} | {p.end for p in prices if p.end is not None})
+        starts: List[datetime] = []
+        segments: List[Tuple[Optional[datetime], Price]] = []
+        active: List[int] = []  # heap of -index
+        added = 0
+        for j, bound in enumerate(bounds):
+            while added < len(prices) and prices[added].start <= bound:
+                heapq.heappush(active, -added)
+                added += 1
+            while active and prices[-active[0]].end is not None and prices[-active[0]].end <= bound:
+                heapq.heappop(active)
+            if not active:
+                continue
+            price = prices[-active[0]]
+            end = bounds[j + 1] if j + 1 < len(bounds) else None
+            if segments and segments[-1][1] is price and segments[-1][0] == bound:
+                segments[-1] = (end, price)
+            else:
+                starts.append(bound)
+                segments.append((end, price))
+        return starts, segments
+
+    def __len__(self):
+        return self._count
+
+    def lookup(self, model: str, region: Optional[str], at: datetime) -> Optional[Price]:
+        """Price in force at `at`; region-less rows apply to every region."""
+        for key in (_key(model, region), _key(model, None)):
+            starts = self._starts.get(key)
+            if not starts:
+                continue
+            i = bisect_right(starts, at) - 1
+            if i >= 0:
+                end, price = self._segments[key][i]
+                if end is None or at < end:
+                    return price
+        return None
+
+
+class RollingSpend:
+    """Per-client cost summed into fixed time buckets over a sliding window."""
+
+    def __init__(self, window_seconds: int = SPEND_WINDOW_SECONDS, bucket_seconds: int = SPEND_BUCKET_SECONDS):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self._buckets: Dict[str, Deque[List[float]]] = defaultdict(deque)  # client -> [[bucket, cost], ...]
+
+    def add(self, client: str, cost: float, now: Optional[float] = None):
+        bucket = int((now or time.time()) // self.bucket_seconds)
+        buckets = self._buckets[client]
+        if buckets and buckets[-1][0] == bucket:
+            buckets[-1][1] += cost
+        else:
+            buckets.append([bucket, cost])
+        self._prune(client, bucket)
+
+    def _prune(self, client: str, bucket: int):
+        buckets = self._buckets[client]
+        oldest = bucket - self.window_seconds // self.bucket_seconds
+        while buckets and buckets[0][0] <= oldest:
+            buckets.popleft()
+        if not buckets:
+            del self._buckets[client]
+
+    def totals(self, window_seconds: Optional[int] = None, now: Optional[float] = None) -> Dict[str, float]:
+        window = min(window_seconds or self.window_seconds, self.window_seconds)
+        current = int((now or time.time()) // self.bucket_seconds)
+        oldest = current - window // self.bucket_seconds
+        totals = {}
+        for client in list(self._buckets):
+            total = sum(cost for bucket, cost in self._buckets[client] if bucket > oldest)
+            if total:
+                totals[client] = total
+        return totals
+
+
+class CostAccounting:
+    """
+        Prices the ConversationPrompts of queued conversation records from an
+        in-memory PriceIndex and fills in Analytics.PromptTokensCost and
+        CompletionTokensCost. Runs in the conversation writer's background
+        task, so requests never wait on it. The index is reloaded when the
+        TokenPrices or ClientRegionMapping tables change.
+    """
+
+    def __init__(self, check_interval: float = TOKEN_PRICE_CHECK_INTERVAL, unit_tokens: int = TOKEN_PRICE_UNIT,
+                 default_region: str = DEFAULT_PRICING_REGION):
+        self.check_interval = check_interval
+        self.unit_tokens = unit_tokens
+        self.default_region = default_region
+        self.prices = PriceIndex()
+        self.client_regions: Dict[str, str] = {}
+        self.spend = RollingSpend()
+        self._version = None
+        self._checked_at = 0.0
+        self.stats = {"priced": 0, "unpriced": 0, "reloads": 0}
+
+    async def _ensure_fresh(self):
+        if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        self._checked_at = time.monotonic()
+        # Own session, so a failed price query never poisons the caller's insert transaction
+        async with AsyncSessionLocal() as db:
+            version = await crud.get_token_prices_version(db)
+            if version != self._version:
+                self.prices = PriceIndex(await crud.get_active_token_prices(db))
+                self.client_regions = await crud.get_client_regions(db)
+                self._version = version
+                self.stats["reloads"] += 1
+
+    def cost(self, model: str, region: Optional[str], at: datetime, prompt_tokens: int, completion_tokens: int) -> Optional[Tuple[float, float]]:
+        price = self.prices.lookup(model, region, at)
+        if price is None:
+            return None
+        return (prompt_tokens * price.input_price / self.unit_tokens,
+                completion_tokens * price.output_price / self.unit_tokens)
+
+    async def apply(self, records):
+        try:
+            await self._ensure_fresh()
+        except Exception as e:
+            # Keep using the loaded prices; costs stay empty if none were ever loaded
+            logging.warning(f"Could not refresh token prices: {e}")
+        for record in records:
+            if record.analytics is None:
+                continue
+            region = record.region or self.client_regions.get(record.client_id) or self.default_region
+            prompt_cost = completion_cost = 0.0
+            priced = False
+            for prompt in record.prompts:
+                model = (prompt.get("RequestPromptParameters") or {}).get("model")
+                costs = self.cost(model, region, prompt.get("StartTime") or datetime.now(),
+                                  prompt.get("PromptTokens") or 0, prompt.get("CompletionTokens") or 0)
+                if costs is None:
+                    self.stats["unpriced"] += 1
+                    continue
+                self.stats["priced"] += 1
+                priced = True
+                prompt_cost += costs[0]
+                completion_cost += costs[1]
+            if priced:
+                record.analytics["PromptTokensCost"] = prompt_cost
+                record.analytics["CompletionTokensCost"] = completion_cost
+
+    def record_spend(self, records):
+        """Adds the costs `apply` priced to the rolling spend; called once the records are stored."""
+        for record in records:
+            if record.analytics is None or "PromptTokensCost" not in record.analytics:
+                continue
+            cost = record.analytics["PromptTokensCost"] + record.analytics["CompletionTokensCost"]
+            self.spend.add(record.client_id or "unknown", cost)
+
+
+cost_accounting = CostAccounting()
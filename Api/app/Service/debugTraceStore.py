@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+from app.extractEnvVariables import (
+    DEBUG_TRACE_SEGMENT_BYTES, DEBUG_TRACE_RETENTION_DAYS, DEBUG_TRACE_MAX_OPEN_TRACES, DEBUG_TRACE_QUEUE_SIZE
+)
+from app.Utils import jsonCodec
+from app.Utils.constants import BasePath, TimeStampFormat
+
+SEGMENT_PREFIX = "traces_"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class DebugTraceStore:
+    """
+        Debug traces (one user query plus the LLM calls it made) kept in an
+        in-memory index by trace id and by session, and persisted as an
+        append-only JSONL log. A background thread batches the writes, rolls
+        to a new segment past `segment_max_bytes` and deletes segments older
+        than `retention_days`. A write never reads or rewrites earlier traces.
+    """
+
+    def __init__(self, base_dir: str = BasePath, segment_max_bytes: int = DEBUG_TRACE_SEGMENT_BYTES,
+                 retention_days: float = DEBUG_TRACE_RETENTION_DAYS, max_open_traces: int = DEBUG_TRACE_MAX_OPEN_TRACES,
+                 queue_size: int = DEBUG_TRACE_QUEUE_SIZE):
+        self.base_dir = base_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.retention_days = retention_days
+        self.max_open_traces = max_open_traces
+        self._traces: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # trace id -> debug response
+        self._session_traces: Dict[str, str] = {}                          # session id -> latest trace id
+        self._sequence = 0
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._segment_path: Optional[str] = None
+        self._segment_size = 0
+        self.stats = {"traces": 0, "responses": 0, "written": 0, "dropped": 0, "segments_rotated": 0, "segments_deleted": 0}
+
+    # Index
+
+    def start_trace(self, user_query: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        self._ensure_loaded()
+        self._sequence += 1
+        trace_id = f"{datetime.now().strftime(TimeStampFormat)}_{self._sequence}"
+        trace = {"userQuery": user_query, "llmRequestResponse": []}
+        if session_id:
+            trace["sessionId"] = session_id
+        self._remember(trace_id, trace)
+        self.stats["traces"] += 1
+        self._enqueue({"type": "query", "trace": trace_id, "sessionId": session_id, "userQuery": user_query})
+        return {**trace, "llmRequestResponse": []}
+
+    def append_response(self, entry: Dict[str, Any], session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Adds an LLM call to the session's latest trace, or to the latest trace overall."""
+        self._ensure_loaded()
+        trace_id = self._session_traces.get(session_id) if session_id else None
+        if trace_id is None or trace_id not in self._traces:
+            if not self._traces:
+                raise ValueError("No existing query file found")
+            trace_id = next(reversed(self._traces))
+        trace = self._traces[trace_id]
+        trace["llmRequestResponse"].append(entry)
+        self.stats["responses"] += 1
+        self._enqueue({"type": "response", "trace": trace_id, "entry": entry})
+        return {**trace, "llmRequestResponse": list(trace["llmRequestResponse"])}
+
+    def _remember(self, trace_id: str, trace: Dict[str, Any]):
+        self._traces[trace_id] = trace
+        if trace.get("sessionId"):
+            self._session_traces[trace["sessionId"]] = trace_id
+        while len(self._traces) > self.max_open_traces:
+            old_id, old = self._traces.popitem(last=False)
+            if self._session_traces.get(old.get("sessionId")) == old_id:
+                del self._session_traces[old["sessionId"]]
+
+    async def start(self):
+        """Rebuilds the index off the event loop; the newest segment can be up to `segment_max_bytes`."""
+        await asyncio.to_thread(self._ensure_loaded)
+
+    def _ensure_loaded(self):
+        # Rebuild the index from the newest segment once, so a restart keeps appending to open traces.
+        # Normally done by start(); a store used without it loads on its first write instead
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self):
+        segments = self._segments()
+        if not segments:
+            return
+        try:
+            with open(os.path.join(self.base_dir, segments[-1]), "rb") as file:
+                for line in file:
+                    try:
+                        record = jsonCodec.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if record.get("type") == "query":
+                        trace = {"userQuery": record.get("userQuery"), "llmRequestResponse": []}
+                        if record.get("sessionId"):
+                            trace["sessionId"] = record["sessionId"]
+                        self._remember(record["trace"], trace)
+                    elif record.get("type") == "response" and record.get("trace") in self._traces:
+                        self._traces[record["trace"]]["llmRequestResponse"].append(record.get("entry"))
+        except OSError as e:
+            logging.warning(f"Could not restore debug trace index: {e}")
+
+    # Background writer
+
+    def _enqueue(self, record: Dict[str, Any]):
+        record["at"] = datetime.now().isoformat()
+        if self._writer is None:
+            self._start_writer()
+        try:
+            self._queue.put_nowait(jsonCodec.dumps_bytes(record) + b"\n")
+        except queue.Full:
+            # Debug tracing must never hold up a chat request
+            self.stats["dropped"] += 1
+
+    def _start_writer(self):
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._writer = threading.Thread(target=self._write_loop, name="debug-trace-writer", daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
+        self._delete_expired()
+        while True:
+            line = self._queue.get()
+            batch = [line]
+            try:
+                while len(batch) < 1000:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            stop = None in batch
+            lines = [l for l in batch if l is not None]
+            try:
+                if lines:
+                    self._write(lines)
+            except OSError as e:
+                logging.warning(f"Debug trace write failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, lines):
+        path = self._segment_path
+        if path is None or self._segment_size >= self.segment_max_bytes:
+            path = self._rotate()
+        data = b"".join(lines)
+        with open(path, "ab") as file:
+            file.write(data)
+        self._segment_size += len(data)
+        self.stats["written"] += len(lines)
+
+    def _rotate(self) -> str:
+        segments = self._segments()
+        if self._segment_path is None and segments:
+            latest = os.path.join(self.base_dir, segments[-1])
+            if os.path.getsize(latest) < self.segment_max_bytes:
+                self._segment_path = latest
+                self._segment_size = os.path.getsize(latest)
+                return latest
+        self._segment_path = os.path.join(
+            self.base_dir, f"{SEGMENT_PREFIX}{datetime.now().strftime(TimeStampFormat)}_{self._sequence}{SEGMENT_SUFFIX}"
+        )
+        self._segment_size = 0
+        self.stats["segments_rotated"] += 1
+        self._delete_expired()
+        return self._segment_path
+
+    def _segments(self):
+        if not os.path.isdir(self.base_dir):
+            return []
+        return sorted(
+            (f for f in os.listdir(self.base_dir) if f.startswith(SEGMENT_PREFIX) and f.endswith(SEGMENT_SUFFIX)),
+            key=lambda f: os.path.getmtime(os.path.join(self.base_dir, f))
+        )
+
+    def _delete_expired(self):
+        if self.retention_days <= 0:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for name in self._segments():
+            path = os.path.join(self.base_dir, name)
+            if path != self._segment_path and os.path.getmtime(path) < cutoff:
+                try:
+                    os.remove(path)
+                    self.stats["segments_deleted"] += 1
+                except OSError:
+                    pass
+
+    def pending(self) -> int:
+        """Records queued for the writer thread."""
+        return self._queue.qsize()
+
+    def flush(self):
+        """Blocks until every queued record is on disk."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+
+debug_trace_store = DebugTraceStore()
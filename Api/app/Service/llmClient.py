@@ -0,0 +1,134 @@
+import asyncio
+from time import perf_counter
+from typing import AsyncIterator
+import openai
+from fastapi import HTTPException, Request
+from openai import AsyncOpenAI
+from app.extractEnvVariables import api_key, LLM_REQUEST_TIMEOUT, LLM_MAX_RETRIES, LLM_COALESCE_ENABLED
+from app.Service.llmRouter import llm_router, NoHealthyDeploymentError
+from app.Service.singleFlight import llm_single_flight, flight_key
+from app.Utils.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS, LLM_ERRORS
+
+# One client per worker process so the underlying httpx connection pool is shared
+# by every request instead of being rebuilt per call. Chat completions go through
+# llm_router, which keeps its own clients per deployment.
+aiClient = AsyncOpenAI(api_key=api_key, timeout=LLM_REQUEST_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+
+# Caps the number of completions in flight per worker; extra requests wait here
+# rather than piling up on the upstream deployment. The router takes a slot per
+# attempt, so a call backing off between attempts leaves it to the others.
+llm_semaphore = llm_router.limit
+
+# How often a pending request checks whether its caller has gone away
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+def record_usage(model: str, stage: str, usage):
+    if usage is not None:
+        LLM_TOKENS.labels(model, stage, "prompt").inc(usage.prompt_tokens or 0)
+        LLM_TOKENS.labels(model, stage, "completion").inc(usage.completion_tokens or 0)
+
+
+async def create_chat_completion(timeout: float = LLM_REQUEST_TIMEOUT, stage: str = "Chat",
+                                 prompt_version=None, **kwargs):
+    """
+        Runs a chat completion through the deployment router, bounded by the
+        concurrency semaphore and a per-request timeout (queueing and retries
+        included). Identical concurrent calls (same stage, prompt version,
+        model, messages and parameters) share one upstream request.
+        `stage` labels the call's latency and token metrics (Chat, LLM0, Summary, ...).
+    """
+    model = kwargs.get("model", "")
+
+    async def _call():
+        started = perf_counter()
+        response = await llm_router.create(**kwargs)
+        LLM_REQUEST_SECONDS.labels(model, stage).observe(perf_counter() - started)
+        record_usage(model, stage, getattr(response, "usage", None))
+        return response
+
+    if LLM_COALESCE_ENABLED:
+        call = llm_single_flight.do(flight_key(stage, prompt_version, kwargs), _call)
+    else:
+        call = _call()
+    try:
+        return await asyncio.wait_for(call, timeout=timeout)
+    except asyncio.TimeoutError:
+        LLM_ERRORS.labels(model, stage).inc()
+        raise HTTPException(status_code=504, detail="LLM request timed out")
+    except openai.RateLimitError:
+        LLM_ERRORS.labels(model, stage).inc()
+        raise HTTPException(status_code=429, detail="LLM rate limit reached, retry later")
+    except NoHealthyDeploymentError as e:
+        LLM_ERRORS.labels(model, stage).inc()
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception:
+        LLM_ERRORS.labels(model, stage).inc()
+        raise
+
+
+async def run_until_disconnected(http_request: Request, coro):
+    """
+        Awaits `coro` but cancels it as soon as the HTTP client disconnects,
+        so abandoned chats stop holding a concurrency slot.
+    """
+    task = asyncio.ensure_future(coro)
+    if http_request is None:
+        return await task
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                # 499: client closed request (nginx convention)
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def stream_chat_completion(timeout: float = LLM_REQUEST_TIMEOUT, stage: str = "Chat",
+                                 prompt_version=None, **kwargs) -> AsyncIterator:
+    """
+        Streams completion chunks while holding a concurrency slot for the
+        lifetime of the stream. `timeout` bounds the wait for the first
+        chunk (failover included); the stream is closed if the consumer stops early.
+        Identical concurrent streams share one upstream stream, fanned out to every caller.
+    """
+    model = kwargs.get("model", "")
+
+    async def _upstream():
+        started = perf_counter()
+        chunks = llm_router.stream(**kwargs)
+        try:
+            async for chunk in chunks:
+                record_usage(model, stage, getattr(chunk, "usage", None))
+                yield chunk
+        finally:
+            await chunks.aclose()
+        LLM_REQUEST_SECONDS.labels(model, stage).observe(perf_counter() - started)
+
+    if LLM_COALESCE_ENABLED:
+        stream = llm_single_flight.stream(flight_key(stage, prompt_version, kwargs), _upstream)
+    else:
+        stream = _upstream()
+    try:
+        first = await asyncio.wait_for(anext(stream, None), timeout=timeout)
+    except asyncio.TimeoutError:
+        LLM_ERRORS.labels(model, stage).inc()
+        raise HTTPException(status_code=504, detail="LLM request timed out")
+    except openai.RateLimitError:
+        LLM_ERRORS.labels(model, stage).inc()
+        raise HTTPException(status_code=429, detail="LLM rate limit reached, retry later")
+    except NoHealthyDeploymentError as e:
+        LLM_ERRORS.labels(model, stage).inc()
+        raise HTTPException(status_code=503, detail=str(e))
+    try:
+        if first is not None:
+            yield first
+            async for chunk in stream:
+                yield chunk
+    finally:
+        await stream.aclose()
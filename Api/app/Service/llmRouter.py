@@ -0,0 +1,328 @@
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import Dict, List, Optional
+import openai
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+from app.Utils.metrics import Counter
+from app.extractEnvVariables import (
+    api_key, LLM_REQUEST_TIMEOUT, LLM_MAX_CONCURRENCY, LLM_DEPLOYMENTS, LLM_ROUTER_STRATEGY, LLM_ROUTER_MAX_ATTEMPTS,
+    LLM_ROUTER_BACKOFF_BASE, LLM_ROUTER_BACKOFF_MAX, LLM_ROUTER_FAILURE_THRESHOLD, LLM_ROUTER_COOLDOWN
+)
+
+LLM_ROUTER_RETRIES = Counter(
+    "chatbot_llm_router_retries_total", "LLM calls retried on another attempt, by deployment and reason",
+    ["deployment", "reason"]
+)
+
+_duration_part = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from rate-limit reset values such as "1s", "6m0s", "20ms" or a bare number of seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _duration_part.findall(value)
+    return sum(float(n) * _UNITS[unit] for n, unit in parts) if parts else None
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after(headers) -> Optional[float]:
+    if headers is None:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after"))
+
+
+class NoHealthyDeploymentError(Exception):
+    pass
+
+
+class ConcurrencyLimit(asyncio.Semaphore):
+    """Semaphore that also counts its current holders, for /metrics."""
+
+    def __init__(self, value: int):
+        super().__init__(value)
+        self._holders = 0
+
+    async def acquire(self):
+        await super().acquire()
+        self._holders += 1
+        return True
+
+    def release(self):
+        self._holders -= 1
+        super().release()
+
+    def in_flight(self) -> int:
+        return self._holders
+
+
+class Deployment:
+    """
+        One endpoint of a pool: its client, requests in flight, the rate-limit
+        state from its last response headers, and a circuit breaker that opens
+        after `failure_threshold` consecutive failures and lets a single probe
+        through once `cooldown` has passed.
+    """
+
+    def __init__(self, name: str, client, deployment: Optional[str] = None, rpm: Optional[int] = None,
+                 tpm: Optional[int] = None, weight: float = 1.0,
+                 failure_threshold: int = LLM_ROUTER_FAILURE_THRESHOLD, cooldown: float = LLM_ROUTER_COOLDOWN):
+        self.name = name
+        self.client = client
+        self.deployment = deployment
+        self.weight = weight or 1.0
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.limit_requests, self.limit_tokens = rpm, tpm
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.quota_resets_at = 0.0
+        self.throttled_until = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.stats = {"requests": 0, "throttled": 0, "failures": 0, "circuit_opened": 0}
+
+    @property
+    def circuit(self) -> str:
+        if self.failures < self.failure_threshold:
+            return "closed"
+        return "open" if time.monotonic() < self.open_until else "half_open"
+
+    def available(self, now: float) -> bool:
+        if now < self.throttled_until:
+            return False
+        circuit = self.circuit
+        return circuit == "closed" or (circuit == "half_open" and not self.probing)
+
+    def quota_fraction(self, now: float) -> float:
+        """Share of the request/token quota left in the current window; 1.0 when unknown."""
+        if now >= self.quota_resets_at:
+            return 1.0
+        fractions = [remaining / limit for remaining, limit in ((self.remaining_requests, self.limit_requests),
+                                                                 (self.remaining_tokens, self.limit_tokens))
+                     if remaining is not None and limit]
+        return min(fractions) if fractions else 1.0
+
+    def observe_headers(self, headers):
+        if headers is None:
+            return
+        self.limit_requests = _int_header(headers, "x-ratelimit-limit-requests") or self.limit_requests
+        self.limit_tokens = _int_header(headers, "x-ratelimit-limit-tokens") or self.limit_tokens
+        self.remaining_requests = _int_header(headers, "x-ratelimit-remaining-requests")
+        self.remaining_tokens = _int_header(headers, "x-ratelimit-remaining-tokens")
+        resets = [parse_duration(headers.get(h)) for h in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+        resets = [r for r in resets if r is not None]
+        # Without a reset hint, trust the remaining counts for one minute (the RPM/TPM window)
+        self.quota_resets_at = time.monotonic() + (max(resets) if resets else 60)
+
+    def start(self):
+        self.in_flight += 1
+        self.stats["requests"] += 1
+        if self.circuit == "half_open":
+            self.probing = True
+
+    def succeeded(self):
+        self.in_flight -= 1
+        self.failures = 0
+        self.probing = False
+
+    def throttled(self, wait: Optional[float]):
+        # A 429 says the endpoint is healthy but busy: park it without touching the breaker
+        self.in_flight -= 1
+        self.probing = False
+        self.stats["throttled"] += 1
+        self.throttled_until = time.monotonic() + (wait if wait is not None else 1.0)
+
+    def failed(self):
+        self.in_flight -= 1
+        self.probing = False
+        self.failures += 1
+        self.stats["failures"] += 1
+        if self.failures >= self.failure_threshold:
+            if time.monotonic() >= self.open_until:
+                self.stats["circuit_opened"] += 1
+                logging.warning(f"LLM deployment {self.name} circuit open for {self.cooldown}s after {self.failures} failures")
+            self.open_until = time.monotonic() + self.cooldown
+
+    def released(self):
+        # Cancelled (client gone, timeout): neither a success nor a failure of the endpoint
+        self.in_flight -= 1
+        self.probing = False
+
+
+class LLMRouter:
+    """
+        Routes chat completions for a logical model over a pool of equivalent
+        deployments. Picks the available deployment with the fewest requests in
+        flight per unit of weight (`least_inflight`) or the most rate-limit
+        quota left (`quota`). Throttled (429) and failing (5xx, connection
+        errors) deployments are skipped and the call fails over to the next
+        one; when every deployment has been tried, it waits a jittered
+        exponential backoff (or the server's Retry-After) before trying again.
+        `limit` caps the upstream requests in flight; a slot is taken per
+        attempt, so calls waiting out a backoff don't hold one.
+    """
+
+    def __init__(self, pools: Dict[str, List[Deployment]], default: Deployment, strategy: str = LLM_ROUTER_STRATEGY,
+                 max_attempts: int = LLM_ROUTER_MAX_ATTEMPTS, backoff_base: float = LLM_ROUTER_BACKOFF_BASE,
+                 backoff_max: float = LLM_ROUTER_BACKOFF_MAX, limit: Optional[ConcurrencyLimit] = None):
+        self.pools = pools
+        self.default = default
+        self.strategy = strategy
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limit = limit if limit is not None else ConcurrencyLimit(LLM_MAX_CONCURRENCY)
+
+    def deployments(self) -> List[Deployment]:
+        return [self.default] + [d for pool in self.pools.values() for d in pool]
+
+    def _pick(self, pool: List[Deployment], tried: set) -> Optional[Deployment]:
+        now = time.monotonic()
+        candidates = [d for d in pool if d.available(now) and d not in tried]
+        if not candidates:
+            return None
+        if self.strategy == "quota":
+            return max(candidates, key=lambda d: (d.quota_fraction(now), -d.in_flight / d.weight))
+        return min(candidates, key=lambda d: (d.in_flight / d.weight, -d.quota_fraction(now)))
+
+    def _backoff(self, attempt: int, pool: List[Deployment], hint: Optional[float]) -> float:
+        if hint is not None:
+            return min(hint, self.backoff_max)
+        # Wait for the soonest throttled deployment when that is what blocks us, otherwise full jitter
+        now = time.monotonic()
+        soonest = min(d.throttled_until - now for d in pool if d.circuit != "open")
+        if soonest > 0:
+            return min(soonest, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _request(self, deployment: Deployment, model: str, stream: bool, kwargs):
+        """One upstream attempt in a concurrency slot; the slot stays held when it succeeds."""
+        await self.limit.acquire()
+        try:
+            return await deployment.client.chat.completions.with_raw_response.create(
+                model=deployment.deployment or model, stream=stream, **kwargs
+            )
+        except BaseException:
+            self.limit.release()
+            raise
+
+    async def _call(self, model: str, stream: bool, kwargs):
+        """Returns the deployment and response of the first attempt that succeeds, holding a slot of `limit`."""
+        pool = self.pools.get(model) or [self.default]
+        tried: set = set()
+        last_error: Optional[Exception] = None
+        hint: Optional[float] = None
+        for attempt in range(self.max_attempts):
+            deployment = self._pick(pool, tried)
+            if deployment is None:
+                # Open circuits won't recover within a backoff; fail fast instead of waiting them out
+                healthy = [d for d in pool if d.circuit != "open"]
+                if not healthy:
+                    raise last_error or NoHealthyDeploymentError(f"Every deployment of {model} is unavailable")
+                # Every healthy deployment was tried or is throttled: back off, then start over
+                await asyncio.sleep(self._backoff(attempt, pool, hint))
+                tried.clear()
+                deployment = self._pick(pool, tried) or min(healthy, key=lambda d: d.throttled_until)
+            tried.add(deployment)
+            deployment.start()
+            try:
+                raw = await self._request(deployment, model, stream, kwargs)
+            except openai.RateLimitError as e:
+                hint = retry_after(e.response.headers)
+                deployment.observe_headers(e.response.headers)
+                deployment.throttled(hint)
+                LLM_ROUTER_RETRIES.labels(deployment.name, "429").inc()
+                last_error = e
+                continue
+            except (openai.APIConnectionError, openai.InternalServerError) as e:
+                hint = retry_after(getattr(getattr(e, "response", None), "headers", None))
+                deployment.failed()
+                LLM_ROUTER_RETRIES.labels(deployment.name, "5xx" if isinstance(e, openai.InternalServerError) else "connection").inc()
+                last_error = e
+                continue
+            except openai.APIStatusError:
+                # Other 4xx (bad request, auth) would fail the same way on every deployment
+                deployment.released()
+                raise
+            except BaseException:
+                deployment.released()
+                raise
+            try:
+                deployment.observe_headers(raw.headers)
+                return deployment, raw.parse()
+            except BaseException:
+                deployment.released()
+                self.limit.release()
+                raise
+        raise last_error
+
+    async def create(self, model: str, **kwargs):
+        deployment, response = await self._call(model, False, kwargs)
+        self.limit.release()
+        deployment.succeeded()
+        return response
+
+    async def stream(self, model: str, **kwargs):
+        """
+            Async iterator of chunks. Failover happens before the first byte
+            only; a stream that breaks midway is not replayed elsewhere.
+        """
+        deployment, stream = await self._call(model, True, kwargs)
+        try:
+            async for chunk in stream:
+                yield chunk
+        except BaseException:
+            deployment.released()
+            raise
+        else:
+            deployment.succeeded()
+        finally:
+            try:
+                await stream.close()
+            finally:
+                self.limit.release()
+
+
+def _client(config: dict):
+    if config.get("api_version"):
+        return AsyncAzureOpenAI(azure_endpoint=config.get("base_url"), api_key=config.get("api_key") or api_key,
+                                api_version=config["api_version"], timeout=LLM_REQUEST_TIMEOUT, max_retries=0)
+    return AsyncOpenAI(base_url=config.get("base_url"), api_key=config.get("api_key") or api_key,
+                       timeout=LLM_REQUEST_TIMEOUT, max_retries=0)
+
+
+def create_llm_router(deployments: dict = LLM_DEPLOYMENTS) -> LLMRouter:
+    pools = {
+        model: [Deployment(c.get("name") or f"{model}-{i}", _client(c), c.get("deployment"), c.get("rpm"),
+                           c.get("tpm"), c.get("weight", 1.0)) for i, c in enumerate(configs)]
+        for model, configs in deployments.items()
+    }
+    # Retries are done by the router, so the clients never retry on their own
+    default = Deployment("default", AsyncOpenAI(api_key=api_key, timeout=LLM_REQUEST_TIMEOUT, max_retries=0))
+    return LLMRouter(pools, default)
+
+
+llm_router = create_llm_router()
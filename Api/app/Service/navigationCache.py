@@ -0,0 +1,121 @@
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.DB import crud
+from app.extractEnvVariables import NAVIGATION_CACHE_CHECK_INTERVAL
+
+
+@dataclass(frozen=True)
+class NavigationLink:
+    """Session-independent copy of an active NavigationLinks row."""
+    Id: int
+    name: str
+    url: Optional[str]
+    responseText: Optional[str]
+    type: Optional[str]
+    EntityTypeSupported: Optional[str]
+    RequiredId: Optional[str]
+    Description: Optional[str]
+    UpdatedAt: Optional[datetime]
+    # EntityTypeSupported parsed once when the link is loaded; None when every entity type is supported
+    entity_types: Optional[FrozenSet[str]] = field(default=None, compare=False)
+
+    @classmethod
+    def from_row(cls, row) -> "NavigationLink":
+        return cls(
+            Id=row.Id, name=row.name, url=row.url, responseText=row.responseText, type=row.type,
+            EntityTypeSupported=row.EntityTypeSupported, RequiredId=row.RequiredId,
+            Description=row.Description, UpdatedAt=row.UpdatedAt,
+            entity_types=parse_entity_types(row.EntityTypeSupported)
+        )
+
+    def partition_entities(self, entities: Iterable[dict]) -> Tuple[List[dict], Dict[str, int]]:
+        """
+            Splits entities into those this link supports and, in one pass, the
+            unsupported entity types (first-seen order) with how many entities
+            of each were removed. Entities without a type are removed uncounted.
+        """
+        supported = self.entity_types
+        if supported is None:
+            return list(entities), {}
+        kept: List[dict] = []
+        dropped: List[Optional[str]] = []
+        keep, drop = kept.append, dropped.append
+        for entity in entities:
+            entity_type = entity.get("entityType") or entity.get("Entity Type")
+            if entity_type in supported:
+                keep(entity)
+            else:
+                drop(entity_type)
+        # Counted in C afterwards: a per-entity dict update made this slower than the plain filter it replaced
+        return kept, {entity_type: n for entity_type, n in Counter(dropped).items() if entity_type}
+
+
+def parse_entity_types(value: Optional[str]) -> Optional[FrozenSet[str]]:
+    if not value:
+        return None
+    return frozenset(s.strip() for s in value.split(","))
+
+
+class NavigationCache:
+    """
+        Whole-table snapshot of the active NavigationLinks, keyed by name.
+        Every `check_interval` seconds a single aggregate query compares
+        max(UpdatedAt) and the row count with the loaded snapshot and reloads
+        it when either has moved. A non-positive interval disables the
+        snapshot and every lookup becomes one IN query.
+    """
+
+    def __init__(self, check_interval: float = NAVIGATION_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._links: Dict[str, NavigationLink] = {}
+        self._version: Optional[Tuple[Optional[datetime], int]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self.stats = {"hits": 0, "misses": 0, "reloads": 0, "checks": 0}
+
+    def invalidate(self):
+        self._checked_at = 0.0
+        self._version = None
+
+    async def _ensure_fresh(self, db: AsyncSession):
+        if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        async with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return
+            self.stats["checks"] += 1
+            version = await crud.get_navigation_links_version(db)
+            if version != self._version:
+                rows = await crud.get_all_navigation_links(db)
+                links = {}
+                for row in rows:
+                    links.setdefault(row.name, NavigationLink.from_row(row))
+                self._links = links
+                self._version = version
+                self.stats["reloads"] += 1
+            self._checked_at = time.monotonic()
+
+    async def get(self, db: AsyncSession, name: str) -> Optional[NavigationLink]:
+        return (await self.get_many(db, [name])).get(name)
+
+    async def get_many(self, db: AsyncSession, names: Iterable[str]) -> Dict[str, NavigationLink]:
+        """Resolves every name at once; names without an active link are left out."""
+        names = {name for name in names if name is not None}
+        if self.check_interval <= 0:
+            rows = await crud.get_navigation_by_names(db, names)
+            return {name: NavigationLink.from_row(row) for name, row in rows.items()}
+        await self._ensure_fresh(db)
+        links = self._links
+        found = {name: links[name] for name in names if name in links}
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(names) - len(found)
+        return found
+
+
+navigation_cache = NavigationCache()
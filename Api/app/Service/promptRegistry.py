@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+from app.DB import crud
+from app.DB.database import AsyncSessionLocal
+from app.Service.configSnapshot import freeze, parse_json_text
+from app.extractEnvVariables import PROMPT_REGISTRY_REFRESH_INTERVAL
+
+# Only {identifier} is a placeholder; other braces (JSON examples in prompts) are literal text
+_placeholder = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+# A miss re-checks the tables at most this often, so unknown names/ids don't query on every request
+MISS_RECHECK_SECONDS = 1.0
+
+
+class PromptTemplate:
+    """
+        A system prompt split once into literal text and {placeholder} slots,
+        so rendering is a join instead of a parse. Placeholders without a
+        value are left as they are.
+    """
+    __slots__ = ("text", "_parts", "placeholders")
+
+    def __init__(self, text: Optional[str]):
+        self.text = text or ""
+        parts, last = [], 0
+        for match in _placeholder.finditer(self.text):
+            parts.append((self.text[last:match.start()], match.group(1)))
+            last = match.end()
+        parts.append((self.text[last:], None))
+        self._parts: Tuple[Tuple[str, Optional[str]], ...] = tuple(parts)
+        self.placeholders = frozenset(name for _, name in parts if name)
+
+    def render(self, values: Optional[Mapping[str, Any]] = None) -> str:
+        if not self.placeholders or not values:
+            return self.text
+        out = []
+        for literal, name in self._parts:
+            out.append(literal)
+            if name is not None:
+                out.append(str(values[name]) if name in values else "{" + name + "}")
+        return "".join(out)
+
+
+@dataclass(frozen=True)
+class PromptEntry:
+    id: int  # PromptConfigurationsVersion.Id, the PromptId stored on ConversationPrompt
+    name: str
+    version: Optional[int]
+    history_id: int
+    model: Optional[str]
+    template: PromptTemplate
+    chat_parameters: Any
+    configurations: Any
+    role_access: Any
+    is_reading_cache: bool
+    is_writing_cache: bool
+
+    @property
+    def system_prompt(self) -> str:
+        return self.template.text
+
+
+@dataclass(frozen=True)
+class PromptSnapshot:
+    # Active version of every prompt by name
+    by_name: Mapping[str, PromptEntry] = field(default_factory=lambda: MappingProxyType({}))
+    # PromptConfigurationsVersion.Id -> prompt name
+    names_by_id: Mapping[int, str] = field(default_factory=lambda: MappingProxyType({}))
+    # Every published version by (name, VersionNumber)
+    by_version: Mapping[Tuple[str, int], PromptEntry] = field(default_factory=lambda: MappingProxyType({}))
+    version: Optional[Tuple] = None
+    loaded_at: Optional[datetime] = None
+
+    def get(self, name: str, version: Optional[int] = None) -> Optional[PromptEntry]:
+        if version is None or version == "":
+            return self.by_name.get(name)
+        try:
+            return self.by_version.get((name, int(version)))
+        except (TypeError, ValueError):
+            return None
+
+    def get_name(self, prompt_id: int) -> Optional[str]:
+        try:
+            return self.names_by_id.get(int(prompt_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_by_id(self, prompt_id: int, version: Optional[int] = None) -> Optional[PromptEntry]:
+        name = self.get_name(prompt_id)
+        return self.get(name, version) if name is not None else None
+
+
+async def load_prompts(db, version: Optional[Tuple] = None) -> PromptSnapshot:
+    prompts, history = await crud.get_prompt_configurations(db)
+    ids = {prompt.name: prompt.Id for prompt in prompts}
+    entries: Dict[int, PromptEntry] = {}
+    by_version: Dict[Tuple[str, int], PromptEntry] = {}
+    for row in history:
+        entry = PromptEntry(
+            id=ids.get(row.name), name=row.name, version=row.VersionNumber, history_id=row.Id, model=row.model,
+            template=PromptTemplate(row.systemPrompt),
+            chat_parameters=freeze(parse_json_text(row.chatParameters)),
+            configurations=freeze(parse_json_text(row.configurations)),
+            role_access=freeze(parse_json_text(row.RoleAccess)),
+            is_reading_cache=bool(row.isReadingCache), is_writing_cache=bool(row.isWritingCache),
+        )
+        entries[row.Id] = entry
+        if row.VersionNumber is not None:
+            by_version[(row.name, int(row.VersionNumber))] = entry
+    by_name = {prompt.name: entries[prompt.PromptHistoryId] for prompt in prompts if prompt.PromptHistoryId in entries}
+    return PromptSnapshot(
+        by_name=MappingProxyType(by_name),
+        names_by_id=MappingProxyType({prompt_id: name for name, prompt_id in ids.items()}),
+        by_version=MappingProxyType(by_version),
+        version=version,
+        loaded_at=datetime.now(),
+    )
+
+
+class PromptRegistry:
+    """
+        Every prompt and all of its published versions, with chatParameters
+        and configurations pre-parsed and system prompts compiled, resolved
+        by name or by id/version with dictionary lookups. A background task
+        checks PromptConfigurationsHistory/Version every `refresh_interval`
+        seconds and replaces the whole snapshot in one assignment when a
+        version is published or activated, so a lookup sees either the old
+        set of prompts or the new one, never a mix.
+    """
+
+    def __init__(self, refresh_interval: float = PROMPT_REGISTRY_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._snapshot = PromptSnapshot()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._checked_at = float("-inf")
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "checks": 0, "refresh_errors": 0, "last_refresh_seconds": 0.0}
+
+    def current(self) -> PromptSnapshot:
+        return self._snapshot
+
+    def _count(self, entry: Optional[PromptEntry]) -> Optional[PromptEntry]:
+        self.stats["hits" if entry is not None else "misses"] += 1
+        return entry
+
+    async def _recheck(self) -> Optional[PromptSnapshot]:
+        # Published since the last check, or the initial load failed
+        if time.monotonic() - self._checked_at < MISS_RECHECK_SECONDS:
+            return None
+        try:
+            return await self.refresh()
+        except Exception as e:
+            self.stats["refresh_errors"] += 1
+            logging.warning(f"Prompt registry refresh failed: {e}")
+            return None
+
+    async def get(self, name: str, version: Optional[int] = None) -> Optional[PromptEntry]:
+        entry = self._snapshot.get(name, version)
+        if entry is None:
+            snapshot = await self._recheck()
+            entry = snapshot.get(name, version) if snapshot is not None else None
+        return self._count(entry)
+
+    async def get_by_id(self, prompt_id: int, version: Optional[int] = None) -> Optional[PromptEntry]:
+        entry = self._snapshot.get_by_id(prompt_id, version)
+        if entry is None:
+            snapshot = await self._recheck()
+            entry = snapshot.get_by_id(prompt_id, version) if snapshot is not None else None
+        return self._count(entry)
+
+    async def get_name(self, prompt_id: int) -> Optional[str]:
+        """Name of the prompt whatever its version, like the former get_promptname_by_id query."""
+        name = self._snapshot.get_name(prompt_id)
+        if name is None:
+            snapshot = await self._recheck()
+            name = snapshot.get_name(prompt_id) if snapshot is not None else None
+        return name
+
+    async def refresh(self, force: bool = False) -> PromptSnapshot:
+        async with self._lock:
+            started = time.perf_counter()
+            self._checked_at = time.monotonic()
+            async with AsyncSessionLocal() as db:
+                self.stats["checks"] += 1
+                version = await crud.get_prompt_configurations_version(db)
+                if force or version != self._snapshot.version:
+                    self._snapshot = await load_prompts(db, version)
+                    self.stats["loads"] += 1
+                    self.stats["last_refresh_seconds"] = time.perf_counter() - started
+            return self._snapshot
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.stats["refresh_errors"] += 1
+                logging.warning(f"Prompt registry refresh failed, keeping the current prompts: {e}")
+
+    async def start(self):
+        try:
+            await self.refresh(force=True)
+        except Exception as e:
+            self.stats["refresh_errors"] += 1
+            logging.warning(f"Initial prompt registry load failed: {e}")
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            **self.stats,
+            "prompts": len(snapshot.by_name),
+            "versions": len(snapshot.by_version),
+            "active_versions": {name: entry.version for name, entry in snapshot.by_name.items()},
+            "loaded_at": snapshot.loaded_at.isoformat() if snapshot.loaded_at else None,
+        }
+
+
+prompt_registry = PromptRegistry()
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.DB import crud
+from app.DB.database import AsyncSessionLocal
+from app.Service.llmClient import create_chat_completion
+from app.Service.responseCache import CacheHit, normalize_text
+from app.extractEnvVariables import (
+    CHAT_MODEL, CHAT_PARAMS, CHAT_PROMPT_NAME, QUESTION_WARMING_ENABLED, QUESTION_WARMING_CHECK_INTERVAL,
+    QUESTION_WARMING_CONCURRENCY, QUESTION_WARMING_MAX_AGE
+)
+
+
+@dataclass(frozen=True)
+class WarmAnswer:
+    reply: str
+    prompt_version: Optional[int]
+    warmed_at: float  # epoch seconds
+    latency: float
+
+
+def _scope_matches(value: Optional[str], requested: Optional[str]) -> bool:
+    # An empty Platform/UserRole on the question, or none on the request, matches everything
+    return not value or not requested or value.strip().casefold() == requested.strip().casefold()
+
+
+class QuestionWarmer:
+    """
+        Precomputed first-turn answers for the active Questions. A background
+        task checks the Questions table and the active version of the chat
+        prompt every `check_interval` seconds and answers whatever is missing,
+        stale (older prompt version) or older than `max_age`, at most
+        `concurrency` LLM calls at a time. Answers are stored per question
+        text and prompt version, so a question listed for several roles or
+        platforms is answered once; Platform/UserRole only decide which
+        requests may be served from it. Lookups never touch the database.
+    """
+
+    def __init__(self, enabled: bool = QUESTION_WARMING_ENABLED, check_interval: float = QUESTION_WARMING_CHECK_INTERVAL,
+                 concurrency: int = QUESTION_WARMING_CONCURRENCY, max_age: float = QUESTION_WARMING_MAX_AGE,
+                 prompt_name: str = CHAT_PROMPT_NAME):
+        self.enabled = enabled
+        self.check_interval = check_interval
+        self.concurrency = concurrency
+        self.max_age = max_age
+        self.prompt_name = prompt_name
+        self.prompt_version: Optional[int] = None
+        # normalized question -> (question text, [(Platform, UserRole), ...])
+        self._catalog: Dict[str, Tuple[str, List[Tuple[Optional[str], Optional[str]]]]] = {}
+        self._answers: Dict[str, WarmAnswer] = {}
+        self._version = None
+        self._pending = 0
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.stats = {"hits": 0, "warmed": 0, "failed": 0, "runs": 0, "check_errors": 0, "last_run_seconds": 0.0}
+
+    def peek(self, text: str, platform: Optional[str] = None, role: Optional[str] = None) -> Optional[CacheHit]:
+        """Like lookup, but not counted as a hit (the prefetch path checks on every keystroke)."""
+        key = normalize_text(text)
+        entry = self._catalog.get(key)
+        if entry is None or not any(_scope_matches(p, platform) and _scope_matches(r, role) for p, r in entry[1]):
+            return None
+        answer = self._answers.get(key)
+        if answer is None or answer.prompt_version != self.prompt_version:
+            return None
+        return CacheHit(reply=answer.reply, tier="warm")
+
+    def lookup(self, text: str, platform: Optional[str] = None, role: Optional[str] = None) -> Optional[CacheHit]:
+        hit = self.peek(text, platform, role)
+        if hit is not None:
+            self.stats["hits"] += 1
+        return hit
+
+    def _needs_warming(self, key: str, now: float) -> bool:
+        answer = self._answers.get(key)
+        return (answer is None or answer.prompt_version != self.prompt_version
+                or (self.max_age > 0 and now - answer.warmed_at > self.max_age))
+
+    async def refresh(self, force: bool = False):
+        """Reloads the catalog when Questions or the prompt version changed, then warms what needs it."""
+        async with self._lock:
+            async with AsyncSessionLocal() as db:
+                version = await crud.get_questions_version(db, self.prompt_name)
+                if force or version != self._version:
+                    catalog: Dict[str, Tuple[str, list]] = {}
+                    for question in await crud.get_active_questions(db):
+                        if question.Question and question.Question.strip():
+                            entry = catalog.setdefault(normalize_text(question.Question), (question.Question, []))
+                            entry[1].append((question.Platform, question.UserRole))
+                    self._catalog, self.prompt_version, self._version = catalog, version[2], version
+                    # Answers of questions no longer in the catalog are dropped
+                    self._answers = {k: a for k, a in self._answers.items() if k in catalog}
+            await self._warm()
+
+    async def _warm(self):
+        now = time.time()
+        todo = [(key, text) for key, (text, _) in self._catalog.items() if self._needs_warming(key, now)]
+        if not todo:
+            return
+        started = time.perf_counter()
+        self._pending = len(todo)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        prompt_version = self.prompt_version
+
+        async def warm_one(key: str, text: str):
+            async with semaphore:
+                call_started = time.perf_counter()
+                try:
+                    # Same messages as the first turn of a new session, so the answer is what the user would get
+                    response = await create_chat_completion(
+                        stage="Warm", prompt_version=prompt_version, model=CHAT_MODEL,
+                        messages=[{"role": "user", "content": text}], **CHAT_PARAMS
+                    )
+                    reply = response.choices[0].message.content
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logging.warning(f"Could not warm the answer to question {text!r}: {e}")
+                    return
+                finally:
+                    self._pending -= 1
+                if reply:
+                    self._answers[key] = WarmAnswer(reply, prompt_version, time.time(), time.perf_counter() - call_started)
+                    self.stats["warmed"] += 1
+
+        await asyncio.gather(*(warm_one(key, text) for key, text in todo))
+        self.stats["runs"] += 1
+        self.stats["last_run_seconds"] = time.perf_counter() - started
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.stats["check_errors"] += 1
+                logging.warning(f"Question warming check failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            # Warming runs in the background; until it finishes, questions go to the LLM as usual
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        now = time.time()
+        fresh = [a for k, a in self._answers.items() if k in self._catalog and a.prompt_version == self.prompt_version]
+        questions = len(self._catalog)
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "prompt_version": self.prompt_version,
+            "questions": questions,
+            "warm": len(fresh),
+            "stale": questions - len(fresh),
+            "pending": self._pending,
+            "progress": len(fresh) / questions if questions else 1.0,
+            "oldest_answer_seconds": now - min(a.warmed_at for a in fresh) if fresh else 0.0,
+        }
+
+
+question_warmer = QuestionWarmer()
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.extractEnvVariables import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_SEMANTIC, RESPONSE_CACHE_EMBEDDING_MODEL, RESPONSE_CACHE_SIMILARITY_THRESHOLD
+)
+from app.Service.llmClient import aiClient
+from app.Service.promptRegistry import prompt_registry
+from app.Utils.lruCache import LRUTTLCache
+
+Message = Dict[str, str]
+
+_whitespace = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    read: bool = False
+    write: bool = False
+    prompt_version: Optional[int] = None
+    prompt_id: Optional[int] = None  # PromptConfigurationsVersion.Id, stored as ConversationPrompt.PromptId
+
+
+@dataclass
+class CacheHit:
+    reply: str
+    tier: str  # "exact" or "semantic"
+    similarity: float = 1.0
+
+
+def normalize_text(text: str) -> str:
+    return _whitespace.sub(" ", text or "").strip().casefold()
+
+
+def normalize_messages(messages: List[Message]) -> List[Tuple[str, str]]:
+    return [(m.get("role", ""), normalize_text(m.get("content", ""))) for m in messages]
+
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()).hexdigest()
+
+
+def exact_key(model: str, prompt_version: Optional[int], messages: List[Message], params: Dict) -> str:
+    return _digest([model, prompt_version, normalize_messages(messages), params])
+
+
+def context_key(model: str, prompt_version: Optional[int], messages: List[Message], params: Dict) -> str:
+    # Everything except the last user message; semantic matches are only looked up within one context
+    return _digest([model, prompt_version, normalize_messages(messages[:-1]), params])
+
+
+class VectorIndex:
+    """
+        In-process cosine-similarity index, partitioned by context key. Vectors
+        are stored unit-normalized so a dot product gives the similarity.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        import numpy as np
+        self._np = np
+        self._entries = LRUTTLCache(max_entries, ttl_seconds, on_evict=self._evicted)  # entry id -> (partition, vector, reply, latency)
+        self._partitions: Dict[str, Dict[str, object]] = {}  # partition -> {entry id: vector}
+        self._matrices: Dict[str, tuple] = {}                # partition -> (ids, stacked vectors)
+
+    def _evicted(self, entry_id: str, entry: tuple):
+        partition = entry[0]
+        members = self._partitions.get(partition)
+        if members is not None:
+            members.pop(entry_id, None)
+            if not members:
+                del self._partitions[partition]
+        self._matrices.pop(partition, None)
+
+    def add(self, partition: str, entry_id: str, vector: List[float], reply: str, latency: float = 0.0):
+        np = self._np
+        v = np.asarray(vector, dtype=np.float32)
+        v /= (np.linalg.norm(v) or 1.0)
+        self._entries.set(entry_id, (partition, v, reply, latency))
+        self._partitions.setdefault(partition, {})[entry_id] = v
+        self._matrices.pop(partition, None)
+
+    def search(self, partition: str, vector: List[float], threshold: float = -1.0) -> Optional[Tuple[str, float, float]]:
+        """Best live entry scoring at least `threshold`, as (reply, similarity, latency)."""
+        np = self._np
+        members = self._partitions.get(partition)
+        if not members:
+            return None
+        matrix = self._matrices.get(partition)
+        if matrix is None:
+            ids = list(members)
+            matrix = (ids, np.stack([members[i] for i in ids]))
+            self._matrices[partition] = matrix
+        ids, vectors = matrix
+        q = np.asarray(vector, dtype=np.float32)
+        q /= (np.linalg.norm(q) or 1.0)
+        scores = vectors @ q
+        # Expired entries are only noticed on access (their eviction hook drops the stale matrix),
+        # so candidates are tried best first until a live one is found
+        candidates = np.flatnonzero(scores >= threshold)
+        for index in candidates[np.argsort(-scores[candidates], kind="stable")]:
+            entry = self._entries.get(ids[index])
+            if entry is not None:
+                return entry[2], float(scores[index]), entry[3]
+        return None
+
+
+class ResponseCache:
+    """
+        Exact-match tier keyed on model, prompt version, normalized messages and
+        sampling parameters, plus an optional embedding-similarity tier over the
+        last user message. Both tiers are bounded by LRU size and TTL.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 semantic: bool = RESPONSE_CACHE_SEMANTIC, similarity_threshold: float = RESPONSE_CACHE_SIMILARITY_THRESHOLD):
+        self.exact = LRUTTLCache(max_entries, ttl_seconds)
+        self.vectors = VectorIndex(max_entries, ttl_seconds) if semantic else None
+        self.similarity_threshold = similarity_threshold
+        # Vectors of recently embedded messages: a miss embeds the user message in lookup() and
+        # store() of the same turn reuses it instead of a second embeddings call
+        self._embeddings = LRUTTLCache(1024, 300)
+        self.stats = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "writes": 0, "embeddings": 0,
+                      "latency_saved_seconds": 0.0}
+
+    async def embed(self, text: str) -> List[float]:
+        text = normalize_text(text)
+        vector = self._embeddings.get(text)
+        if vector is None:
+            response = await aiClient.embeddings.create(model=RESPONSE_CACHE_EMBEDDING_MODEL, input=text)
+            vector = response.data[0].embedding
+            self._embeddings.set(text, vector)
+            self.stats["embeddings"] += 1
+        return vector
+
+    async def get_policy(self, prompt_name: str) -> CachePolicy:
+        """
+            Per-prompt opt-in from the isReadingCache/isWritingCache flags of its
+            active version. The prompt id and version are resolved even with the
+            cache disabled, since the conversation records need them.
+        """
+        prompt = await prompt_registry.get(prompt_name)
+        if prompt is None:
+            return CachePolicy()
+        return CachePolicy(
+            read=RESPONSE_CACHE_ENABLED and prompt.is_reading_cache, write=RESPONSE_CACHE_ENABLED and prompt.is_writing_cache,
+            prompt_version=prompt.version, prompt_id=prompt.id
+        )
+
+    async def lookup(self, policy: CachePolicy, model: str, messages: List[Message], params: Dict) -> Optional[CacheHit]:
+        if not policy.read:
+            return None
+        self.stats["lookups"] += 1
+        hit = self.exact.get(exact_key(model, policy.prompt_version, messages, params))
+        if hit is not None:
+            self.stats["exact_hits"] += 1
+            self.stats["latency_saved_seconds"] += hit[1]
+            return CacheHit(reply=hit[0], tier="exact")
+        if self.vectors is None or not messages or messages[-1].get("role") != "user":
+            return None
+        try:
+            vector = await self.embed(messages[-1]["content"])
+        except Exception as e:
+            logging.warning(f"Semantic cache lookup skipped: {e}")
+            return None
+        found = self.vectors.search(context_key(model, policy.prompt_version, messages, params), vector, self.similarity_threshold)
+        if found is not None:
+            self.stats["semantic_hits"] += 1
+            self.stats["latency_saved_seconds"] += found[2]
+            return CacheHit(reply=found[0], tier="semantic", similarity=found[1])
+        return None
+
+    def peek(self, policy: CachePolicy, model: str, messages: List[Message], params: Dict) -> Optional[CacheHit]:
+        """
+            Exact tier only and not counted in the stats: cheap enough to run on
+            every prefetch keystroke, where an embeddings call per request is not.
+        """
+        if not policy.read:
+            return None
+        hit = self.exact.get(exact_key(model, policy.prompt_version, messages, params))
+        return CacheHit(reply=hit[0], tier="exact") if hit is not None else None
+
+    async def store(self, policy: CachePolicy, model: str, messages: List[Message], params: Dict, reply: str, latency: float = 0.0):
+        if not policy.write or not reply:
+            return
+        key = exact_key(model, policy.prompt_version, messages, params)
+        self.exact.set(key, (reply, latency))
+        self.stats["writes"] += 1
+        if self.vectors is not None and messages and messages[-1].get("role") == "user":
+            try:
+                vector = await self.embed(messages[-1]["content"])
+            except Exception as e:
+                logging.warning(f"Semantic cache write skipped: {e}")
+                return
+            self.vectors.add(context_key(model, policy.prompt_version, messages, params), key, vector, reply, latency)
+
+    def hit_rate(self) -> float:
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        return hits / self.stats["lookups"] if self.stats["lookups"] else 0.0
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,377 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+from app.Service.chatHistory import ChatHistory
+from app.extractEnvVariables import SESSION_STORE_BACKEND, SESSION_MAX_SESSIONS, SESSION_TTL_SECONDS, SESSION_SQLITE_PATH, REDIS_URL
+
+Message = Dict[str, str]
+
+
+class SessionStore(ABC):
+    """
+        Chat history storage keyed by session id.
+
+        Callers hold `lock(session_id)` around a whole turn (read history,
+        call the LLM, append the new messages) so concurrent requests on one
+        session are applied one after another instead of interleaving. The
+        cross-process locks are leases, renewed while the turn runs.
+    """
+
+    def __init__(self):
+        # In-process locks, dropped automatically once nobody holds or waits on them
+        self._local_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _local_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._local_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._local_locks[session_id] = lock
+        return lock
+
+    @asynccontextmanager
+    async def lock(self, session_id: str) -> AsyncIterator[None]:
+        async with self._local_lock(session_id):
+            yield
+
+    @asynccontextmanager
+    async def _renewing(self, session_id: str, renew, interval: float) -> AsyncIterator[None]:
+        # A turn may outlast the lease (slow or streamed LLM call), so it is extended until the turn ends
+        async def keep_alive():
+            while True:
+                await asyncio.sleep(interval)
+                if not await renew():
+                    logging.warning(f"Lost the lock of session {session_id} before the turn finished")
+                    return
+
+        task = asyncio.create_task(keep_alive())
+        try:
+            yield
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Sequence[Message]:
+        """
+            Returns the history of a session, empty if it is unknown or expired.
+            It is a snapshot: later appends don't show up in it.
+        """
+
+    @abstractmethod
+    async def append(self, session_id: str, messages: List[Message]):
+        """Appends messages to a session, creating it if needed and refreshing its TTL."""
+
+    @abstractmethod
+    async def replace(self, session_id: str, messages: List[Message]):
+        """Overwrites the whole history of a session."""
+
+    @abstractmethod
+    async def delete(self, session_id: str):
+        """Removes a session."""
+
+
+class MemorySessionStore(SessionStore):
+    """
+        Per-process store bounded by both a maximum number of sessions (least
+        recently used evicted first) and an idle TTL. Histories are kept as
+        compact ChatHistory logs and handed out as lazy views.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS, ttl_seconds: float = SESSION_TTL_SECONDS):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, List]" = OrderedDict()  # session_id -> [expires_at, ChatHistory]
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _expire(self, now: float):
+        # Entries are kept in touch order, so expired ones are always at the front
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if entry[0] > now:
+                break
+            del self._sessions[session_id]
+
+    def _touch(self, session_id: str) -> Optional[List]:
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            entry[0] = now + self.ttl_seconds
+            self._sessions.move_to_end(session_id)
+        return entry
+
+    async def get(self, session_id: str) -> Sequence[Message]:
+        entry = self._touch(session_id)
+        return entry[1].view() if entry else []
+
+    async def append(self, session_id: str, messages: List[Message]):
+        entry = self._touch(session_id)
+        if entry is None:
+            await self.replace(session_id, messages)
+        else:
+            entry[1].extend(messages)
+
+    async def replace(self, session_id: str, messages: List[Message]):
+        self._sessions[session_id] = [time.monotonic() + self.ttl_seconds, ChatHistory(messages)]
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+        Store shared by every worker on one host. Sessions are locked across
+        processes with a lease row so two workers can't run the same turn.
+    """
+
+    LEASE_SECONDS = 120
+    LEASE_POLL_INTERVAL = 0.05
+
+    def __init__(self, path: str = SESSION_SQLITE_PATH, ttl_seconds: float = SESSION_TTL_SECONDS):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn_lock = threading.Lock()
+        with self._conn_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS chat_messages (
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    message TEXT NOT NULL,
+                    PRIMARY KEY (session_id, seq)
+                );
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_chat_sessions_expires ON chat_sessions (expires_at);
+                CREATE TABLE IF NOT EXISTS chat_session_locks (
+                    session_id TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+            """)
+
+    def _run(self, fn, *args):
+        def locked():
+            with self._conn_lock:
+                return fn(*args)
+        return asyncio.to_thread(locked)
+
+    def _get(self, session_id: str) -> List[Message]:
+        row = self._conn.execute(
+            "SELECT expires_at FROM chat_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or row[0] <= time.time():
+            return []
+        rows = self._conn.execute(
+            "SELECT message FROM chat_messages WHERE session_id = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def _write(self, session_id: str, messages: List[Message], replace: bool):
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Purge a small batch of expired sessions on every write to keep the file bounded
+            expired = [r[0] for r in self._conn.execute(
+                "SELECT session_id FROM chat_sessions WHERE expires_at <= ? LIMIT 100", (now,)
+            )]
+            current = self._conn.execute(
+                "SELECT expires_at FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if replace or (current is not None and current[0] <= now):
+                expired.append(session_id)
+            self._conn.executemany("DELETE FROM chat_messages WHERE session_id = ?", [(s,) for s in expired])
+            self._conn.executemany("DELETE FROM chat_sessions WHERE session_id = ?", [(s,) for s in expired])
+
+            start = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM chat_messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT INTO chat_messages (session_id, seq, message) VALUES (?, ?, ?)",
+                [(session_id, start + i, json.dumps(m)) for i, m in enumerate(messages)]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (session_id, expires_at) VALUES (?, ?)",
+                (session_id, now + self.ttl_seconds)
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _delete(self, session_id: str):
+        self._conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+
+    def _try_lease(self, session_id: str, owner: str) -> bool:
+        now = time.time()
+        self._conn.execute(
+            """INSERT INTO chat_session_locks (session_id, owner, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT(session_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+               WHERE chat_session_locks.expires_at <= ?""",
+            (session_id, owner, now + self.LEASE_SECONDS, now)
+        )
+        row = self._conn.execute(
+            "SELECT owner FROM chat_session_locks WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row is not None and row[0] == owner
+
+    def _renew_lease(self, session_id: str, owner: str) -> bool:
+        cursor = self._conn.execute(
+            "UPDATE chat_session_locks SET expires_at = ? WHERE session_id = ? AND owner = ?",
+            (time.time() + self.LEASE_SECONDS, session_id, owner)
+        )
+        return cursor.rowcount == 1
+
+    def _release_lease(self, session_id: str, owner: str):
+        self._conn.execute(
+            "DELETE FROM chat_session_locks WHERE session_id = ? AND owner = ?", (session_id, owner)
+        )
+
+    @asynccontextmanager
+    async def lock(self, session_id: str) -> AsyncIterator[None]:
+        async with self._local_lock(session_id):
+            owner = uuid.uuid4().hex
+            while not await self._run(self._try_lease, session_id, owner):
+                await asyncio.sleep(self.LEASE_POLL_INTERVAL)
+            try:
+                async with self._renewing(session_id, lambda: self._run(self._renew_lease, session_id, owner),
+                                          self.LEASE_SECONDS / 3):
+                    yield
+            finally:
+                await self._run(self._release_lease, session_id, owner)
+
+    async def get(self, session_id: str) -> List[Message]:
+        return await self._run(self._get, session_id)
+
+    async def append(self, session_id: str, messages: List[Message]):
+        await self._run(self._write, session_id, messages, False)
+
+    async def replace(self, session_id: str, messages: List[Message]):
+        await self._run(self._write, session_id, messages, True)
+
+    async def delete(self, session_id: str):
+        await self._run(self._delete, session_id)
+
+
+class RedisSessionStore(SessionStore):
+    """
+        Store shared across hosts. Works with any `redis.asyncio`-compatible
+        client, e.g. `fakeredis.aioredis.FakeRedis()` for local testing.
+    """
+
+    KEY_PREFIX = "chat:session:"
+    LOCK_PREFIX = "chat:lock:"
+    LOCK_TIMEOUT = 120
+    LOCK_POLL_INTERVAL = 0.05
+
+    def __init__(self, client=None, ttl_seconds: float = SESSION_TTL_SECONDS):
+        super().__init__()
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(REDIS_URL)
+        self.client = client
+        self.ttl_seconds = int(ttl_seconds)
+
+    @asynccontextmanager
+    async def lock(self, session_id: str) -> AsyncIterator[None]:
+        # The local lock keeps same-process waiters from polling Redis
+        async with self._local_lock(session_id):
+            key = self.LOCK_PREFIX + session_id
+            token = uuid.uuid4().hex
+            while not await self.client.set(key, token, nx=True, px=int(self.LOCK_TIMEOUT * 1000)):
+                await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+            try:
+                async with self._renewing(session_id, lambda: self._renew_lock(key, token), self.LOCK_TIMEOUT / 3):
+                    yield
+            finally:
+                await self._release_lock(key, token)
+
+    async def _renew_lock(self, key: str, token: str) -> bool:
+        async with self.client.pipeline(transaction=True) as pipe:
+            await pipe.watch(key)
+            current = await pipe.get(key)
+            if isinstance(current, bytes):
+                current = current.decode()
+            if current != token:
+                await pipe.unwatch()
+                return False
+            pipe.multi()
+            pipe.pexpire(key, int(self.LOCK_TIMEOUT * 1000))
+            await pipe.execute()
+            return True
+
+    async def _release_lock(self, key: str, token: str):
+        # Compare-and-delete with WATCH/MULTI rather than Lua so simple fakes work too
+        async with self.client.pipeline(transaction=True) as pipe:
+            await pipe.watch(key)
+            current = await pipe.get(key)
+            if isinstance(current, bytes):
+                current = current.decode()
+            if current == token:
+                pipe.multi()
+                pipe.delete(key)
+                await pipe.execute()
+            else:
+                await pipe.unwatch()
+
+    async def get(self, session_id: str) -> List[Message]:
+        key = self.KEY_PREFIX + session_id
+        raw = await self.client.lrange(key, 0, -1)
+        if raw:
+            await self.client.expire(key, self.ttl_seconds)
+        return [json.loads(m) for m in raw]
+
+    async def append(self, session_id: str, messages: List[Message]):
+        if not messages:
+            return
+        key = self.KEY_PREFIX + session_id
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *[json.dumps(m) for m in messages])
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def replace(self, session_id: str, messages: List[Message]):
+        key = self.KEY_PREFIX + session_id
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if messages:
+                pipe.rpush(key, *[json.dumps(m) for m in messages])
+                pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def delete(self, session_id: str):
+        await self.client.delete(self.KEY_PREFIX + session_id)
+
+
+def create_session_store(backend: str = SESSION_STORE_BACKEND) -> SessionStore:
+    backend = backend.lower()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        return RedisSessionStore()
+    if backend == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"Unknown session store backend: {backend}")
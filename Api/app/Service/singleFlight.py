@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+def flight_key(*parts) -> str:
+    """Digest of everything that determines an LLM call's output (model, prompt version, messages, parameters)."""
+    return hashlib.sha256(json.dumps(parts, separators=(",", ":"), sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    __slots__ = ("task", "waiters", "chunks", "done", "error", "_changed")
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self):
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """
+        Lets concurrent identical calls share one execution. The first caller
+        for a key starts the work in its own task; callers arriving while it
+        runs wait on the same task (`do`) or replay and follow the same
+        stream of chunks (`stream`). The shared work is only cancelled once
+        every waiter has gone, so one client disconnecting or timing out
+        doesn't fail the others. Finished calls are forgotten immediately;
+        this coalesces, it does not cache.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def in_flight(self) -> int:
+        return len(self._flights) + len(self._streams)
+
+    def _forget(self, flights: dict, key: str, flight):
+        if flights.get(key) is flight:
+            del flights[key]
+
+    async def do(self, key: str, factory: Callable[[], Awaitable]):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(factory()))
+            flight.task.add_done_callback(lambda _: self._forget(self._flights, key, flight))
+            self.stats["calls"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Forget it now so a caller arriving before the cancellation lands starts afresh
+                self._forget(self._flights, key, flight)
+                flight.task.cancel()
+
+    async def _pump(self, key: str, flight: _StreamFlight, factory: Callable[[], AsyncIterator]):
+        chunks = factory()
+        try:
+            async for chunk in chunks:
+                flight.chunks.append(chunk)
+                flight.notify()
+        except BaseException as e:
+            flight.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            await chunks.aclose()
+            flight.done = True
+            self._forget(self._streams, key, flight)
+            flight.notify()
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """Chunks of the shared stream from the first one on, so late joiners get the full reply."""
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = self._streams[key] = _StreamFlight()
+            flight.task = asyncio.ensure_future(self._pump(key, flight, factory))
+            self.stats["calls"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        flight.waiters += 1
+        sent = 0
+        try:
+            while True:
+                if sent < len(flight.chunks):
+                    sent += 1
+                    yield flight.chunks[sent - 1]
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await flight.wait()
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(self._streams, key, flight)
+                flight.task.cancel()
+
+
+llm_single_flight = SingleFlight()
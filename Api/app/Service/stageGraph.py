@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from app.Utils.metrics import STAGE_SECONDS
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+        One step of a chat turn. `run` is called with the results of `inputs`
+        (other stages or seed values passed to StageGraph.run) as keyword
+        arguments. A stage that fails or exceeds `timeout` either fails the
+        whole run (`required`) or resolves to `fallback`, which its
+        dependants then receive instead of a result.
+    """
+    name: str
+    run: Callable[..., Awaitable[Any]]
+    inputs: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    required: bool = True
+    fallback: Any = None
+
+
+@dataclass
+class StageResult:
+    name: str
+    value: Any = None
+    error: Optional[BaseException] = None
+    started_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.ended_at is not None
+
+
+class StageFailed(Exception):
+    """A required stage failed; `results` holds every stage that finished before the run was abandoned."""
+
+    def __init__(self, stage: str, error: BaseException, results: Dict[str, StageResult]):
+        super().__init__(f"Stage {stage} failed: {error}")
+        self.stage = stage
+        self.error = error
+        self.results = results
+
+
+class StageGraph:
+    """
+        Runs stages as soon as all of their inputs are available, so
+        independent stages overlap and a turn takes as long as its critical
+        path instead of the sum of its stages. The graph is checked for
+        unknown inputs and cycles once, when it is built.
+    """
+
+    def __init__(self, stages: Iterable[Stage], seeds: Iterable[str] = ()):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage {stage.name}")
+            self.stages[stage.name] = stage
+        self.seeds = frozenset(seeds)
+        known = self.seeds | set(self.stages)
+        for stage in self.stages.values():
+            missing = [name for name in stage.inputs if name not in known]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown inputs {missing}")
+        self._check_acyclic()
+        self._timers = {name: STAGE_SECONDS.labels(name) for name in self.stages}
+
+    def _check_acyclic(self):
+        done = set(self.seeds)
+        pending = dict(self.stages)
+        while pending:
+            ready = [name for name, stage in pending.items() if all(i in done for i in stage.inputs)]
+            if not ready:
+                raise ValueError(f"Stages {sorted(pending)} depend on each other")
+            for name in ready:
+                done.add(name)
+                del pending[name]
+
+    async def _run_stage(self, stage: Stage, kwargs: Dict[str, Any], result: StageResult):
+        result.started_at = datetime.now()
+        with self._timers[stage.name].time():
+            try:
+                if stage.timeout is not None:
+                    result.value = await asyncio.wait_for(stage.run(**kwargs), stage.timeout)
+                else:
+                    result.value = await stage.run(**kwargs)
+            finally:
+                result.ended_at = datetime.now()
+
+    async def run(self, **seeds) -> Dict[str, StageResult]:
+        missing = self.seeds - set(seeds)
+        if missing:
+            raise ValueError(f"Missing seed values {sorted(missing)}")
+        values: Dict[str, Any] = dict(seeds)
+        results: Dict[str, StageResult] = {}
+        pending = dict(self.stages)
+        running: Dict[asyncio.Task, Stage] = {}
+        try:
+            while pending or running:
+                for name in [n for n, s in pending.items() if all(i in values for i in s.inputs)]:
+                    stage = pending.pop(name)
+                    results[name] = StageResult(name)
+                    kwargs = {i: values[i] for i in stage.inputs}
+                    running[asyncio.ensure_future(self._run_stage(stage, kwargs, results[name]))] = stage
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    result = results[stage.name]
+                    error = asyncio.CancelledError() if task.cancelled() else task.exception()
+                    if error is None:
+                        values[stage.name] = result.value
+                        continue
+                    result.error = error
+                    if stage.required:
+                        raise StageFailed(stage.name, error, results)
+                    kind = "timed out" if isinstance(error, asyncio.TimeoutError) else f"failed: {error!r}"
+                    logging.warning(f"Optional stage {stage.name} {kind}; continuing without it")
+                    result.value = values[stage.name] = stage.fallback
+        finally:
+            # A required failure or a cancelled turn: stages still running have no one to report to
+            for task, stage in running.items():
+                if not task.done():
+                    task.cancel()
+                    results[stage.name].error = asyncio.CancelledError()
+        return results
@@ -0,0 +1,12 @@
+import secrets
+from typing import Optional
+from fastapi import Header, HTTPException
+from app.extractEnvVariables import ADMIN_API_KEY
+
+
+async def require_admin_key(x_admin_key: Optional[str] = Header(None)):
+    """Dependency of the operational endpoints that reload state or start LLM calls."""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_API_KEY to enable them")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Key")
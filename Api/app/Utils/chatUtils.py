@@ -0,0 +1,17 @@
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+# Per-request warnings raised deep in the pipeline and surfaced with the reply
+_warning_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("warning_context", default=None)
+
+
+def set_warning_context(warning: Dict[str, Any]):
+    _warning_context.set(warning)
+
+
+def get_warning_context() -> Optional[Dict[str, Any]]:
+    return _warning_context.get()
+
+
+def clear_warning_context():
+    _warning_context.set(None)
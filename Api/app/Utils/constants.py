@@ -0,0 +1,8 @@
+# Debug trace files
+TimeStampFormat = "%Y%m%d_%H%M%S_%f"
+BasePath = "./debug_responses"
+
+# Prompt names of the LLM pipeline stages (PromptConfigurationsVersion.name)
+LLM0_promptModel = "LLM0"
+LLM1_promptModel = "LLM1"
+LLM2_promptModel = "LLM2"
@@ -0,0 +1,63 @@
+import json
+import math
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output shape
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # Read-only views handed out by the configuration snapshot
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (datetime, date)):
+        # orjson writes these natively
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _finite(value: Any) -> Any:
+    # orjson writes NaN and +/-Infinity as null; the json module has no hook for floats
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, Mapping):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def _stdlib_dumps(value: Any) -> str:
+    return json.dumps(value, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def dumps_bytes(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    try:
+        return _stdlib_dumps(value).encode("utf-8")
+    except ValueError:
+        # Non-finite floats are rare, so the value is only walked when one was found
+        return _stdlib_dumps(_finite(value)).encode("utf-8")
+
+
+def dumps(value: Any) -> str:
+    return dumps_bytes(value).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
@@ -0,0 +1,86 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Tuple
+from app.Utils import jsonCodec
+
+_opener = re.compile(r"[\[{]|```")
+_structural = re.compile(r'[\[\]{}"]')
+_CLOSERS = {"]": "[", "}": "{"}
+
+
+@dataclass(frozen=True)
+class JsonBlock:
+    value: Any
+    start: int
+    end: int      # exclusive
+    fenced: bool  # directly inside a ``` or ```json fence
+
+
+class _Open:
+    __slots__ = ("char", "start", "children")
+
+    def __init__(self, char: str, start: int):
+        self.char = char
+        self.start = start
+        self.children: List[Tuple[int, int, list]] = []  # balanced spans closed directly inside this one
+
+
+def _resolve(text: str, span: Tuple[int, int, list], fenced: bool) -> Iterator[JsonBlock]:
+    """Parses a balanced span; when it is not valid JSON (e.g. braces in prose), tries its children."""
+    pending = [span]
+    while pending:
+        start, end, children = pending.pop()
+        try:
+            value = jsonCodec.loads(text[start:end])
+        except (ValueError, RecursionError):
+            pending.extend(reversed(children))
+            continue
+        yield JsonBlock(value, start, end, fenced)
+
+
+def iter_json_blocks(text: str) -> Iterator[JsonBlock]:
+    """
+        Yields every outermost JSON object or array in `text`, fenced or bare,
+        in order. Brackets are matched in one pass that skips over string
+        literals (honouring escapes), so the cost is linear in the length of
+        the text plus one parse per candidate block.
+    """
+    stack: List[_Open] = []
+    in_fence = False  # between an opening and a closing ``` outside any bracket
+    pos = 0
+    n = len(text)
+    while pos < n:
+        match = (_structural if stack else _opener).search(text, pos)
+        if match is None:
+            break
+        c = match.group()
+        pos = match.end()
+        if c == "```":
+            in_fence = not in_fence
+        elif c == "[" or c == "{":
+            stack.append(_Open(c, match.start()))
+        elif c == '"':
+            # Skip to the closing quote, ignoring quotes preceded by an odd number of backslashes
+            while True:
+                quote = text.find('"', pos)
+                if quote == -1:
+                    pos = n
+                    break
+                backslash = quote - 1
+                while text[backslash] == "\\":
+                    backslash -= 1
+                pos = quote + 1
+                if (quote - 1 - backslash) % 2 == 0:
+                    break
+        elif stack[-1].char == _CLOSERS[c]:
+            opened = stack.pop()
+            span = (opened.start, pos, opened.children)
+            if stack:
+                stack[-1].children.append(span)
+            else:
+                yield from _resolve(text, span, in_fence)
+        # A mismatched closer is treated as prose inside the open span
+    # Spans left open at the end of the text never close; their finished children still count
+    for opened in stack:
+        for child in opened.children:
+            yield from _resolve(text, child, in_fence)
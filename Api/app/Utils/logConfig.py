@@ -0,0 +1,200 @@
+import atexit
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+from app.Utils import jsonCodec
+from app.extractEnvVariables import (
+    api_key, LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_PAYLOAD_SAMPLE_RATE, LOG_PAYLOAD_MAX_CHARS, LOG_REDACT_FIELDS
+)
+
+# Correlation fields of the current request (session_id, request_id, ...) and whether its payloads are sampled
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+_payload_sampled: ContextVar[bool] = ContextVar("payload_sampled", default=False)
+
+payload_logger = logging.getLogger("chatbot.payload")
+
+REDACTED = "***"
+_REDACT_KEYS = {"api_key", "apikey", "authorization", "password", "secret", "token", "access_token", *LOG_REDACT_FIELDS}
+_secret_patterns = [re.compile(r"sk-[A-Za-z0-9_\-]{8,}"), re.compile(r"(?i)(?<=bearer )[A-Za-z0-9._\-]+")]
+# Placeholder keys ("x" in local runs) would mask every occurrence of that text
+if api_key and len(api_key) >= 8:
+    _secret_patterns.append(re.compile(re.escape(api_key)))
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "context", "payload"}
+
+
+def redact_text(text: str) -> str:
+    for pattern in _secret_patterns:
+        text = pattern.sub(REDACTED, text)
+    return text
+
+
+def redact(value):
+    """Masks values of sensitive keys in nested dicts/lists; strings are left to redact_text."""
+    if isinstance(value, dict):
+        return {k: REDACTED if str(k).lower() in _REDACT_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if hasattr(value, "model_dump"):  # pydantic models, e.g. OpenAI responses
+        return redact(value.model_dump())
+    return value
+
+
+def bind_log_context(**fields):
+    """Adds correlation fields to every record logged by the current request (task)."""
+    _log_context.set({**_log_context.get(), **fields})
+
+
+def new_request_context(request_id: Optional[str] = None) -> str:
+    request_id = request_id or uuid.uuid4().hex
+    _log_context.set({"request_id": request_id})
+    _payload_sampled.set(LOG_PAYLOAD_SAMPLE_RATE > 0 and random.random() < LOG_PAYLOAD_SAMPLE_RATE)
+    return request_id
+
+
+def log_payload(message: str, payload: Any):
+    """
+        Logs a full payload (chat history, LLM response, ...) at DEBUG for the
+        sampled share of requests. Serialization and redaction happen on the
+        listener thread, so pass values that are not mutated afterwards.
+    """
+    if _payload_sampled.get() and payload_logger.isEnabledFor(logging.DEBUG):
+        payload_logger.debug(message, extra={"payload": payload})
+
+
+class _ContextFilter(logging.Filter):
+    # Runs in the emitting task, where the request's context variables are visible
+    def filter(self, record):
+        record.context = _log_context.get()
+        return True
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: records are dropped (and counted) when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _payload_text(payload) -> str:
+    text = payload if isinstance(payload, str) else jsonCodec.dumps(redact(payload))
+    if len(text) > LOG_PAYLOAD_MAX_CHARS:
+        text = text[:LOG_PAYLOAD_MAX_CHARS] + f"...[{len(text) - LOG_PAYLOAD_MAX_CHARS} more chars]"
+    return text
+
+
+def _redact_extra(key: str, value):
+    """Masks an `extra=` field the way the message and payload are masked: by key name, then by content."""
+    if str(key).lower() in _REDACT_KEYS:
+        return REDACTED
+    value = redact(value)
+    if isinstance(value, str):
+        return redact_text(value)
+    if isinstance(value, (dict, list)):
+        return jsonCodec.loads(redact_text(jsonCodec.dumps(value)))
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact_text(record.getMessage()),
+            **getattr(record, "context", {}),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = _redact_extra(key, value)
+        if getattr(record, "payload", None) is not None:
+            entry["payload"] = redact_text(_payload_text(record.payload))
+        return jsonCodec.dumps(entry)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record):
+        line = redact_text(super().format(record))
+        context = " ".join(f"{k}={v}" for k, v in getattr(record, "context", {}).items())
+        if context:
+            line += f" [{context}]"
+        if getattr(record, "payload", None) is not None:
+            line += " " + redact_text(_payload_text(record.payload))
+        return line
+
+
+_listener: Optional[QueueListener] = None
+queue_handler: Optional[_DroppingQueueHandler] = None
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """
+        Routes the root logger through a bounded queue to a listener thread,
+        which formats (JSON or text), redacts and writes to stderr. Logging
+        call sites only pay for creating the record and enqueueing it.
+    """
+    global _listener, queue_handler
+    if _listener is not None:
+        return
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter() if fmt.lower() == "json" else TextFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = _DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(_ContextFilter())
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Writes out the records still queued and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class CorrelationIdMiddleware:
+    """
+        Gives every HTTP request a request_id (taken from X-Request-Id when the
+        caller sends one), binds it to the log context and echoes it back in
+        the X-Request-Id response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        incoming = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"x-request-id"), None)
+        request_id = new_request_context(incoming[:64] if incoming else None)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_id)
@@ -0,0 +1,203 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Seconds; tuned for LLM calls (hundreds of ms to tens of seconds) and DB queries (ms)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric"):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        registry.register(self)
+
+    def labels(self, *values: str):
+        """Child for these label values; keep the result around on hot paths to skip the lookup."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """State kept for one set of label values."""
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Exposition lines of every child."""
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {child.value}"
+                for values, child in list(self._children.items())]
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: "_HistogramChild"):
+        self._child = child
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(perf_counter() - self._start)
+        return False
+
+
+class _HistogramChild:
+    __slots__ = ("_upper", "counts", "sum", "count")
+
+    def __init__(self, upper: Tuple[float, ...]):
+        self._upper = upper
+        self.counts = [0] * (len(upper) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self._upper, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def samples(self):
+        lines = []
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                bucket_labels = _format_labels(self.labelnames, values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {child.sum}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+        Gauge or counter read at scrape time from state the code keeps anyway
+        (stats dicts, queue sizes), so it costs nothing on the request path.
+        `callback` returns a number, or {label values tuple: number}.
+    """
+
+    def __init__(self, name: str, documentation: str, callback: Callable, labelnames: Sequence[str] = (),
+                 type: str = "gauge", registry: Registry = REGISTRY):
+        self.type = type
+        self.callback = callback
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        raise TypeError(f"{self.name} is read from its callback and has no children to update")
+
+    def samples(self):
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {float(value)}" for key, value in values.items()]
+
+
+# Request path metrics
+
+CHAT_REQUEST_SECONDS = Histogram(
+    "chatbot_chat_request_seconds", "End-to-end latency of chat requests, until the last byte for streams", ["endpoint"]
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "chatbot_llm_request_seconds", "Latency of LLM calls by model and pipeline stage", ["model", "stage"]
+)
+LLM_TOKENS = Counter(
+    "chatbot_llm_tokens_total", "Tokens reported by the LLM API", ["model", "stage", "kind"]
+)
+LLM_ERRORS = Counter(
+    "chatbot_llm_errors_total", "Failed or timed out LLM calls", ["model", "stage"]
+)
+DB_QUERY_SECONDS = Histogram(
+    "chatbot_db_query_seconds", "Latency of database statements by statement type", ["operation"]
+)
+STAGE_SECONDS = Histogram(
+    "chatbot_stage_seconds", "Latency of instrumented pipeline steps", ["function"]
+)
@@ -0,0 +1,62 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+
+# (field id lowercased, label) for every field of an entity-search schema
+SchemaFingerprint = Tuple[Tuple[str, str], ...]
+
+
+def schema_fingerprint(fields: Iterable[Dict[str, Any]]) -> SchemaFingerprint:
+    return tuple((field['id'].lower(), field['label']) for field in fields if 'id' in field and 'label' in field)
+
+
+class RowMapper:
+    """
+        Renames the keys of entity-search result rows to `<id prefix>_<label>`.
+        Keys containing "id" are kept as they are, unknown keys pass through.
+        Output keys are resolved once per distinct row key and reused for
+        every following row.
+    """
+
+    __slots__ = ("id_to_label", "_keys")
+
+    def __init__(self, fingerprint: SchemaFingerprint):
+        # Reverse index field id -> prefixed label. An id declared by several fields maps to the
+        # label that appears first in the schema, not to the first field declaring the id
+        label_to_ids: Dict[str, List[str]] = {}
+        for field_id, label in fingerprint:
+            label_to_ids.setdefault(f"{field_id.split('_')[0]}_{label}", []).append(field_id)
+        self.id_to_label: Dict[str, str] = {}
+        for label, ids in label_to_ids.items():
+            for field_id in ids:
+                self.id_to_label.setdefault(field_id, label)
+        self._keys: Dict[str, str] = {}
+
+    def output_key(self, key: str) -> str:
+        mapped = self._keys.get(key)
+        if mapped is None:
+            lowered = key.lower()
+            mapped = key if 'id' in lowered else self.id_to_label.get(lowered, key)
+            self._keys[key] = mapped
+        return mapped
+
+    def map_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        keys = self._keys
+        try:
+            return {keys[key]: value for key, value in row.items()}
+        except KeyError:
+            output_key = self.output_key
+            return {output_key(key): value for key, value in row.items()}
+
+    def map_rows(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        map_row = self.map_row
+        return [map_row(row) for row in rows]
+
+
+@lru_cache(maxsize=256)
+def compile_row_mapper(fingerprint: SchemaFingerprint) -> RowMapper:
+    return RowMapper(fingerprint)
+
+
+def get_row_mapper(fields: Iterable[Dict[str, Any]]) -> RowMapper:
+    """Mapper for this `fields` schema, shared by every request sending the same schema."""
+    return compile_row_mapper(schema_fingerprint(fields))
@@ -0,0 +1,236 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+_whitespace = re.compile(r"[ \t\r\n]*")
+_container_start = re.compile(r"[\[{]")
+_number_chars = re.compile(r"[-+0-9.eE]+")
+_number = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?")
+# Unquoted object keys, which some models emit; the old parser quoted them with a regex
+_bare_key = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_LITERALS = (("true", True), ("false", False), ("null", None))
+
+# Keep at most this much already-consumed text in the buffer
+_COMPACT_AFTER = 65536
+
+# Parser states of the innermost open container
+KEY_OR_END, KEY, COLON, VALUE_OR_END, VALUE, COMMA_OR_END = range(6)
+
+
+@dataclass
+class StreamingJsonResult:
+    # Root object/array built so far; open containers hold the members completed until now
+    value: Any = None
+    # The root container has been closed
+    complete: bool = False
+    # (path, value) of the members completed during this call, up to emit_depth levels deep
+    items: List[Tuple[Tuple, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+class _Frame:
+    __slots__ = ("container", "path", "key", "state")
+
+    def __init__(self, container, path: Tuple):
+        self.container = container
+        self.path = path
+        self.key = None
+        self.state = KEY_OR_END if isinstance(container, dict) else VALUE_OR_END
+
+
+class StreamingJsonParser:
+    """
+        Resumable JSON parser for streamed LLM output. Each `feed` only scans
+        the new text (plus an unfinished token carried over from the previous
+        chunk), so a whole stream is parsed in linear time. Text before the
+        first `{` or `[` (e.g. a ```json fence) and after the root closes is
+        ignored. Members nested at most `emit_depth` levels deep are reported
+        in `items` as soon as they complete.
+    """
+
+    def __init__(self, emit_depth: int = 1):
+        self.emit_depth = emit_depth
+        self._buf = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._root = None
+        self._started = False
+        self._done = False
+        self._error: Optional[str] = None
+        # Resume point of an unterminated string: (string start, next offset to search)
+        self._string_resume: Tuple[int, int] = (-1, -1)
+
+    @property
+    def complete(self) -> bool:
+        return self._done
+
+    def feed(self, chunk: str) -> StreamingJsonResult:
+        items = []
+        if not self._done and self._error is None:
+            self._buf += chunk
+            self._run(items, final=False)
+        return self._result(items)
+
+    def close(self) -> StreamingJsonResult:
+        """Marks the end of the stream; a root still open at this point is reported as an error."""
+        items = []
+        if not self._done and self._error is None:
+            self._run(items, final=True)
+            if not self._done and self._error is None:
+                self._error = "Unexpected end of JSON input" if self._started else "No JSON object or array found"
+        return self._result(items)
+
+    def _result(self, items) -> StreamingJsonResult:
+        return StreamingJsonResult(value=self._root, complete=self._done, items=items, error=self._error)
+
+    def _run(self, items, final: bool):
+        try:
+            self._parse(items, final)
+        except ValueError as e:
+            self._error = f"{e} at offset {self._pos}"
+        if self._pos > _COMPACT_AFTER:
+            start, resume = self._string_resume
+            self._string_resume = (start - self._pos, resume - self._pos)
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+
+    def _parse(self, items, final: bool):
+        buf = self._buf
+        n = len(buf)
+        pos = self._pos
+        stack = self._stack
+        while not self._done:
+            if not self._started:
+                match = _container_start.search(buf, pos)
+                if match is None:
+                    pos = n
+                    break
+                pos = match.end()
+                self._started = True
+                self._root = {} if match.group() == "{" else []
+                stack.append(_Frame(self._root, ()))
+                continue
+            pos = _whitespace.match(buf, pos).end()
+            if pos >= n:
+                break
+            self._pos = pos
+            frame = stack[-1]
+            state = frame.state
+            c = buf[pos]
+
+            if state == KEY_OR_END or state == KEY:
+                if c == "}" and state == KEY_OR_END:
+                    pos = self._close(items, pos)
+                elif c == '"':
+                    token = self._scan_string(buf, pos)
+                    if token is None:
+                        break
+                    frame.key, pos = token
+                    frame.state = COLON
+                else:
+                    match = _bare_key.match(buf, pos)
+                    if match is None:
+                        raise ValueError(f"Expected an object key, got {c!r}")
+                    if match.end() == n and not final:
+                        break
+                    frame.key, pos = match.group(), match.end()
+                    frame.state = COLON
+
+            elif state == COLON:
+                if c != ":":
+                    raise ValueError(f"Expected ':', got {c!r}")
+                pos += 1
+                frame.state = VALUE
+
+            elif state == VALUE_OR_END or state == VALUE:
+                if c == "]" and state == VALUE_OR_END:
+                    pos = self._close(items, pos)
+                elif c == "{" or c == "[":
+                    container = {} if c == "{" else []
+                    path = self._attach(frame, container)
+                    stack.append(_Frame(container, path))
+                    pos += 1
+                elif c == '"':
+                    token = self._scan_string(buf, pos)
+                    if token is None:
+                        break
+                    value, pos = token
+                    self._emit(items, self._attach(frame, value), value)
+                else:
+                    match = _number_chars.match(buf, pos)
+                    if match is not None:
+                        # A number touching the end of the buffer may continue in the next chunk
+                        if match.end() == n and not final:
+                            break
+                        text = match.group()
+                        if _number.fullmatch(text) is None:
+                            raise ValueError(f"Invalid number {text!r}")
+                        value = float(text) if ("." in text or "e" in text or "E" in text) else int(text)
+                        pos = match.end()
+                    else:
+                        for literal, value in _LITERALS:
+                            if buf.startswith(literal, pos):
+                                pos += len(literal)
+                                break
+                            # Only a tail shorter than the literal can be its cut-off start
+                            if not final and n - pos < len(literal) and literal.startswith(buf[pos:n]):
+                                value = self
+                                break
+                        else:
+                            raise ValueError(f"Unexpected character {c!r}")
+                        if value is self:  # literal cut by the chunk boundary
+                            break
+                    self._emit(items, self._attach(frame, value), value)
+
+            else:  # COMMA_OR_END
+                if c == ",":
+                    frame.state = KEY if isinstance(frame.container, dict) else VALUE
+                    pos += 1
+                elif c == ("}" if isinstance(frame.container, dict) else "]"):
+                    pos = self._close(items, pos)
+                else:
+                    raise ValueError(f"Expected ',' or a closing bracket, got {c!r}")
+        self._pos = pos
+
+    def _scan_string(self, buf: str, start: int):
+        """(decoded string, offset after it), or None when the closing quote has not arrived yet."""
+        resume_start, resume = self._string_resume
+        search = resume if resume_start == start else start + 1
+        while True:
+            quote = buf.find('"', search)
+            if quote == -1:
+                self._string_resume = (start, len(buf))
+                return None
+            backslash = quote - 1
+            while buf[backslash] == "\\":
+                backslash -= 1
+            if (quote - 1 - backslash) % 2 == 0:
+                break
+            search = quote + 1
+        self._string_resume = (-1, -1)
+        raw = buf[start:quote + 1]
+        return (raw[1:-1] if "\\" not in raw else json.loads(raw)), quote + 1
+
+    def _attach(self, frame: _Frame, value) -> Tuple:
+        container = frame.container
+        if isinstance(container, dict):
+            container[frame.key] = value
+            path = frame.path + (frame.key,)
+        else:
+            path = frame.path + (len(container),)
+            container.append(value)
+        frame.state = COMMA_OR_END
+        return path
+
+    def _emit(self, items, path: Tuple, value):
+        if len(path) <= self.emit_depth:
+            items.append((path, value))
+
+    def _close(self, items, pos: int) -> int:
+        frame = self._stack.pop()
+        if self._stack:
+            self._emit(items, frame.path, frame.container)
+        else:
+            self._done = True
+        return pos + 1
@@ -1,3 +1,4 @@
+import json
 import os
 
 import dotenv
@@ -6,3 +7,138 @@ dotenv.load_dotenv()
 
 api_key = os.getenv("OPENAI_API_KEY")
 PORT = os.getenv("PORT")
+
+# LLM client tuning
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Identical concurrent LLM calls share one upstream request
+LLM_COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+
+# LLM router: pools of equivalent deployments per logical model, e.g.
+# {"gpt-4o-mini": [{"name": "eastus", "base_url": "https://...", "api_key": "...", "api_version": "2024-06-01",
+#                   "deployment": "gpt-4o-mini", "rpm": 600, "tpm": 100000, "weight": 1}, ...]}
+# `api_version` selects the Azure client (base_url is then the azure endpoint). Models without a pool
+# go to the default OPENAI_API_KEY / OPENAI_BASE_URL endpoint.
+LLM_DEPLOYMENTS = json.loads(os.getenv("LLM_DEPLOYMENTS", "{}"))
+LLM_ROUTER_STRATEGY = os.getenv("LLM_ROUTER_STRATEGY", "least_inflight")  # least_inflight | quota
+LLM_ROUTER_MAX_ATTEMPTS = int(os.getenv("LLM_ROUTER_MAX_ATTEMPTS", str(LLM_MAX_RETRIES + 1)))
+LLM_ROUTER_BACKOFF_BASE = float(os.getenv("LLM_ROUTER_BACKOFF_BASE", "0.25"))
+LLM_ROUTER_BACKOFF_MAX = float(os.getenv("LLM_ROUTER_BACKOFF_MAX", "8"))
+# Consecutive failures (5xx, connection errors) that open a deployment's circuit, and for how long
+LLM_ROUTER_FAILURE_THRESHOLD = int(os.getenv("LLM_ROUTER_FAILURE_THRESHOLD", "5"))
+LLM_ROUTER_COOLDOWN = float(os.getenv("LLM_ROUTER_COOLDOWN", "30"))
+
+# Database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./chatbot.db")
+# Derived from DATABASE_URL when unset
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Azure OpenAI deployments used by the LLM pipeline stages
+llm_deployemnt_3_5 = os.getenv("LLM_DEPLOYMENT_3_5", "gpt-35-turbo")
+llm_deployemnt_4_o = os.getenv("LLM_DEPLOYMENT_4_O", "gpt-4o")
+llm_deployment_4_o_mini = os.getenv("LLM_DEPLOYMENT_4_O_MINI", "gpt-4o-mini")
+non_kb_llm_deployment_4_0 = os.getenv("NON_KB_LLM_DEPLOYMENT_4_O", "gpt-4o")
+
+# Chat session storage: memory | sqlite | redis
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "memory")
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "./chat_sessions.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Prompt history trimming: sliding | system_recent | summary
+CONTEXT_STRATEGY = os.getenv("CONTEXT_STRATEGY", "system_recent")
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "12000"))
+# Per-model overrides, e.g. {"gpt-4o-mini": 16000, "gpt-35-turbo": 3000}
+CONTEXT_MODEL_BUDGETS = json.loads(os.getenv("CONTEXT_MODEL_BUDGETS", "{}"))
+
+# In-memory histories keep this many recent tokens as plain text; older turns are zlib-compressed in blocks
+SESSION_HOT_TOKENS = int(os.getenv("SESSION_HOT_TOKENS", str(max([CONTEXT_TOKEN_BUDGET, *CONTEXT_MODEL_BUDGETS.values()]))))
+SESSION_COLD_BLOCK_MESSAGES = int(os.getenv("SESSION_COLD_BLOCK_MESSAGES", "16"))
+
+# Response cache (per-prompt opt-in through isReadingCache / isWritingCache)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true"
+RESPONSE_CACHE_EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+RESPONSE_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY_THRESHOLD", "0.95"))
+CHAT_PROMPT_NAME = os.getenv("CHAT_PROMPT_NAME", "Chat")
+
+# Chat completion model and parameters
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini")
+CHAT_PARAMS = json.loads(os.getenv("CHAT_PARAMS", '{"temperature": 0.7}'))
+
+# Chat turn stages: seconds each may take, by stage name; optional stages fall back when they time out
+PIPELINE_STAGE_TIMEOUTS = json.loads(os.getenv("PIPELINE_STAGE_TIMEOUTS", '{"policy": 2, "cached": 2}'))
+
+# Speculative replies computed from partial input (POST /chat/prefetch); off unless enabled
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"
+PREFETCH_DEBOUNCE_SECONDS = float(os.getenv("PREFETCH_DEBOUNCE_SECONDS", "0.3"))
+PREFETCH_MIN_CHARS = int(os.getenv("PREFETCH_MIN_CHARS", "8"))
+# How long a finished prefetch waits for its /chat request
+PREFETCH_TTL_SECONDS = float(os.getenv("PREFETCH_TTL_SECONDS", "120"))
+# Cost cap per session (over PREFETCH_BUDGET_WINDOW seconds): LLM calls started and tokens they used
+PREFETCH_MAX_CALLS_PER_SESSION = int(os.getenv("PREFETCH_MAX_CALLS_PER_SESSION", "20"))
+PREFETCH_MAX_TOKENS_PER_SESSION = int(os.getenv("PREFETCH_MAX_TOKENS_PER_SESSION", "20000"))
+# The same per client_id across its sessions, and prefetches running at once over all clients
+PREFETCH_MAX_CALLS_PER_CLIENT = int(os.getenv("PREFETCH_MAX_CALLS_PER_CLIENT", "200"))
+PREFETCH_MAX_TOKENS_PER_CLIENT = int(os.getenv("PREFETCH_MAX_TOKENS_PER_CLIENT", "200000"))
+PREFETCH_MAX_IN_FLIGHT = int(os.getenv("PREFETCH_MAX_IN_FLIGHT", "100"))
+PREFETCH_BUDGET_WINDOW = float(os.getenv("PREFETCH_BUDGET_WINDOW", "3600"))
+
+# NavigationLinks cache: seconds between UpdatedAt checks
+NAVIGATION_CACHE_CHECK_INTERVAL = float(os.getenv("NAVIGATION_CACHE_CHECK_INTERVAL", "30"))
+
+# Configuration snapshot: seconds between UpdatedAt checks of the configuration tables
+CONFIG_REFRESH_INTERVAL = float(os.getenv("CONFIG_REFRESH_INTERVAL", "30"))
+# Sent as X-Admin-Key to the reload/warm endpoints under /config; unset disables them
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+
+# Prompt registry: seconds between checks for newly published prompt versions
+PROMPT_REGISTRY_REFRESH_INTERVAL = float(os.getenv("PROMPT_REGISTRY_REFRESH_INTERVAL", "15"))
+
+# Debug traces: append-only JSONL segments under debug_responses/
+DEBUG_TRACE_SEGMENT_BYTES = int(os.getenv("DEBUG_TRACE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+DEBUG_TRACE_RETENTION_DAYS = float(os.getenv("DEBUG_TRACE_RETENTION_DAYS", "7"))
+DEBUG_TRACE_MAX_OPEN_TRACES = int(os.getenv("DEBUG_TRACE_MAX_OPEN_TRACES", "10000"))
+DEBUG_TRACE_QUEUE_SIZE = int(os.getenv("DEBUG_TRACE_QUEUE_SIZE", "10000"))
+
+# Conversation/ConversationPrompt/Analytics/ConversationError persistence: queued | inline | off
+PERSISTENCE_MODE = os.getenv("PERSISTENCE_MODE", "queued")
+PERSISTENCE_QUEUE_SIZE = int(os.getenv("PERSISTENCE_QUEUE_SIZE", "5000"))
+PERSISTENCE_BATCH_SIZE = int(os.getenv("PERSISTENCE_BATCH_SIZE", "200"))
+PERSISTENCE_FLUSH_INTERVAL = float(os.getenv("PERSISTENCE_FLUSH_INTERVAL", "0.5"))
+# How long a request may wait for room in a full queue before its record is dropped
+PERSISTENCE_ENQUEUE_TIMEOUT = float(os.getenv("PERSISTENCE_ENQUEUE_TIMEOUT", "2"))
+PERSISTENCE_DRAIN_TIMEOUT = float(os.getenv("PERSISTENCE_DRAIN_TIMEOUT", "30"))
+
+# Cost accounting from TokenPrices
+# Number of tokens InputTokensPrice/OutputTokensPrice are quoted for
+TOKEN_PRICE_UNIT = int(os.getenv("TOKEN_PRICE_UNIT", "1000"))
+DEFAULT_PRICING_REGION = os.getenv("DEFAULT_PRICING_REGION", "")
+TOKEN_PRICE_CHECK_INTERVAL = float(os.getenv("TOKEN_PRICE_CHECK_INTERVAL", "300"))
+SPEND_WINDOW_SECONDS = int(os.getenv("SPEND_WINDOW_SECONDS", "86400"))
+SPEND_BUCKET_SECONDS = int(os.getenv("SPEND_BUCKET_SECONDS", "60"))
+
+# Logging: records go through a queue to a listener thread that formats and writes them
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Share of requests whose full payloads (history, LLM responses) are logged at DEBUG
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "4000"))
+# Extra field names whose values are masked, comma separated
+LOG_REDACT_FIELDS = [f.strip().lower() for f in os.getenv("LOG_REDACT_FIELDS", "").split(",") if f.strip()]
+
+# Precomputed answers for the active Questions (suggestion chips); warming calls the LLM once per question
+QUESTION_WARMING_ENABLED = os.getenv("QUESTION_WARMING_ENABLED", "false").lower() == "true"
+QUESTION_WARMING_CHECK_INTERVAL = float(os.getenv("QUESTION_WARMING_CHECK_INTERVAL", "60"))
+QUESTION_WARMING_CONCURRENCY = int(os.getenv("QUESTION_WARMING_CONCURRENCY", "4"))
+# Answers older than this are recomputed even if nothing changed; 0 keeps them until the prompt version changes
+QUESTION_WARMING_MAX_AGE = float(os.getenv("QUESTION_WARMING_MAX_AGE", "86400"))
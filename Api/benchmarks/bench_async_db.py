@@ -0,0 +1,79 @@
+"""
+    What a DB query does to everything else on the event loop: 200
+    concurrent queries through the sync Session versus the aiosqlite
+    AsyncSession, measured as event-loop lag (a 1 ms sleep probe) and as
+    request throughput when each request also waits 50 ms elsewhere.
+    SQLite runs the query on this process's CPU, so throughput cannot beat
+    running the queries back to back; against a networked database the
+    async session also overlaps the round-trips themselves.
+
+        python -m benchmarks.bench_async_db
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench-db-')}/bench.db"
+os.environ.setdefault("DB_POOL_SIZE", "32")
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from sqlalchemy import text  # noqa: E402
+from app.DB.database import AsyncSessionLocal, SessionLocal  # noqa: E402
+
+# A query that keeps SQLite busy for a few milliseconds
+QUERY = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 20000) SELECT count(*) FROM c")
+
+
+async def sync_query():
+    with SessionLocal() as db:
+        db.execute(QUERY).scalar()
+
+
+async def async_query():
+    async with AsyncSessionLocal() as db:
+        (await db.execute(QUERY)).scalar()
+
+
+async def loop_lag(query, requests: int):
+    stop, lags = asyncio.Event(), []
+
+    async def probe():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started - 0.001)
+
+    probing = asyncio.create_task(probe())
+    await asyncio.gather(*(query() for _ in range(requests)))
+    stop.set()
+    await probing
+    lags.sort()
+    return lags[max(0, int(len(lags) * 0.99) - 1)] * 1000, lags[-1] * 1000
+
+
+async def throughput(query, concurrency: int) -> float:
+    async def request():
+        await query()
+        await asyncio.sleep(0.05)  # the rest of the request, e.g. an LLM call
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(concurrency)))
+    return concurrency / (time.perf_counter() - started)
+
+
+async def main(requests: int):
+    await asyncio.gather(*(async_query() for _ in range(4)))
+    for label, query in (("sync session ", sync_query), ("async session", async_query)):
+        p99, worst = await loop_lag(query, requests)
+        print(f"{label}: event-loop lag over {requests} concurrent queries p99 {p99:7.1f} ms  max {worst:7.1f} ms")
+    for concurrency in (1, 8, 32):
+        print(f"concurrency {concurrency:3d}: sync {await throughput(sync_query, concurrency):6.1f} req/s   "
+              f"async {await throughput(async_query, concurrency):6.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args().requests))
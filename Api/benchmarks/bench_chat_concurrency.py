@@ -0,0 +1,45 @@
+"""
+    Closed-loop /chat throughput at increasing numbers of simultaneous
+    requests. With the LLM call awaited on the shared async client,
+    throughput scales with concurrency until LLM_MAX_CONCURRENCY or the CPU
+    is the limit; a blocking client stays flat at about 1 / LLM latency.
+
+        python -m benchmarks.stub_llm --port 9100 --delay 0.2 &
+        OPENAI_API_KEY=x OPENAI_BASE_URL=http://127.0.0.1:9100/v1 PERSISTENCE_MODE=off \\
+            uvicorn main:app --port 8000 --no-access-log &
+        python -m benchmarks.bench_chat_concurrency http://127.0.0.1:8000/chat 1 8 32 64
+"""
+import argparse
+import asyncio
+import time
+import uuid
+import httpx
+
+
+async def run(url: str, concurrency: int, requests_per_slot: int) -> float:
+    prefix = uuid.uuid4().hex[:8]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        async def slot(n):
+            for i in range(requests_per_slot):
+                # A session per request so turns neither share a lock nor grow a history
+                response = await client.post(url, json={"user_message": f"hi {n}-{i}", "session_id": f"{prefix}-{n}-{i}"})
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(slot(n) for n in range(concurrency)))
+        return concurrency * requests_per_slot / (time.perf_counter() - started)
+
+
+async def main(url: str, levels, requests_per_slot: int):
+    for concurrency in levels:
+        print(f"concurrency {concurrency:4d}: {await run(url, concurrency, requests_per_slot):7.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url")
+    parser.add_argument("levels", nargs="+", type=int)
+    parser.add_argument("--requests", type=int, default=4, help="sequential requests per concurrent slot")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.levels, args.requests))
@@ -0,0 +1,59 @@
+"""
+    Prompt tokens sent over 200-turn synthetic sessions: the full history
+    (as before) versus each context strategy at a fixed token budget. The
+    rolling summary uses a canned summary instead of calling Summary_LLM.
+
+        python -m benchmarks.bench_context_window --turns 200 --budget 4000
+"""
+import argparse
+import asyncio
+import os
+import random
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.Service.contextWindow import CONTEXT_STRATEGIES, RollingSummaryStrategy, count_prompt_tokens  # noqa: E402
+
+WORDS = "entity compliance activity launch create report client region workflow".split()
+
+
+class CannedSummary(RollingSummaryStrategy):
+    async def summarize(self, previous_summary, messages):
+        return "summary " * 150
+
+
+def message(rng, role):
+    return {"role": role, "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120)))}
+
+
+async def session(strategy, turns: int, budget: int):
+    rng = random.Random(1)
+    history = [{"role": "system", "content": "You are a helpful assistant. " * 20}]
+    total = peak = 0
+    for _ in range(turns):
+        user = message(rng, "user")
+        fitted = await strategy.fit(history + [user], budget) if strategy else history + [user]
+        tokens = count_prompt_tokens(fitted)
+        total, peak = total + tokens, max(peak, tokens)
+        reply = message(rng, "assistant")
+        if strategy is not None and strategy.rewrites_history(history, fitted):
+            history = fitted + [reply]
+        else:
+            history = history + [user, reply]
+    return total, peak
+
+
+async def main(turns: int, budget: int):
+    strategies = {"full history": None, **{name: cls() for name, cls in CONTEXT_STRATEGIES.items() if name != "summary"},
+                  "summary": CannedSummary()}
+    for name, strategy in strategies.items():
+        total, peak = await session(strategy, turns, budget)
+        print(f"{name:14s} prompt tokens over {turns} turns: {total:>10,}  peak per turn: {peak:>7,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=4000)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.budget))
@@ -0,0 +1,83 @@
+"""
+    Per-write cost of the debug trace store with 0, 10k and 100k traces
+    already on disk, next to the previous per-query JSON files that were
+    rescanned and rewritten on every append (with 1k and 10k files; the
+    database lookups of the old path are left out).
+
+        python -m benchmarks.bench_debug_traces
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.Service.debugTraceStore import DebugTraceStore  # noqa: E402
+
+ENTRY = {"prompt_name": "LLM0", "response": "x" * 400, "prompt_tokens": 100}
+
+
+def trace_store(existing, writes=2000):
+    directory = tempfile.mkdtemp(prefix="bench-traces-")
+    store = DebugTraceStore(base_dir=directory, segment_max_bytes=8 * 1024 * 1024)
+    for i in range(existing):
+        store.start_trace(f"q{i}", f"s{i % 5000}")
+        store.append_response(ENTRY, f"s{i % 5000}")
+    store.flush()
+    started = time.perf_counter()
+    for i in range(writes):
+        store.start_trace("q", "hot")
+        store.append_response(ENTRY, "hot")
+        store.append_response(ENTRY, f"s{i}")
+    per_write = (time.perf_counter() - started) / (writes * 3)
+    store.flush()
+    store.close()
+    segments = len(os.listdir(directory))
+    shutil.rmtree(directory)
+    return per_write, segments
+
+
+def query_files(existing, writes=5):
+    """The previous storeDebugResponse: find the session's latest query_*.json, then rewrite it."""
+    directory = tempfile.mkdtemp(prefix="bench-traces-")
+    for i in range(existing):
+        with open(f"{directory}/query_{i:09d}.json", "w") as f:
+            json.dump({"userQuery": "q", "llmRequestResponse": [ENTRY]}, f, indent=4)
+
+    def write(session):
+        names = [name for name in os.listdir(directory) if name.startswith("query_")]
+        matches = []
+        for name in names:
+            with open(os.path.join(directory, name)) as f:
+                if json.load(f).get("sessionId") == session:
+                    matches.append(name)
+        path = os.path.join(directory, max(matches) if matches else max(names))
+        with open(path) as f:
+            record = json.load(f)
+        record["llmRequestResponse"].append(ENTRY)
+        with open(path, "w") as f:
+            json.dump(record, f, indent=4)
+
+    started = time.perf_counter()
+    for _ in range(writes):
+        write("hot")
+    per_write = (time.perf_counter() - started) / writes
+    shutil.rmtree(directory)
+    return per_write
+
+
+def main(existing=(0, 10_000, 100_000), previous=(1_000, 10_000)):
+    for count in existing:
+        per_write, segments = trace_store(count)
+        print(f"trace store  existing={count:>7}: {per_write * 1e6:7.1f} us/write  ({segments} segments)")
+    for count in previous:
+        print(f"query files  existing={count:>7}: {query_files(count) * 1000:7.1f} ms/write")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--existing", type=int, nargs="+", default=[0, 10_000, 100_000])
+    main(parser.parse_args().existing)
@@ -0,0 +1,74 @@
+"""
+    Filtering 5000 entities by a navigation link's supported entity types:
+    the former per-call parse of EntityTypeSupported plus list/set filter
+    versus NavigationLink.partition_entities, alone and inside
+    process_nav_results_entity_specific (warning and heading included).
+
+        python -m benchmarks.bench_entity_partition --entities 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.Service.navigationCache import NavigationLink  # noqa: E402
+from app.Utils import utils  # noqa: E402
+
+TYPES = ["Affiliate", "Fund", "Investor", "Other", "Deal"]
+LINK = NavigationLink.from_row(SimpleNamespace(
+    Id=1, name="Launch Workflow", url=None, responseText=None, type=None, EntityTypeSupported="Affiliate, Fund ,Investor",
+    RequiredId=None, Description=None, UpdatedAt=None
+))
+
+
+def entities(count):
+    rng = random.Random(1)
+    return [{"entityName": f"E{i}", ("entityType" if i % 2 else "Entity Type"): rng.choice(TYPES), "primaryentitykeyid": i}
+            for i in range(count)]
+
+
+def former_filter(nav_link, data):
+    supported_types = {s.strip() for s in nav_link.EntityTypeSupported.split(",")}
+    filtered, removed = [], []
+    for obj in data:
+        entity_type = obj.get("entityType") or obj.get("Entity Type")
+        (filtered.append(obj) if entity_type in supported_types else removed.append(entity_type))
+    return filtered, set(filter(None, removed))
+
+
+def best_ms(fn, runs=200, repeats=7):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        best = min(best, (time.perf_counter() - started) / runs)
+    return best * 1000
+
+
+async def main(count):
+    data = entities(count)
+
+    class Cache:
+        async def get(self, db, name):
+            return LINK
+
+    utils.navigation_cache = Cache()
+    started = time.perf_counter()
+    for _ in range(200):
+        await utils.process_nav_results_entity_specific(None, LINK.name, data)
+    full = (time.perf_counter() - started) / 200 * 1000
+    assert former_filter(LINK, data)[0] == LINK.partition_entities(data)[0]
+    print(f"filter only, former parse + filter:   {best_ms(lambda: former_filter(LINK, data)):.2f} ms")
+    print(f"filter only, partition_entities:      {best_ms(lambda: LINK.partition_entities(data)):.2f} ms")
+    print(f"process_nav_results_entity_specific:  {full:.2f} ms  ({count} entities, warning and heading included)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entities", type=int, default=5000)
+    asyncio.run(main(parser.parse_args().entities))
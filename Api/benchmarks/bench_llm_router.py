@@ -0,0 +1,82 @@
+"""
+    Completions through the LLM router over a pool of stub deployments while
+    one or all of them fail (503) or are throttled (429 with Retry-After).
+    Reports the outcomes, wall time, the upstream calls each stub received
+    and the circuit state afterwards. Start three stubs first:
+
+        for port in 9101 9102 9103; do python -m benchmarks.stub_llm --port $port --delay 0.05 & done
+        python -m benchmarks.bench_llm_router http://127.0.0.1:9101 http://127.0.0.1:9102 http://127.0.0.1:9103
+"""
+import argparse
+import asyncio
+import collections
+import os
+import time
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.Service.llmRouter import create_llm_router  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+async def scenario(label, stubs, failures, requests, waves=1, stream=False):
+    """
+        failures: {stub index: POST /fail body}; every other stub answers
+        normally. The requests go out in `waves` concurrent bursts, one
+        after the other, and the upstream calls are reported per wave.
+    """
+    router = create_llm_router({"m": [{"name": f"stub{i}", "base_url": f"{url}/v1"} for i, url in enumerate(stubs)]})
+    async with httpx.AsyncClient() as control:
+        async def upstream():
+            return [(await control.get(f"{url}/calls")).json()["completions"] for url in stubs]
+
+        for i, url in enumerate(stubs):
+            await control.post(f"{url}/reset")
+            await control.post(f"{url}/fail", json=failures.get(i, {"status": 0}))
+
+        outcomes, per_wave = collections.Counter(), []
+
+        async def one():
+            try:
+                if stream:
+                    async for _ in router.stream(model="m", messages=MESSAGES):
+                        pass
+                else:
+                    await router.create(model="m", messages=MESSAGES)
+                outcomes["ok"] += 1
+            except Exception as e:
+                outcomes[type(e).__name__] += 1
+
+        started, before = time.perf_counter(), await upstream()
+        for _ in range(waves):
+            await asyncio.gather(*(one() for _ in range(requests // waves)))
+            after = await upstream()
+            per_wave.append([a - b for a, b in zip(after, before)])
+            before = after
+        elapsed = time.perf_counter() - started
+        for url in stubs:
+            await control.post(f"{url}/fail", json={"status": 0})
+    print(f"{label:34s} {dict(outcomes)}  {elapsed:5.2f} s  upstream calls per wave {per_wave}  "
+          f"circuits {[d.circuit for d in router.pools['m']]}")
+    for d in router.pools["m"]:
+        await d.client.close()
+
+
+async def main(stubs, requests):
+    await scenario("all healthy", stubs, {}, requests)
+    await scenario("one failing (503)", stubs, {0: {"status": 503}}, requests, waves=3)
+    await scenario("one failing, streamed", stubs, {0: {"status": 503}}, requests, waves=3, stream=True)
+    await scenario("one throttled (429, Retry-After 1)", stubs, {0: {"status": 429, "retry_after": 1}}, requests)
+    await scenario("all throttled (429, Retry-After 1)", stubs,
+                   {i: {"status": 429, "retry_after": 1} for i in range(len(stubs))}, 20)
+    await scenario("all failing", stubs, {i: {"status": 503} for i in range(len(stubs))}, 20)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("stubs", nargs="+", help="base URLs of running benchmarks.stub_llm servers")
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(main(args.stubs, args.requests))
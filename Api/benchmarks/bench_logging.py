@@ -0,0 +1,59 @@
+"""
+    Per-call cost on the request path of the old synchronous print() of the
+    chat history versus the queued structured logger (payload sampling on).
+
+        python -m benchmarks.bench_logging --calls 5000
+
+    For the end-to-end p99 at 500 RPS run the API against benchmarks.stub_llm
+    and drive it with benchmarks.load (see benchmarks/README.md).
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+os.environ.setdefault("LOG_PAYLOAD_SAMPLE_RATE", "0.01")
+
+from app.Utils.logConfig import log_payload, new_request_context, setup_logging, stop_logging  # noqa: E402
+
+
+def per_call_us(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main(calls: int, turns: int):
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"question number {i} " + "context " * 40}
+               for i in range(turns)]
+    out_dir = tempfile.mkdtemp(prefix="bench-logging-")
+    with open(os.path.join(out_dir, "print.out"), "w") as out:
+        def print_history():
+            print(f"Chat History: {history}", file=out, flush=True)
+        print(f"print(history), flushed:          {per_call_us(print_history, calls):8.1f} us/call")
+
+    sys.stderr = open(os.path.join(out_dir, "log.out"), "w")
+    setup_logging(level="DEBUG", fmt="json")
+
+    def sampled_payload():
+        new_request_context()
+        log_payload("Chat history", history)
+
+    def structured_line():
+        logging.info("Chat turn completed", extra={"from_cache": False, "duration_ms": 230})
+
+    print(f"log_payload at 1% sampling:        {per_call_us(sampled_payload, calls):8.1f} us/call")
+    print(f"logging.info with extras (queued): {per_call_us(structured_line, calls):8.1f} us/call")
+    stop_logging()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=40, help="messages in the logged history")
+    args = parser.parse_args()
+    main(args.calls, args.turns)
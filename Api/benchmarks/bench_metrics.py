@@ -0,0 +1,86 @@
+"""
+    Overhead per instrumented call of the in-process metrics: the
+    Histogram timer on a bound child and through labels() (what the LLM
+    client does), observe(), Counter.inc(), and time_async_function around
+    a coroutine (budget 5 us, see tests/test_metrics.py), each against the
+    bare call.
+
+        python -m benchmarks.bench_metrics
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.Utils.metrics import Counter, Histogram, Registry  # noqa: E402
+from app.Utils.utils import time_async_function  # noqa: E402
+
+registry = Registry()
+histogram = Histogram("bench_seconds", "Benchmark timings", ["stage"], registry=registry)
+counter = Counter("bench_total", "Benchmark calls", ["stage"], registry=registry)
+
+
+def bare():
+    return 1
+
+
+async def bare_async():
+    return {}
+
+
+def per_call(calls, body):
+    started = time.perf_counter()
+    body(calls)
+    return (time.perf_counter() - started) / calls
+
+
+def main(calls=500_000):
+    child, counter_child = histogram.labels("bound"), counter.labels("bound")
+
+    def run_bare(n):
+        for _ in range(n):
+            bare()
+
+    def run_bound(n):
+        for _ in range(n):
+            with child.time():
+                bare()
+
+    def run_labels(n):
+        for _ in range(n):
+            with histogram.labels("bound").time():
+                bare()
+
+    def run_observe(n):
+        for _ in range(n):
+            child.observe(0.01)
+
+    def run_inc(n):
+        for _ in range(n):
+            counter_child.inc()
+
+    async def awaited(n, instrumented):
+        for _ in range(n):
+            if instrumented:
+                await time_async_function(bare_async)
+            else:
+                await bare_async()
+
+    base = per_call(calls, run_bare)
+    print(f"{'bare call':22s} {base * 1e6:6.3f} us/call")
+    for label, body in (("child.time()", run_bound), ("labels().time()", run_labels),
+                        ("observe()", run_observe), ("counter.inc()", run_inc)):
+        cost = per_call(calls, body)
+        print(f"{label:22s} {cost * 1e6:6.3f} us/call  overhead {(cost - base) * 1e6:6.3f} us")
+    base = per_call(calls, lambda n: asyncio.run(awaited(n, False)))
+    cost = per_call(calls, lambda n: asyncio.run(awaited(n, True)))
+    print(f"{'time_async_function':22s} {cost * 1e6:6.3f} us/call  overhead {(cost - base) * 1e6:6.3f} us "
+          "(includes its debug stamps)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=500_000)
+    main(parser.parse_args().calls)
@@ -0,0 +1,82 @@
+"""
+    Navigation lookups for one entity-search result (40 fields x 20 rows):
+    one get_navigation_by_name query per label versus parse_json_for_id and
+    fetch_and_map_navigation on the navigation snapshot. Counts the SQL
+    statements per call. Uses its own SQLite database (300 links).
+
+        python -m benchmarks.bench_navigation_lookup
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench-navigation-')}/navigation.db"
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from sqlalchemy import event  # noqa: E402
+
+from app.DB import crud, models  # noqa: E402
+from app.DB.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine  # noqa: E402
+from app.Utils import utils  # noqa: E402
+
+
+def build(fields, links=300):
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        labels = {f"Label {i}": f"Nav {i}" for i in range(0, fields, 2)}
+        db.add(models.NavigationLinksGlobalConfiguration(id=1, name="nav", data=json.dumps(labels)))
+        for i in range(links):
+            db.add(models.NavigationLinks(Id=i + 1, name=f"Nav {i}" if i % 3 else f"Label {i}",
+                                          url=f"/nav/{i}/'entityId'", IsActive=True,
+                                          EntityTypeSupported="Fund, Company" if i % 2 else None))
+        db.commit()
+
+
+def payload(fields, rows):
+    columns = [{"id": f"p{i % 4}_Field{i}", "label": f"Label {i}"} for i in range(fields)]
+    columns.append({"id": "primaryentitykeyid", "label": "Id"})
+    result = [{**{f"p{i % 4}_Field{i}": f"v{r}_{i}" for i in range(fields)}, "primaryentitykeyid": r}
+              for r in range(rows)]
+    return {"fields": columns, "result": result}
+
+
+async def per_label(data, db):
+    """The lookup before the snapshot: the configuration, then one query per label."""
+    navigation = json.loads((await crud.get_navigation_configurations(db)).data)
+    labels = [navigation.get(field["label"], field["label"]) for field in data["fields"]]
+    return {label: await crud.get_navigation_by_name(db, label) for label in labels}
+
+
+async def main(fields=40, rows=20, calls=50):
+    build(fields)
+    data = payload(fields, rows)
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+
+    async with AsyncSessionLocal() as db:
+        for label, lookup in (("per-label queries", lambda: per_label(data, db)),
+                              ("parse_json_for_id", lambda: utils.parse_json_for_id(data, db, "launch", "Fund")),
+                              ("fetch_and_map_navigation", lambda: utils.fetch_and_map_navigation(data, db))):
+            await lookup()
+            statements = 0
+            started = time.perf_counter()
+            for _ in range(calls):
+                await lookup()
+            elapsed = time.perf_counter() - started
+            print(f"{label:25s} {statements / calls:5.1f} queries/call  {elapsed / calls * 1000:7.2f} ms/call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fields", type=int, default=40)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.fields, args.rows, args.calls))
@@ -0,0 +1,62 @@
+"""
+    /chat latency with the conversation writes done inline versus handed to
+    the queued writer (and with persistence off as the floor). Start the
+    API once per PERSISTENCE_MODE on a fresh database and point the script
+    at it; --db counts the rows written once the queue has drained.
+
+        export DATABASE_URL=sqlite:////tmp/persistence.db
+        python -m benchmarks.fixtures
+        python -m benchmarks.stub_llm --port 9100 --delay 0.05 &
+        PERSISTENCE_MODE=queued RESPONSE_CACHE_ENABLED=false OPENAI_API_KEY=x \\
+            OPENAI_BASE_URL=http://127.0.0.1:9100/v1 uvicorn main:app --port 8000 --no-access-log &
+        python -m benchmarks.bench_persistence http://127.0.0.1:8000/chat --db /tmp/persistence.db
+"""
+import argparse
+import asyncio
+import sqlite3
+import time
+import uuid
+import httpx
+
+from benchmarks.load import percentile
+
+
+async def run(url: str, concurrency: int, requests: int):
+    prefix, latencies = uuid.uuid4().hex[:8], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(url, json={"user_message": f"hi {i}", "session_id": f"{prefix}-{i}"})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        # Warm-up: connections, prompt registry and session store
+        await asyncio.gather(*(one(-i) for i in range(1, concurrency + 1)))
+        latencies.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return latencies, requests / (time.perf_counter() - started)
+
+
+def count_rows(path: str):
+    with sqlite3.connect(path) as db:
+        return {table: db.execute(f'select count(*) from "{table}"').fetchone()[0]
+                for table in ("Conversations", "ConversationPrompts", "Analytics")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=640)
+    parser.add_argument("--db", help="SQLite file of the API, to count the rows written")
+    args = parser.parse_args()
+    latencies, rate = asyncio.run(run(args.url, args.concurrency, args.requests))
+    print(f"p50 {percentile(latencies, .5) * 1000:.0f} ms  p99 {percentile(latencies, .99) * 1000:.0f} ms  {rate:.0f} req/s")
+    if args.db:
+        time.sleep(2)
+        print(f"rows for {args.requests + args.concurrency} requests (warm-up included): {count_rows(args.db)}")
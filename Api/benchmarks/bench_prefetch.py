@@ -0,0 +1,65 @@
+"""
+    Latency of /chat after POST /chat/prefetch in the typical typing
+    scenarios, and what the prefetches cost upstream. Run the API with
+    prefetch on against an echo stub with a visible delay:
+
+        python -m benchmarks.stub_llm --port 9100 --delay 1.0 --echo &
+        PREFETCH_ENABLED=true PREFETCH_MAX_CALLS_PER_SESSION=3 OPENAI_API_KEY=x \\
+            OPENAI_BASE_URL=http://127.0.0.1:9100/v1 uvicorn main:app --port 8000 &
+        python -m benchmarks.bench_prefetch --api http://127.0.0.1:8000 --stub http://127.0.0.1:9100
+"""
+import argparse
+import asyncio
+import time
+import uuid
+import httpx
+
+
+async def main(api: str, stub: str):
+    run = uuid.uuid4().hex[:8]
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def prefetch(session, text):
+            response = await client.post(f"{api}/chat/prefetch", json={"session_id": f"{run}-{session}", "user_message": text})
+            return response.json()["status"]
+
+        async def chat(session, text):
+            started = time.perf_counter()
+            await client.post(f"{api}/chat", json={"session_id": f"{run}-{session}", "user_message": text})
+            return f"{(time.perf_counter() - started) * 1000:.0f} ms"
+
+        async def upstream():
+            return (await client.get(f"{stub}/calls")).json()["completions"]
+
+        before = await upstream()
+        statuses = [await prefetch("a", text) for text in ("what is", "what is the", "what is the fund")]
+        await asyncio.sleep(1.5)
+        print(f"typed, paused, submitted same text: {await chat('a', 'what is the fund')}  {statuses}")
+        await prefetch("b", "show my portfolio")
+        await asyncio.sleep(0.6)
+        print(f"submitted different text:          {await chat('b', 'show my portfolio please')}")
+        await prefetch("c", "list open tasks")
+        await asyncio.sleep(0.7)
+        print(f"submitted mid-flight:              {await chat('c', 'list open tasks')}")
+        print(f"no prefetch (baseline):            {await chat('d', 'no prefetch here')}")
+        await prefetch("a", "and the second question")
+        await asyncio.sleep(1.5)
+        print(f"second turn of the same session:   {await chat('a', 'and the second question')}")
+        statuses = []
+        for i in range(5):
+            statuses.append(await prefetch("e", f"question variant {i}"))
+            await asyncio.sleep(0.4)
+        print(f"per-session cap:                   {statuses}")
+        print(f"too short:                         {await prefetch('g', 'hi')}")
+        await asyncio.sleep(0.5)
+        print(f"upstream calls:                    {await upstream() - before}")
+        metrics = (await client.get(f"{api}/metrics")).text
+        print("\n".join(line for line in metrics.splitlines()
+                        if ("prefetch" in line or "response_cache" in line) and not line.startswith("#")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api", default="http://127.0.0.1:8000")
+    parser.add_argument("--stub", default="http://127.0.0.1:9100")
+    args = parser.parse_args()
+    asyncio.run(main(args.api, args.stub))
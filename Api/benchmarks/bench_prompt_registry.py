@@ -0,0 +1,115 @@
+"""
+    Resolving the prompts of one turn (name and chatParameters for 3 prompts)
+    with the per-call queries + json.loads versus the in-memory registry,
+    and a hot swap to a newly published version while lookups run.
+    Uses its own SQLite database (20 prompts x 10 versions).
+
+        python -m benchmarks.bench_prompt_registry
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench-prompts-')}/prompts.db"
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.DB import crud, models  # noqa: E402
+from app.DB.database import AsyncSessionLocal, Base, SessionLocal, engine  # noqa: E402
+from app.Service.promptRegistry import prompt_registry  # noqa: E402
+
+NAMES = [f"LLM{i}" for i in range(20)]
+SYSTEM_PROMPT = "You are an assistant for {platform} users with role {role}. " + 'Answer in JSON like {"a": 1}. ' * 200
+# A turn resolves LLM0/1/2 at their active version
+TURN = [(1, 10), (2, 10), (3, 10)]
+
+
+def build():
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add(models.User(Id=1, Name="bench"))
+        history_id = 0
+        for prompt_id, name in enumerate(NAMES, start=1):
+            for version in range(1, 11):
+                history_id += 1
+                db.add(models.PromptConfigurationsHistory(
+                    Id=history_id, name=name, systemPrompt=SYSTEM_PROMPT, VersionNumber=version, UserId=1,
+                    chatParameters=json.dumps({"temperature": 0.1 * version, "max_tokens": 800, "stop": ["\n\n"]}),
+                    configurations={"fields": list(range(50))}, isReadingCache=True))
+            db.add(models.PromptConfigurationsVersion(Id=prompt_id, name=name, PromptHistoryId=history_id))
+        db.commit()
+
+
+async def query_path(db, prompt_id, version):
+    name = await crud.get_promptname_by_id(db, prompt_id)
+    row = await crud.get_entity_search_system_prompt_by_id(db, prompt_id, prompt_version=version)
+    return name, json.loads(row.chatParameters)
+
+
+async def registry_path(prompt_id, version):
+    prompt = await prompt_registry.get_by_id(prompt_id, version)
+    return await prompt_registry.get_name(prompt_id), prompt.chat_parameters
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[int(p * (len(ordered) - 1))]
+
+
+async def time_turns(resolve, turns):
+    samples = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        for prompt_id, version in TURN:
+            await resolve(prompt_id, version)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def hot_swap():
+    stop, seen, torn = False, set(), 0
+
+    async def reader():
+        nonlocal torn
+        while not stop:
+            snapshot = prompt_registry.current()
+            by_name, by_id = snapshot.get("LLM0"), snapshot.get_by_id(1)
+            torn += by_name is not by_id
+            seen.add(by_name.version)
+            await asyncio.sleep(0)
+
+    readers = [asyncio.create_task(reader()) for _ in range(8)]
+    await asyncio.sleep(0.05)
+    with SessionLocal() as db:
+        db.add(models.PromptConfigurationsHistory(Id=1000, name="LLM0", systemPrompt="new {role}", VersionNumber=11,
+                                                  UserId=1, chatParameters='{"temperature": 0}'))
+        db.flush()
+        db.query(models.PromptConfigurationsVersion).filter_by(Id=1).update({"PromptHistoryId": 1000})
+        db.commit()
+    started = time.perf_counter()
+    await prompt_registry.refresh()
+    swap_ms = (time.perf_counter() - started) * 1000
+    await asyncio.sleep(0.05)
+    stop = True
+    await asyncio.gather(*readers)
+    print(f"hot swap to v11: refresh {swap_ms:.1f} ms, versions seen {sorted(seen)}, torn reads {torn}")
+
+
+async def main(turns=2000):
+    build()
+    started = time.perf_counter()
+    await prompt_registry.refresh(force=True)
+    print(f"initial load: {len(prompt_registry.current().by_version)} versions "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+    async with AsyncSessionLocal() as db:
+        queried = await time_turns(lambda prompt_id, version: query_path(db, prompt_id, version), turns)
+    cached = await time_turns(registry_path, turns)
+    for label, samples in (("queries + json.loads", queried), ("registry", cached)):
+        print(f"{label:21s} per turn: p50 {percentile(samples, .5) * 1e6:8.1f} us  "
+              f"p99 {percentile(samples, .99) * 1e6:8.1f} us")
+    await hot_swap()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
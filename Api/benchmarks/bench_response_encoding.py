@@ -0,0 +1,68 @@
+"""
+    CPU time and tracemalloc peak of the mapping tail of an entity-search
+    call (2000 rows x 32 fields, 200-entity LLM0 payload): the previous
+    json.loads(json.dumps(...)) copies, ast/str-replace LLM0 parsing and
+    stdlib response encoding versus safe_parse_response and jsonCodec.
+
+        python -m benchmarks.bench_response_encoding
+"""
+import argparse
+import ast
+import json
+import os
+import random
+import time
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.Utils import jsonCodec  # noqa: E402
+from app.Utils.utils import safe_parse_response  # noqa: E402
+
+
+def build(rows, fields, entities):
+    random.seed(2)
+    result = [{**{f"f{j}_c{j}": f"value {random.random()}" for j in range(fields)}, "EntityId": i, "Active": True}
+              for i in range(rows)]
+    llm0 = str({"isSingleSelect": True, "action": ["View"],
+                "entities": [{"entityId": i, "entityName": f"E{i}", "flag": False} for i in range(entities)]})
+    return result, llm0
+
+
+def previous(result, llm0):
+    mapped = json.loads(json.dumps(result))
+    parsed = ast.literal_eval(llm0)
+    json.dumps(parsed).replace("True", "true").replace("False", "false")
+    response = json.loads(json.dumps(dict(parsed)))
+    body = json.dumps({"navigation_links": {}, "result": mapped}, ensure_ascii=False, separators=(",", ":")).encode()
+    return response["isSingleSelect"], body
+
+
+def current(result, llm0):
+    response = safe_parse_response(llm0)
+    return response["isSingleSelect"], jsonCodec.dumps_bytes({"navigation_links": {}, "result": result})
+
+
+def main(rows=2000, fields=30, entities=200, calls=20):
+    result, llm0 = build(rows, fields, entities)
+    old, new = previous(result, llm0), current(result, llm0)
+    assert old[0] == new[0] and json.loads(old[1]) == json.loads(new[1])
+    print(f"orjson: {jsonCodec.orjson is not None}")
+    for label, run in (("previous", previous), ("current", current)):
+        run(result, llm0)
+        tracemalloc.start()
+        run(result, llm0)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        started = time.perf_counter()
+        for _ in range(calls):
+            run(result, llm0)
+        print(f"{label:9s} {(time.perf_counter() - started) / calls * 1000:6.1f} ms/call  peak {peak / 1e6:5.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+    main(rows=args.rows, calls=args.calls)
@@ -0,0 +1,126 @@
+"""
+    Memory per stored message of the in-memory session history: the
+    previous list of {"role", "content"} dicts versus ChatHistory at a few
+    SESSION_HOT_TOKENS settings (10k sessions x 50 turns by default,
+    tracemalloc). Then the per-turn cost of fitting one long session to
+    the context window from a list versus from a HistoryView. The default
+    run takes several minutes under tracemalloc; --sessions 1000 is quicker.
+
+        python -m benchmarks.bench_session_memory --sessions 10000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import time
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.Service.chatHistory import ChatHistory  # noqa: E402
+from app.Service.contextWindow import count_prompt_tokens, count_text_tokens, create_context_strategy  # noqa: E402
+from app.extractEnvVariables import SESSION_HOT_TOKENS  # noqa: E402
+
+TURNS = 50
+WORDS = ("the fund company portfolio investor report quarterly revenue capital allocation workflow task open approve "
+         "document deal pipeline contact meeting summary value net asset return performance compliance review show "
+         "list my latest total for in of and with by please can you what is how many which").split()
+ENTITIES = [f"Fund {c}{i}" for c in "ABCDEFGH" for i in range(40)]
+
+
+def turns_for(session):
+    """Same texts on every call, as new string objects, so the layouts measured never share them."""
+    rnd = random.Random(session)
+
+    def sentence(words):
+        return " ".join(rnd.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+    for _ in range(TURNS):
+        yield {"role": "user", "content": f"{sentence(rnd.randint(6, 14))} {rnd.choice(ENTITIES)}?"}
+        yield {"role": "assistant", "content": " ".join(sentence(rnd.randint(8, 18)) for _ in range(rnd.randint(3, 7)))
+               + f" See {rnd.choice(ENTITIES)} for details."}
+
+
+def measure(build):
+    count_text_tokens.cache_clear()
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    store = build()
+    elapsed = time.perf_counter() - started
+    # The token-count LRU is bounded and shared by every session; it isn't part of the per-message cost
+    count_text_tokens.cache_clear()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return store, used, elapsed
+
+
+def as_dicts(sessions):
+    return [list(turns_for(s)) for s in range(sessions)]
+
+
+def as_histories(sessions, hot_tokens):
+    store = []
+    for s in range(sessions):
+        history = ChatHistory(hot_tokens=hot_tokens)
+        turns = turns_for(s)
+        # Appended the way the chat service does: one user/assistant pair per turn
+        for message in turns:
+            history.extend([message, next(turns)])
+        store.append(history)
+    return store
+
+
+async def fit_cost(history, calls=2000, budget=4000):
+    strategy = create_context_strategy("system_recent")
+    messages = list(history.view())
+    turn = [{"role": "user", "content": "next?"}]
+    timings = {}
+    for label, candidate in (("list of dicts", lambda: list(messages) + turn), ("view", lambda: history.view() + turn)):
+        started = time.perf_counter()
+        for _ in range(calls):
+            window = list(await strategy.fit(candidate(), budget))
+        timings[label] = ((time.perf_counter() - started) / calls, window)
+    (list_cost, expected), (view_cost, window) = timings["list of dicts"], timings["view"]
+    assert window == expected
+    print(f"fit a {len(messages)}-message session to {budget} tokens: list of dicts {list_cost * 1e6:.0f} us, "
+          f"view {view_cost * 1e6:.0f} us ({len(window)} messages kept)")
+    started = time.perf_counter()
+    for _ in range(200):
+        full = list(history.view())
+    print(f"full read with decompression: {(time.perf_counter() - started) / 200 * 1e6:.0f} us, "
+          f"round-trip equal: {full == messages}")
+
+
+def main(sessions=10_000, hot_settings=(SESSION_HOT_TOKENS, 4000, 1000)):
+    count_text_tokens("warm up")
+    sample = list(turns_for(0))
+    messages = sessions * TURNS * 2
+    print(f"{sessions} sessions x {TURNS} turns = {messages} messages, "
+          f"{sum(len(m['content']) for m in sample) / len(sample):.0f} chars/message, "
+          f"{count_prompt_tokens(sample)} tokens per session")
+    store, used, elapsed = measure(lambda: as_dicts(sessions))
+    print(f"{'list of dicts':27s} {used / messages:6.1f} B/message  {used / 2 ** 20:7.1f} MiB  build {elapsed:5.1f} s")
+    del store
+    kept = None
+    for hot in hot_settings:
+        store, used, elapsed = measure(lambda: as_histories(sessions, hot))
+        cold = sum(h.cold_count for h in store) / messages
+        print(f"ChatHistory hot={hot:6d} tok  {used / messages:6.1f} B/message  {used / 2 ** 20:7.1f} MiB  "
+              f"build {elapsed:5.1f} s  compressed {cold:.0%}")
+        if kept is None and store[0].cold_count:
+            kept = store[0]
+        del store
+    if kept is not None:
+        asyncio.run(fit_cost(kept))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--hot", type=int, nargs="+", default=[SESSION_HOT_TOKENS, 4000, 1000])
+    args = parser.parse_args()
+    main(args.sessions, args.hot)
@@ -0,0 +1,44 @@
+"""
+    Soak test of the in-memory session store: appends a turn to N distinct
+    session ids and reports peak RSS as it goes. With the store bounded by
+    SESSION_MAX_SESSIONS the RSS levels off instead of growing with N.
+
+        python -m benchmarks.bench_session_store --sessions 1000000 --max-sessions 10000
+"""
+import argparse
+import asyncio
+import os
+import resource
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.Service.sessionStore import MemorySessionStore  # noqa: E402
+
+
+def peak_rss_mb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+
+async def main(sessions: int, max_sessions: int):
+    store = MemorySessionStore(max_sessions=max_sessions, ttl_seconds=3600)
+    turn = [{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi there"}]
+    report_every = max(1, sessions // 5)
+    started = time.perf_counter()
+    for i in range(sessions):
+        async with store.lock(f"session-{i}"):
+            await store.append(f"session-{i}", turn)
+        if i % report_every == 0:
+            print(f"{i:>9} sessions written: peak rss {peak_rss_mb()} MB, held {len(store)}, "
+                  f"locks {len(store._local_locks)}")
+    elapsed = time.perf_counter() - started
+    print(f"{sessions} sessions in {elapsed:.1f}s ({elapsed / sessions * 1e6:.1f} us per turn), "
+          f"peak rss {peak_rss_mb()} MB, held {len(store)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--max-sessions", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions, args.max_sessions))
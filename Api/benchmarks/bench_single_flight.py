@@ -0,0 +1,52 @@
+"""
+    Upstream calls made by 100 identical concurrent completions and streams,
+    with LLM_COALESCE_ENABLED on (the default) or off. Needs benchmarks.stub_llm:
+
+        python -m benchmarks.stub_llm --port 9100 --delay 0.2 &
+        OPENAI_BASE_URL=http://127.0.0.1:9100/v1 python -m benchmarks.bench_single_flight
+"""
+import argparse
+import asyncio
+import os
+import time
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:9100/v1")
+
+from app.Service.llmClient import create_chat_completion, stream_chat_completion  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "What is my leave balance?"}]
+
+
+async def upstream_calls(client: httpx.AsyncClient) -> int:
+    base = os.environ["OPENAI_BASE_URL"].rsplit("/v1", 1)[0]
+    return (await client.get(f"{base}/calls")).json()["completions"]
+
+
+async def main(callers: int):
+    async with httpx.AsyncClient() as client:
+        before, started = await upstream_calls(client), time.perf_counter()
+        responses = await asyncio.gather(*(
+            create_chat_completion(stage="LLM0", prompt_version=1, model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+            for _ in range(callers)))
+        after = await upstream_calls(client)
+        replies = {r.choices[0].message.content for r in responses}
+        print(f"create: {callers} callers -> {after - before} upstream calls, {len(replies)} distinct replies, "
+              f"{time.perf_counter() - started:.2f}s")
+
+        async def consume():
+            chunks = stream_chat_completion(stage="Chat", model="gpt-4o-mini", messages=MESSAGES)
+            return "".join([chunk.choices[0].delta.content or "" async for chunk in chunks])
+
+        before, started = after, time.perf_counter()
+        texts = await asyncio.gather(*(consume() for _ in range(callers)))
+        after = await upstream_calls(client)
+        print(f"stream: {callers} callers -> {after - before} upstream calls, {len(set(texts))} distinct replies, "
+              f"{time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=100)
+    asyncio.run(main(parser.parse_args().callers))
@@ -0,0 +1,73 @@
+"""
+    Latency of a multi-stage turn with stub LLM latencies (+-10% jitter):
+    the stages awaited one after another versus run by StageGraph, which
+    should take the critical path instead of the sum. Also reports 50
+    concurrent turns and the executor's own overhead with no-op stages.
+
+        python -m benchmarks.bench_stage_graph
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.Service.stageGraph import Stage, StageGraph  # noqa: E402
+
+LATENCIES = {"LLM0": 0.80, "Summary_LLM": 0.60, "LLM1": 0.40, "LLM2": 0.50, "DOC_LLM": 0.30}
+INPUTS = {"LLM0": (), "Summary_LLM": (), "LLM1": ("LLM0",), "LLM2": ("LLM0",), "DOC_LLM": ("LLM1", "LLM2", "Summary_LLM")}
+
+
+def stub_llm(name):
+    async def run(**inputs):
+        await asyncio.sleep(LATENCIES[name] * random.uniform(0.9, 1.1))
+        return name
+    return run
+
+
+def critical_path(name):
+    return LATENCIES[name] + max((critical_path(i) for i in INPUTS[name]), default=0)
+
+
+async def no_op(**inputs):
+    await asyncio.sleep(0)
+
+
+async def sequential():
+    for name in LATENCIES:
+        await stub_llm(name)()
+
+
+async def measure(turn, turns):
+    samples = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        await turn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), max(samples)
+
+
+async def main(turns=20):
+    graph = StageGraph([Stage(name, stub_llm(name), INPUTS[name]) for name in LATENCIES])
+    print(f"sum of stages {sum(LATENCIES.values()) * 1000:.0f} ms, "
+          f"critical path {max(map(critical_path, LATENCIES)) * 1000:.0f} ms")
+    for label, turn in (("sequential", sequential), ("StageGraph", graph.run)):
+        p50, worst = await measure(turn, turns)
+        print(f"{label:11s} p50 {p50 * 1000:7.1f} ms  max {worst * 1000:7.1f} ms")
+    started = time.perf_counter()
+    await asyncio.gather(*(graph.run() for _ in range(50)))
+    print(f"50 concurrent turns: {(time.perf_counter() - started) * 1000:.0f} ms wall")
+    empty = StageGraph([Stage(name, no_op, INPUTS[name]) for name in LATENCIES])
+    started = time.perf_counter()
+    for _ in range(2000):
+        await empty.run()
+    print(f"executor overhead, {len(LATENCIES)} no-op stages: {(time.perf_counter() - started) / 2000 * 1e6:.0f} us per turn")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    asyncio.run(main(parser.parse_args().turns))
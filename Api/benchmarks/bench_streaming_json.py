@@ -0,0 +1,79 @@
+"""
+    Parsing a ~50 KB streamed LLM JSON answer in 8-character chunks: the
+    previous parse_streaming_json, which re-parses the whole accumulated
+    text on every chunk, versus the incremental StreamingJsonParser.
+
+        python -m benchmarks.bench_streaming_json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.Utils.streamingJson import StreamingJsonParser  # noqa: E402
+
+
+def parse_streaming_json(data: str):
+    """The previous implementation, kept here for comparison."""
+    def preprocess_json(s: str) -> str:
+        s = re.sub(r'(\w+):', r'"\1":', s)
+        s = re.sub(r': (?![\{\[\"\d])(.*?)(?=,|}|$)', r': "\1"', s)
+        return s
+
+    try:
+        return json.loads(data), True
+    except json.JSONDecodeError:
+        if data.count('{') == data.count('}') and data.strip().startswith('{') and data.strip().endswith('}'):
+            try:
+                return json.loads(preprocess_json(data))
+            except json.JSONDecodeError as e:
+                logging.warning(f"Failed to parse what looks like a complete JSON object: {data}")
+                logging.warning(f"Error: {str(e)}")
+        return None
+
+
+def build(size):
+    random.seed(4)
+    entities = [{"entityId": i, "entityName": f"Entity {i} " + "lorem " * random.randint(2, 10),
+                 "entityType": "Supplier", "score": random.random()} for i in range(400)]
+    document = {"isSingleSelect": False, "entities": entities}
+    text = json.dumps(document)
+    while len(text) < size:
+        entities.append(entities[0])
+        text = json.dumps(document)
+    return document, text
+
+
+def main(size=50_000, chunk=8):
+    logging.disable(logging.WARNING)
+    document, text = build(size)
+    chunks = [text[i:i + chunk] for i in range(0, len(text), chunk)]
+    print(f"payload {len(text)} bytes in {len(chunks)} chunks")
+
+    started, accumulated = time.perf_counter(), ""
+    for piece in chunks:
+        accumulated += piece
+        result = parse_streaming_json(accumulated)
+    assert result[0] == document
+    print(f"parse_streaming_json  {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    started, parser, early = time.perf_counter(), StreamingJsonParser(), 0
+    for piece in chunks:
+        result = parser.feed(piece)
+        early += len(result.items)
+    assert result.complete and result.value == document
+    print(f"StreamingJsonParser   {(time.perf_counter() - started) * 1000:8.1f} ms  "
+          f"({early} top-level members emitted)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=50_000)
+    parser.add_argument("--chunk", type=int, default=8)
+    args = parser.parse_args()
+    main(args.size, args.chunk)
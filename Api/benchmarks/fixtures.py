@@ -0,0 +1,31 @@
+"""
+    Seeds the database named by DATABASE_URL with what a chat turn needs
+    (tables, a user, the "Chat" prompt and suggested questions):
+
+        DATABASE_URL=sqlite:///./bench.db python -m benchmarks.fixtures
+"""
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-key-not-used")
+
+from app.DB import models  # noqa: E402
+from app.DB.database import Base, SessionLocal, engine  # noqa: E402
+
+
+def seed_chat_db(questions: int = 200):
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        if db.get(models.User, 1) is not None:
+            return
+        db.add(models.User(Id=1, Name="bench"))
+        db.add(models.PromptConfigurationsHistory(Id=1, name="Chat", VersionNumber=1, UserId=1))
+        db.add(models.PromptConfigurationsVersion(Id=1, name="Chat", PromptHistoryId=1))
+        for i in range(questions):
+            db.add(models.Question(Id=i + 1, Question=f"Suggested question number {i}?",
+                                   Platform="web" if i % 2 else None, UserRole="analyst" if i % 3 == 0 else "admin",
+                                   RankOrder=i, Active=i < questions * 3 // 4))
+        db.commit()
+
+
+if __name__ == "__main__":
+    seed_chat_db()
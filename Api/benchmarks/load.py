@@ -0,0 +1,63 @@
+"""
+    Open-loop load generator: fires POSTs at a fixed rate regardless of how
+    fast they complete (so queueing shows up in the tail) and reports the
+    achieved rate, errors and p50/p95/p99 latency.
+
+        python -m benchmarks.load http://127.0.0.1:8000/chat --rate 500 --seconds 20
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable, Dict, List
+import httpx
+
+
+def default_body(i: int, sessions: int) -> Dict:
+    return {"user_message": f"question number {i} " + "context " * 20, "session_id": f"bench-{i % sessions}"}
+
+
+def percentile(latencies: List[float], p: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+async def open_loop(url: str, rate: float, seconds: float, sessions: int = 40,
+                    body: Callable[[int, int], Dict] = default_body) -> Dict:
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=4000, max_keepalive_connections=4000)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        async def one(i):
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=body(i, sessions))
+                errors += response.status_code != 200
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+        total, tasks, start = int(rate * seconds), [], time.perf_counter()
+        for i in range(total):
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(i)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return {"requests": total, "achieved_rps": total / elapsed, "errors": errors,
+            **{f"p{int(p * 100)}_ms": percentile(latencies, p) * 1000 for p in (0.5, 0.95, 0.99)}}
+
+
+def report(result: Dict) -> str:
+    return (f"n={result['requests']} achieved={result['achieved_rps']:.0f} req/s errors={result['errors']} "
+            f"p50={result['p50_ms']:.0f}ms p95={result['p95_ms']:.0f}ms p99={result['p99_ms']:.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url")
+    parser.add_argument("--rate", type=float, default=500)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--sessions", type=int, default=40)
+    args = parser.parse_args()
+    print(report(asyncio.run(open_loop(args.url, args.rate, args.seconds, args.sessions))))
@@ -0,0 +1,106 @@
+"""
+    OpenAI-compatible stub used by the benchmarks: answers chat completions
+    (plain and streamed) and embeddings after a fixed delay, and counts calls.
+
+        python -m benchmarks.stub_llm --port 9100 --delay 0.05
+
+    Point the API at it with OPENAI_BASE_URL=http://127.0.0.1:9100/v1.
+    GET /calls returns the counters, POST /reset clears them and POST /fail
+    {"status": 503} makes every completion fail until POST /fail {"status": 0};
+    {"status": 429, "retry_after": 1} also sends a Retry-After header.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI()
+settings = {"delay": 0.05, "words": 4, "echo": False, "fail_status": 0, "retry_after": None}
+counters = {"completions": 0, "embeddings": 0, "cancelled": 0, "failed": 0}
+
+
+def reply_text(body) -> str:
+    if settings["echo"]:
+        return f"answer to: {body['messages'][-1]['content']}"
+    return " ".join(["hello from stub"] * settings["words"])
+
+
+def _usage():
+    return {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+
+
+@app.get("/calls")
+async def calls():
+    return counters
+
+
+@app.post("/reset")
+async def reset():
+    for key in counters:
+        counters[key] = 0
+    return counters
+
+
+@app.post("/fail")
+async def fail(request: Request):
+    body = await request.json()
+    settings["fail_status"] = int(body.get("status", 0))
+    settings["retry_after"] = body.get("retry_after")
+    return settings
+
+
+@app.post("/v1/chat/completions")
+async def completions(request: Request):
+    body = await request.json()
+    counters["completions"] += 1
+    if settings["fail_status"]:
+        counters["failed"] += 1
+        headers = {"retry-after": str(settings["retry_after"])} if settings["retry_after"] is not None else None
+        return JSONResponse({"error": {"message": "stub failure", "type": "server_error"}},
+                            status_code=settings["fail_status"], headers=headers)
+    text = reply_text(body)
+    if body.get("stream"):
+        async def chunks():
+            await asyncio.sleep(settings["delay"] / 4)
+            for word in text.split(" "):
+                chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                         "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(settings["delay"] / 20)
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+    try:
+        await asyncio.sleep(settings["delay"])
+    except asyncio.CancelledError:
+        counters["cancelled"] += 1
+        raise
+    return JSONResponse({"id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                         "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                      "finish_reason": "stop"}],
+                         "usage": _usage()})
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    counters["embeddings"] += 1
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    data = []
+    for i, text in enumerate(inputs):
+        digest = hashlib.sha256(str(text).encode()).digest()
+        data.append({"object": "embedding", "index": i, "embedding": [b / 255 for b in digest]})
+    return {"object": "list", "data": data, "model": body.get("model", "stub"), "usage": _usage()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds per completion")
+    parser.add_argument("--words", type=int, default=4, help="length of the canned reply")
+    parser.add_argument("--echo", action="store_true", help='reply "answer to: <last message>"')
+    args = parser.parse_args()
+    settings.update(delay=args.delay, words=args.words, echo=args.echo)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -1,21 +1,61 @@
 import uvicorn
+from app.Utils.logConfig import setup_logging, stop_logging, CorrelationIdMiddleware
+
+# Before the app modules are imported, so their import-time warnings go through the queue too
+setup_logging()
+
+from contextlib import asynccontextmanager
 from fastapi.routing import Mount
 from fastapi.staticfiles import StaticFiles
 from fastapi import FastAPI
 from app.Routes.chatRoutes import chatRouter
+from app.Routes.configRoutes import configRouter
+from app.Routes.analyticsRoutes import analyticsRouter
+from app.Routes.metricsRoutes import metricsRouter
+from app.Service.configSnapshot import config_snapshot
+from app.Service.promptRegistry import prompt_registry
+from app.Service.debugTraceStore import debug_trace_store
+from app.Service.conversationWriter import conversation_writer
+from app.Service.questionWarmer import question_warmer
+from app.Service.contextWindow import load_encoding
+from app.Utils.jsonCodec import FastJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.extractEnvVariables import PORT
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await load_encoding()
+    await config_snapshot.start()
+    await prompt_registry.start()
+    await debug_trace_store.start()
+    await conversation_writer.start()
+    await question_warmer.start()
+    yield
+    await question_warmer.stop()
+    await prompt_registry.stop()
+    await config_snapshot.stop()
+    # Drain queued conversation records before the worker exits
+    await conversation_writer.stop()
+    # Flush queued debug traces before the worker exits
+    debug_trace_store.close()
+    stop_logging()
+
     
 # FastAPI app
 app = FastAPI(
     title="Chatbot API",
-    routes=[Mount("/static", app=StaticFiles(directory="./static"), name="static")]
+    routes=[Mount("/static", app=StaticFiles(directory="./static"), name="static")],
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
         
 
 # Include router
 app.include_router(chatRouter)
+app.include_router(configRouter)
+app.include_router(analyticsRouter)
+app.include_router(metricsRouter)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,7 +63,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id", "X-Request-Id"],
 )
+app.add_middleware(CorrelationIdMiddleware)
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=int(PORT), reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=int(PORT), reload=True)
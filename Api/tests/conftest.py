@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+# Settings are read from the environment at import time; keep tests off real services and ./chatbot.db
+_tmp = tempfile.mkdtemp(prefix="chatbot-tests-")
+os.environ.setdefault("OPENAI_API_KEY", "test-key-not-used")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/chatbot.db")
+os.environ.setdefault("SESSION_SQLITE_PATH", f"{_tmp}/chat_sessions.db")
+os.environ.setdefault("LOG_FORMAT", "text")
+
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def db_tables():
+    """Creates every table in the test database once."""
+    from app.DB import models  # noqa: F401  registers the tables
+    from app.DB.database import Base, engine
+    Base.metadata.create_all(engine)
@@ -0,0 +1,68 @@
+import asyncio
+import sys
+from app.Service.chatHistory import ChatHistory
+from app.Service.contextWindow import count_prompt_tokens, create_context_strategy
+
+
+def conversation(turns):
+    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"Question {i} about Fund Ä{i}?"})
+        messages.append({"role": "assistant", "content": f"Answer {i}: " + "the fund returned 4% " * (i % 5 + 1)})
+    return messages
+
+
+def test_round_trip_with_cold_blocks_and_extra_messages():
+    messages = conversation(40)
+    messages.insert(5, {"role": "assistant", "content": None, "tool_calls": [{"id": "t1"}]})
+    messages.append({"role": "function", "content": "kept as is"})
+    history = ChatHistory(messages, hot_tokens=200, block_size=8)
+
+    assert history.cold_count > 0 and len(history) == len(messages)
+    assert list(history.view()) == messages
+    # Messages read back are copies: editing one doesn't change the log
+    history.view()[5]["tool_calls"].append("changed")
+    assert history.view()[5] == messages[5]
+
+
+def test_newest_messages_stay_uncompressed():
+    history = ChatHistory(conversation(40), hot_tokens=200, block_size=8)
+    hot = len(history) - history.cold_count
+    assert count_prompt_tokens(list(history.view())[-hot:]) >= 200
+    assert history.cold_count % 8 == 0
+    assert ChatHistory(conversation(40), hot_tokens=10 ** 6).cold_count == 0
+
+
+def test_view_slicing_indexing_and_concatenation():
+    messages = conversation(20)
+    view = ChatHistory(messages, hot_tokens=100, block_size=4).view()
+    extra = [{"role": "user", "content": "next?"}]
+
+    assert view[0] == messages[0] and view[-1] == messages[-1]
+    assert list(view[3:17]) == messages[3:17] and list(view[::3]) == messages[::3]
+    combined = view + extra
+    assert len(combined) == len(messages) + 1 and list(combined) == messages + extra
+    assert list(combined[-3:]) == (messages + extra)[-3:]
+    assert list(reversed(combined)) == list(reversed(messages + extra))
+    assert extra + view == extra + messages
+    assert combined.prompt_tokens() == count_prompt_tokens(messages + extra)
+    assert not view[5:5] and not ChatHistory().view()
+
+
+def test_fitting_a_view_matches_fitting_the_list():
+    messages = conversation(60)
+    view = ChatHistory(messages, hot_tokens=300, block_size=8).view()
+    turn = [{"role": "user", "content": "And the latest quarter?"}]
+    strategy = create_context_strategy("system_recent")
+
+    async def fit(candidate):
+        return list(await strategy.fit(candidate, 500))
+
+    assert asyncio.run(fit(view + turn)) == asyncio.run(fit(messages + turn))
+
+
+def test_compact_history_is_smaller_than_the_list_of_dicts():
+    messages = conversation(50)
+    history = ChatHistory(messages, hot_tokens=300)
+    as_dicts = sys.getsizeof(messages) + sum(sys.getsizeof(m) + sys.getsizeof(m["content"]) for m in messages)
+    assert history.nbytes() < as_dicts / 2
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from app.DB import schemas
+from app.Service import chatService
+from app.Service.chatPrefetch import ChatPrefetcher
+from app.Service.responseCache import CachePolicy, ResponseCache
+from app.Service.sessionStore import MemorySessionStore
+from app.Utils.lruCache import LRUTTLCache
+
+USAGE = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+
+
+async def reply():
+    return "reply", USAGE
+
+
+def test_lru_pop_honours_ttl():
+    evicted = []
+    cache = LRUTTLCache(10, 0.05, on_evict=lambda key, value: evicted.append(key))
+    cache.set("fresh", 1, ttl_seconds=60)
+    cache.set("stale", 2)
+    time.sleep(0.06)
+    assert cache.pop("stale") is None
+    assert evicted == ["stale"]
+    assert cache.pop("fresh") == 1
+    assert len(cache) == 0
+
+
+def test_take_ignores_an_expired_prefetch():
+    async def run():
+        prefetcher = ChatPrefetcher(enabled=True, debounce=0, ttl_seconds=0.05)
+        assert prefetcher.schedule("s", "key", reply) == "scheduled"
+        await asyncio.sleep(0.1)
+        assert prefetcher.take("s", "key") is None
+        assert prefetcher.stats["expired"] == 1 and prefetcher.stats["hits"] == 0
+        assert prefetcher.stats["wasted_tokens"] == USAGE.total_tokens
+    asyncio.run(run())
+
+
+def test_take_hands_over_a_finished_prefetch():
+    async def run():
+        prefetcher = ChatPrefetcher(enabled=True, debounce=0)
+        prefetcher.schedule("s", "key", reply)
+        await asyncio.sleep(0.01)
+        prefetch = prefetcher.take("s", "key")
+        assert await prefetch.task == ("reply", USAGE)
+        assert prefetch.elapsed is not None and prefetcher.stats["hits"] == 1
+        prefetcher.schedule("s", "key", reply)
+        await asyncio.sleep(0.01)
+        assert prefetcher.take("s", "other") is None and prefetcher.stats["misses"] == 1
+    asyncio.run(run())
+
+
+def test_in_flight_cap_spans_sessions():
+    async def run():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "reply", USAGE
+
+        prefetcher = ChatPrefetcher(enabled=True, debounce=0, max_in_flight=2)
+        assert [prefetcher.schedule(f"s{i}", "key", slow) for i in range(3)] == ["scheduled", "scheduled", "capped"]
+        # Replacing a session's own prefetch frees its slot
+        assert prefetcher.schedule("s0", "newer", slow) == "scheduled"
+        release.set()
+        await asyncio.sleep(0.01)
+        assert prefetcher.schedule("s2", "key", slow) == "scheduled"
+        await asyncio.sleep(0.01)
+        assert prefetcher.pending() == 3
+    asyncio.run(run())
+
+
+def test_client_budget_spans_sessions():
+    async def run():
+        prefetcher = ChatPrefetcher(enabled=True, debounce=0, max_calls=10, max_client_calls=2)
+        for i in range(2):
+            assert prefetcher.schedule(f"s{i}", "key", reply, client_id="c") == "scheduled"
+            await asyncio.sleep(0.01)
+        # A fresh session id does not reset the client's budget; another client is unaffected
+        assert prefetcher.schedule("s-new", "key", reply, client_id="c") == "capped"
+        assert prefetcher.schedule("s-new", "key", reply, client_id="d") == "scheduled"
+        await asyncio.sleep(0.01)
+    asyncio.run(run())
+
+
+def test_prefetch_is_cached_only_when_a_turn_takes_it(monkeypatch):
+    calls, embedded = [], []
+
+    async def create_chat_completion(**kwargs):
+        calls.append(kwargs["stage"])
+        message = SimpleNamespace(content=f"answer to: {kwargs['messages'][-1]['content']}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=USAGE)
+
+    async def embed(text):
+        embedded.append(text)
+        return [1.0, 0.0]
+
+    async def get_policy(_):
+        return CachePolicy(read=True, write=True, prompt_version=1, prompt_id=1)
+
+    cache = ResponseCache(semantic=True)
+    monkeypatch.setattr(cache, "embed", embed)
+    monkeypatch.setattr(cache, "get_policy", get_policy)
+    monkeypatch.setattr(chatService, "response_cache", cache)
+    monkeypatch.setattr(chatService, "create_chat_completion", create_chat_completion)
+    monkeypatch.setattr(chatService, "chat_prefetcher", ChatPrefetcher(enabled=True, debounce=0))
+    monkeypatch.setattr(chatService, "session_store", MemorySessionStore())
+    monkeypatch.setattr(chatService.conversation_writer, "mode", "off")
+
+    def request(text):
+        return schemas.ChatRequest(user_message=text, session_id="s", client_id="c")
+
+    async def run():
+        for partial in ("What is my leave", "What is my leave balance"):
+            assert (await chatService.chat_prefetch_service(request(partial))).status == "scheduled"
+            await asyncio.sleep(0.01)
+        # Keystrokes neither embed, nor write the cache, nor count as lookups
+        assert calls == ["Prefetch", "Prefetch"]
+        assert embedded == [] and len(cache.exact) == 0
+        assert cache.stats["lookups"] == 0 and cache.stats["writes"] == 0
+
+        response = await chatService.chat_with_bot_service(request("What is my leave balance"))
+        assert response.reply == "answer to: What is my leave balance" and not response.from_cache
+        assert calls == ["Prefetch", "Prefetch"]
+        assert chatService.chat_prefetcher.stats["hits"] == 1
+        # The reply a turn used is cached; the abandoned partial input is not
+        assert cache.stats["writes"] == 1 and len(cache.exact) == 1
+    asyncio.run(run())
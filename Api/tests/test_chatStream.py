@@ -0,0 +1,98 @@
+import json
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.Routes import chatRoutes
+from app.Routes.chatRoutes import NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE
+
+
+def chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The chat router alone, with the service replaced by a canned stream."""
+    replies = {"fail": None}
+
+    def chat_stream_service(request):
+        async def chunks():
+            for word in ("Hello", None, " there"):
+                yield chunk(word)
+            if replies["fail"]:
+                raise RuntimeError(replies["fail"])
+        return request.session_id or "new-session", chunks()
+
+    monkeypatch.setattr(chatRoutes, "chat_stream_service", chat_stream_service)
+    app = FastAPI()
+    app.include_router(chatRoutes.chatRouter)
+    with TestClient(app) as test_client:
+        test_client.replies = replies
+        yield test_client
+
+
+def stream(client, params=None, accept=None, session_id="s-1"):
+    headers = {"Accept": accept} if accept else {}
+    return client.post("/chat/stream", params=params, headers=headers,
+                       json={"user_message": "hi", "session_id": session_id})
+
+
+def sse_events(text):
+    events = []
+    for block in filter(None, text.split("\n\n")):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields.get("event"), json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.parametrize("params, accept, media_type", [
+    (None, None, SSE_MEDIA_TYPE),
+    (None, "text/event-stream", SSE_MEDIA_TYPE),
+    (None, NDJSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE),
+    ({"format": "ndjson"}, "text/event-stream", NDJSON_MEDIA_TYPE),
+    ({"format": "sse"}, NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE),
+])
+def test_format_query_wins_over_accept_header(client, params, accept, media_type):
+    response = stream(client, params, accept)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(media_type)
+    assert response.headers["x-session-id"] == "s-1"
+
+
+def test_unknown_format_is_rejected(client):
+    assert stream(client, {"format": "xml"}).status_code == 422
+
+
+def test_sse_frames_carry_deltas_then_a_last_frame_with_the_session(client):
+    events = sse_events(stream(client, {"format": "sse"}, session_id=None).text)
+    assert events == [
+        ("message", {"content": "Hello", "is_last": False}),
+        ("message", {"content": " there", "is_last": False}),
+        ("message", {"content": "", "session_id": "new-session", "is_last": True}),
+    ]
+
+
+def test_ndjson_lines_carry_deltas_then_a_last_line_with_the_session(client):
+    text = stream(client, {"format": "ndjson"}).text
+    assert text.endswith("\n")
+    lines = [json.loads(line) for line in text.splitlines()]
+    assert lines == [
+        {"event": 1, "data": {"content": "Hello", "is_last": False}},
+        {"event": 2, "data": {"content": " there", "is_last": False}},
+        {"event": 3, "data": {"content": "", "session_id": "s-1", "is_last": True}},
+    ]
+
+
+@pytest.mark.parametrize("format", ["sse", "ndjson"])
+def test_failure_mid_stream_ends_with_an_error_event(client, format):
+    client.replies["fail"] = "upstream broke"
+    text = stream(client, {"format": format}).text
+    if format == "sse":
+        events = sse_events(text)
+        assert events[-1] == ("error", {"error": "upstream broke"})
+        assert [data["content"] for _, data in events[:-1]] == ["Hello", " there"]
+    else:
+        lines = [json.loads(line) for line in text.splitlines()]
+        assert lines[-1] == {"event": "error", "data": {"error": "upstream broke"}}
+        assert not any(line["data"].get("is_last") for line in lines)
@@ -0,0 +1,57 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.Routes import configRoutes
+from app.Utils import adminAuth
+
+ADMIN_ENDPOINTS = ["/config/invalidate", "/config/prompts/reload", "/config/questions/warm"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    reloads = []
+
+    class Reloadable:
+        def __init__(self, name):
+            self.name = name
+
+        async def refresh(self, force=False):
+            reloads.append(self.name)
+
+        async def invalidate(self):
+            reloads.append(self.name)
+
+        def metrics(self):
+            return {}
+
+    monkeypatch.setattr(configRoutes, "config_snapshot", Reloadable("config"))
+    monkeypatch.setattr(configRoutes, "prompt_registry", Reloadable("prompts"))
+    monkeypatch.setattr(configRoutes, "question_warmer", Reloadable("questions"))
+    app = FastAPI()
+    app.include_router(configRoutes.configRouter)
+    with TestClient(app) as test_client:
+        test_client.reloads = reloads
+        yield test_client
+
+
+@pytest.mark.parametrize("path", ADMIN_ENDPOINTS)
+def test_admin_endpoints_are_disabled_without_a_configured_key(client, monkeypatch, path):
+    monkeypatch.setattr(adminAuth, "ADMIN_API_KEY", None)
+    assert client.post(path, headers={"X-Admin-Key": "anything"}).status_code == 403
+    assert client.reloads == []
+
+
+@pytest.mark.parametrize("path", ADMIN_ENDPOINTS)
+def test_admin_endpoints_require_the_key(client, monkeypatch, path):
+    monkeypatch.setattr(adminAuth, "ADMIN_API_KEY", "s3cret")
+    assert client.post(path).status_code == 401
+    assert client.post(path, headers={"X-Admin-Key": "wrong"}).status_code == 401
+    assert client.reloads == []
+    assert client.post(path, headers={"X-Admin-Key": "s3cret"}).status_code == 200
+    assert len(client.reloads) == 1
+
+
+def test_read_only_metrics_stay_open(client, monkeypatch):
+    monkeypatch.setattr(adminAuth, "ADMIN_API_KEY", "s3cret")
+    for path in ("/config/snapshot", "/config/prompts", "/config/questions/warming"):
+        assert client.get(path).status_code == 200
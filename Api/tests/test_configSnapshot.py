@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import delete, update
+from app.DB import crud, models
+from app.DB.database import SessionLocal, async_engine
+from app.Service.configSnapshot import ConfigSnapshotService, freeze
+
+
+@pytest.fixture
+def configurations(db_tables):
+    """GlobalConfigurations 901-902, reset for every test."""
+    with SessionLocal() as db:
+        db.execute(delete(models.GlobalConfigurations).where(models.GlobalConfigurations.Id.between(900, 999)))
+        db.add_all([
+            models.GlobalConfigurations(Id=901, name="snapshot-test-json", data='{"limit": 5, "tags": ["a", "b"]}'),
+            models.GlobalConfigurations(Id=902, name="snapshot-test-text", data="plain text"),
+        ])
+        db.commit()
+
+
+def run(*steps):
+    """Awaits each step in one event loop and returns their results."""
+    async def main():
+        try:
+            return [await step() for step in steps]
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+
+def touch(config_id, seconds=60):
+    with SessionLocal() as db:
+        db.execute(update(models.GlobalConfigurations).where(models.GlobalConfigurations.Id == config_id)
+                   .values(data='{"limit": 10}', UpdatedAt=datetime.now() + timedelta(seconds=seconds)))
+        db.commit()
+
+
+def test_freeze_makes_mappings_and_sequences_read_only():
+    frozen = freeze({"a": [1, {"b": [2, 3]}], "c": ("d",)})
+    assert frozen["a"] == (1, {"b": (2, 3)}) and frozen["c"] == ("d",)
+    with pytest.raises(TypeError):
+        frozen["x"] = 1
+    with pytest.raises(TypeError):
+        frozen["a"][1]["b"] = ()
+    with pytest.raises(AttributeError):
+        frozen["a"].append(4)
+
+
+def test_snapshot_is_parsed_and_read_only(configurations):
+    service = ConfigSnapshotService()
+    snapshot, = run(service.current)
+    configs = snapshot.global_configurations
+    assert configs["snapshot-test-json"] == {"limit": 5, "tags": ("a", "b")}
+    assert configs["snapshot-test-text"] == "plain text"
+    with pytest.raises(TypeError):
+        configs["snapshot-test-json"]["limit"] = 6
+
+
+def test_reloads_only_when_the_tables_change(configurations):
+    service = ConfigSnapshotService()
+    first, unchanged = run(service.refresh, service.refresh)
+    assert unchanged is first and service.stats["loads"] == 1 and service.stats["checks"] == 2
+
+    touch(901)
+    changed, = run(service.refresh)
+    assert changed is not first and service.stats["loads"] == 2
+    assert changed.global_configurations["snapshot-test-json"] == {"limit": 10}
+    assert changed.version != first.version
+
+
+def test_invalidate_forces_a_reload(configurations):
+    service = ConfigSnapshotService()
+    first, forced = run(service.refresh, service.invalidate)
+    assert forced is not first and forced.version == first.version
+    assert service.stats["loads"] == 2
+
+
+def test_failed_refresh_keeps_the_current_snapshot(configurations, monkeypatch):
+    service = ConfigSnapshotService(refresh_interval=0.01)
+    first, = run(service.refresh)
+
+    async def unreachable(db):
+        raise ConnectionError("database unreachable")
+
+    monkeypatch.setattr(crud, "get_configuration_versions", unreachable)
+    touch(901)
+
+    async def serve_while_failing():
+        task = asyncio.create_task(service._refresh_loop())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        return await service.current()
+
+    current, = run(serve_while_failing)
+    assert current is first and service.stats["refresh_errors"] > 0
+    assert current.global_configurations["snapshot-test-json"]["limit"] == 5
+    with pytest.raises(ConnectionError):
+        run(service.invalidate)
+    assert service._snapshot is first
+
+
+def test_metrics_count_hits_and_refreshes(configurations):
+    service = ConfigSnapshotService()
+    assert service.metrics()["version"] is None and service.metrics()["loaded_at"] is None
+    run(service.current, service.current, service.current, service.refresh)
+    metrics = service.metrics()
+    assert metrics["hits"] == 3 and metrics["loads"] == 1 and metrics["checks"] == 2
+    assert metrics["refresh_errors"] == 0 and metrics["last_refresh_seconds"] > 0
+    assert len(metrics["version"]) == 8 and metrics["loaded_at"]
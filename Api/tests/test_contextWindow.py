@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import threading
+import pytest
+import tiktoken
+from app.Service import chatService, contextWindow
+from app.Service.contextWindow import (
+    RollingSummaryStrategy, SlidingWindowStrategy, SystemAndRecentStrategy, SUMMARY_PREFIX, count_prompt_tokens,
+    count_text_tokens, load_encoding
+)
+from app.Service.sessionStore import MemorySessionStore
+
+
+def turns(n, words=40):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "word " * words} for i in range(n)]
+
+
+class FakeSummary(RollingSummaryStrategy):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.calls = 0
+
+    async def summarize(self, previous_summary, messages):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("Summary_LLM unavailable")
+        return f"{len(messages)} turns"
+
+
+def test_system_and_recent_keeps_system_messages():
+    messages = [{"role": "system", "content": "rules"}] + turns(40)
+    fitted = asyncio.run(SystemAndRecentStrategy().fit(messages, 500))
+    assert fitted[0]["content"] == "rules"
+    assert fitted[-1] == messages[-1]
+    assert count_prompt_tokens(fitted) <= 500
+
+
+def test_summary_not_called_when_history_fits():
+    strategy = FakeSummary()
+    history = turns(4)
+    fitted = asyncio.run(strategy.fit(history, 10000))
+    assert fitted == history and strategy.calls == 0
+    assert not strategy.rewrites_history(history, fitted)
+
+
+def test_summary_replaces_history_when_produced():
+    strategy = FakeSummary()
+    history = turns(40)
+    fitted = asyncio.run(strategy.fit(history, 500))
+    assert fitted[0]["content"].startswith(SUMMARY_PREFIX)
+    assert strategy.rewrites_history(history, fitted)
+
+
+def test_failed_summary_keeps_previous_summary_and_history():
+    strategy = FakeSummary(fail=True)
+    summary = {"role": "system", "content": SUMMARY_PREFIX + "earlier turns"}
+    history = [summary] + turns(40)
+    fitted = asyncio.run(strategy.fit(history, 500))
+    assert fitted[0] == summary
+    assert fitted[-1] == history[-1]
+    assert count_prompt_tokens(fitted) <= 500
+    assert not strategy.rewrites_history(history, fitted)
+
+
+def test_store_turn_appends_when_summary_fails(monkeypatch):
+    async def run():
+        store = MemorySessionStore()
+        summary = {"role": "system", "content": SUMMARY_PREFIX + "earlier turns"}
+        await store.replace("s", [summary] + turns(40))
+        monkeypatch.setattr(chatService, "session_store", store)
+        monkeypatch.setattr(chatService, "context_strategy", FakeSummary(fail=True))
+        history = await store.get("s")
+        user_turn = {"role": "user", "content": "next question"}
+        fitted = await chatService.context_strategy.fit(history + [user_turn], 500)
+        await chatService.store_turn("s", history, list(fitted), "answer")
+        stored = list(await store.get("s"))
+        assert len(stored) == 43
+        assert stored[0] == summary
+        assert stored[-2:] == [user_turn, {"role": "assistant", "content": "answer"}]
+    asyncio.run(run())
+
+
+def test_long_session_stays_within_budget_for_every_strategy():
+    async def run(strategy):
+        history, budget = [{"role": "system", "content": "You are a helpful assistant."}], 600
+        for i, message in enumerate(turns(200)):
+            if message["role"] == "assistant":
+                continue
+            fitted = await strategy.fit(history + [message], budget)
+            assert count_prompt_tokens(fitted) <= budget
+            assert fitted[-1] is message
+            reply = {"role": "assistant", "content": f"reply {i}"}
+            history = fitted + [reply] if strategy.rewrites_history(history, fitted) else history + [message, reply]
+
+    for strategy in (SlidingWindowStrategy(), SystemAndRecentStrategy(), FakeSummary()):
+        asyncio.run(run(strategy))
+
+
+@pytest.fixture
+def fresh_encoding():
+    """Forgets the loaded tokenizer and cached counts before and after the test."""
+    contextWindow._encoding.cache_clear()
+    count_text_tokens.cache_clear()
+    yield
+    contextWindow._encoding.cache_clear()
+    count_text_tokens.cache_clear()
+
+
+def test_encoding_is_loaded_off_the_event_loop(fresh_encoding, monkeypatch):
+    get_encoding = tiktoken.get_encoding
+    loaded_on = []
+
+    def recording_get_encoding(name):
+        loaded_on.append(threading.current_thread())
+        return get_encoding(name)
+
+    monkeypatch.setattr(tiktoken, "get_encoding", recording_get_encoding)
+
+    async def start_then_fit():
+        await load_encoding()
+        return await SystemAndRecentStrategy().fit(turns(10), 200)
+
+    asyncio.run(start_then_fit())
+    assert len(loaded_on) == 1 and loaded_on[0] is not threading.main_thread()
+
+
+def test_missing_tokenizer_falls_back_to_approximate_counts(fresh_encoding, monkeypatch, caplog):
+    def unavailable(name):
+        raise OSError("no network to fetch o200k_base")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", unavailable)
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(load_encoding())
+    assert "len(text) // 4 + 1" in caplog.text
+    assert count_text_tokens("x" * 40) == 11
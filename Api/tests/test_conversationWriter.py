@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import select
+from app.DB import models
+from app.DB.database import AsyncSessionLocal, async_engine
+from app.Service.conversationWriter import ConversationWriter, conversation_record
+
+
+def record(session_id, text, prompt_id=None):
+    now = datetime.now()
+    prompts = [{"PromptId": prompt_id, "PromptVersion": 3, "Response": "reply", "PromptTokens": 10, "CompletionTokens": 2,
+                "StartTime": now, "EndTime": now}]
+    return conversation_record(text, prompts, now, now, client_id="client-1", session_id=session_id,
+                               platform="web", user_role="Advisor")
+
+
+def test_records_get_chat_and_prompt_ids(db_tables):
+    async def run():
+        prompt_id = 7
+        writer = ConversationWriter(mode="queued", flush_interval=0.05)
+        await writer.start()
+        await writer.submit(record("session-a", "first", prompt_id))
+        await writer.submit(record("session-b", "other", prompt_id))
+        await writer.stop()
+        # A later batch of a known session reuses its Chats row
+        writer._task = None
+        writer.mode = "inline"
+        await writer.submit(record("session-a", "second", prompt_id))
+        async with AsyncSessionLocal() as db:
+            conversations = {c.UserPrompt: c for c in (await db.execute(
+                select(models.Conversation).where(models.Conversation.UserPrompt.in_(["first", "other", "second"]))
+            )).scalars()}
+            prompts = list((await db.execute(
+                select(models.ConversationPrompt).where(
+                    models.ConversationPrompt.ConversationId.in_([c.Id for c in conversations.values()]))
+            )).scalars())
+            chat = await db.get(models.Chat, conversations["first"].ChatId)
+        await async_engine.dispose()
+        return writer, prompt_id, conversations, prompts, chat
+
+    writer, prompt_id, conversations, prompts, chat = asyncio.run(run())
+    assert conversations["first"].ChatId is not None
+    assert conversations["first"].ChatId == conversations["second"].ChatId != conversations["other"].ChatId
+    assert (chat.CustomerId, chat.Platform, chat.Role) == ("client-1", "web", "Advisor")
+    assert len(prompts) == 3 and all(p.PromptId == prompt_id for p in prompts)
+    assert writer.stats["chats"] == 2 and writer.stats["failed"] == 0
+
+
+def chats_and_conversations(prompts):
+    async def run():
+        async with AsyncSessionLocal() as db:
+            conversations = list((await db.execute(
+                select(models.Conversation).where(models.Conversation.UserPrompt.in_(prompts))
+            )).scalars())
+            chats = list((await db.execute(
+                select(models.Chat).where(models.Chat.Id.in_({c.ChatId for c in conversations}))
+            )).scalars())
+        await async_engine.dispose()
+        return chats, conversations
+    return asyncio.run(run())
+
+
+def test_writers_of_different_workers_share_the_chat_of_a_session(db_tables):
+    # Each writer stands for a worker (or a restarted process) with its own in-memory map
+    first, second = ConversationWriter(mode="inline"), ConversationWriter(mode="inline")
+
+    async def run():
+        await first.submit(record("moved-session", "turn on worker 1"))
+        await second.submit(record("moved-session", "turn on worker 2"))
+        await first.submit(record("moved-session", "back on worker 1"))
+    asyncio.run(run())
+
+    chats, conversations = chats_and_conversations(["turn on worker 1", "turn on worker 2", "back on worker 1"])
+    assert len(conversations) == 3 and len(chats) == 1
+    assert chats[0].SessionId == "moved-session"
+    assert first.stats["chats"] + second.stats["chats"] == 1
+    assert first.stats["failed"] == second.stats["failed"] == 0
+
+
+def test_concurrent_first_turns_of_a_session_create_one_chat(db_tables):
+    writers = [ConversationWriter(mode="inline") for _ in range(4)]
+
+    async def run():
+        await asyncio.gather(*(w.submit(record("raced-session", f"raced turn {i}")) for i, w in enumerate(writers)))
+    asyncio.run(run())
+
+    chats, conversations = chats_and_conversations([f"raced turn {i}" for i in range(4)])
+    assert len(conversations) == 4 and len(chats) == 1
+    assert sum(w.stats["chats"] for w in writers) == 1
+    assert sum(w.stats["failed"] for w in writers) == 0
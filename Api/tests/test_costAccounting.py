@@ -0,0 +1,76 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from app.Service import conversationWriter
+from app.Service.conversationWriter import ConversationWriter, conversation_record
+from app.Service.costAccounting import CostAccounting, PriceIndex
+
+BASE = datetime(2024, 1, 1)
+
+
+def price_row(start, end, input_price, model="gpt-4o-mini", region=None):
+    return SimpleNamespace(Model=model, DeploymentName=None, Region=region, Currency="USD",
+                           StartDate=start, EndDate=end, InputTokensPrice=input_price, OutputTokensPrice=input_price * 2)
+
+
+def reference_lookup(rows, at):
+    """Latest-starting row covering `at`, the later row on equal starts."""
+    covering = [(r.StartDate or datetime.min, i, r) for i, r in enumerate(rows)
+                if (r.StartDate or datetime.min) <= at and (r.EndDate is None or at < r.EndDate)]
+    return max(covering, key=lambda c: (c[0], c[1]))[2].InputTokensPrice if covering else None
+
+
+def test_overlapping_intervals_match_reference():
+    rng = random.Random(15)
+    for _ in range(200):
+        rows = []
+        for n in range(rng.randint(1, 12)):
+            start = BASE + timedelta(days=rng.randint(0, 60)) if rng.random() > 0.1 else None
+            end = (start or BASE) + timedelta(days=rng.randint(1, 40)) if rng.random() > 0.3 else None
+            rows.append(price_row(start, end, float(n + 1)))
+        index = PriceIndex(rows)
+        for day in range(-5, 110):
+            at = BASE + timedelta(days=day, hours=rng.randint(0, 23))
+            found = index.lookup("GPT-4o-mini", "eu", at)
+            assert (found.input_price if found else None) == reference_lookup(rows, at)
+
+
+def test_region_specific_price_wins():
+    index = PriceIndex([price_row(BASE, None, 1.0), price_row(BASE, None, 5.0, region="EU")])
+    assert index.lookup("gpt-4o-mini", "eu", BASE).input_price == 5.0
+    assert index.lookup("gpt-4o-mini", "us", BASE).input_price == 1.0
+
+
+def record(client):
+    now = datetime.now()
+    prompts = [{"RequestPromptParameters": {"model": "gpt-4o-mini"}, "PromptTokens": 1000, "CompletionTokens": 1000,
+                "StartTime": now, "EndTime": now}]
+    return conversation_record("q", prompts, now, now, client_id=client)
+
+
+def accounting():
+    costs = CostAccounting(unit_tokens=1000)
+    costs.prices = PriceIndex([price_row(None, None, 1.0)])
+    costs._version, costs._checked_at = ("loaded",), float("inf")
+    return costs
+
+
+def test_spend_counts_only_stored_records(monkeypatch):
+    costs = accounting()
+    monkeypatch.setattr(conversationWriter, "cost_accounting", costs)
+
+    async def failing_insert(db, batch):
+        raise RuntimeError("database is locked")
+    monkeypatch.setattr(conversationWriter.crud, "insert_conversation_records", failing_insert)
+    monkeypatch.setattr(conversationWriter.crud, "insert_chats", lambda db, rows: asyncio.sleep(0, []))
+    writer = ConversationWriter(mode="inline")
+    asyncio.run(writer.submit(record("client-1")))
+    assert writer.stats["failed"] == 1
+    assert costs.spend.totals() == {}
+
+    async def ok_insert(db, batch):
+        return list(range(len(batch)))
+    monkeypatch.setattr(conversationWriter.crud, "insert_conversation_records", ok_insert)
+    asyncio.run(writer.submit(record("client-1")))
+    assert costs.spend.totals() == {"client-1": 3.0}
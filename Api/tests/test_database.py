@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from app.DB import crud, models
+from app.DB.database import AsyncSessionLocal, SessionLocal, get_async_db, pool_options, to_async_url
+
+
+@pytest.fixture(scope="module")
+def prompts(db_tables):
+    with SessionLocal() as db:
+        db.add(models.User(Id=601, Name="database-tests"))
+        db.add(models.PromptConfigurationsHistory(Id=601, name="DbTestPrompt", chatParameters='{"t": 1}', VersionNumber=1, UserId=601))
+        db.add(models.PromptConfigurationsHistory(Id=602, name="DbTestPrompt", chatParameters='{"t": 2}', VersionNumber=2, UserId=601))
+        db.add(models.PromptConfigurationsVersion(Id=601, name="DbTestPrompt", PromptHistoryId=602))
+        db.add(models.NavigationLinks(Id=601, name="DbTestLink", url="/entity/'entityId'", IsActive=True))
+        db.add(models.NavigationLinks(Id=602, name="DbTestInactive", url="/old", IsActive=False))
+        db.commit()
+
+
+def test_async_driver_is_derived_from_the_sync_url():
+    assert to_async_url("sqlite:///./chatbot.db") == "sqlite+aiosqlite:///./chatbot.db"
+    assert to_async_url("mssql+pyodbc://u:p@host/db?driver=x") == "mssql+aioodbc://u:p@host/db?driver=x"
+    assert to_async_url("postgresql://u@host/db") == "postgresql+asyncpg://u@host/db"
+    assert to_async_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+
+def test_pool_options():
+    assert pool_options("sqlite+aiosqlite:///:memory:") == {"pool_pre_ping": True}
+    options = pool_options("postgresql+asyncpg://u@host/db")
+    assert options["pool_pre_ping"] and {"pool_size", "max_overflow", "pool_timeout", "pool_recycle"} <= set(options)
+
+
+def test_hot_path_queries_run_on_the_async_session(prompts):
+    async def run():
+        async with AsyncSessionLocal() as db:
+            assert await crud.get_promptname_by_id(db, 601) == "DbTestPrompt"
+            assert (await crud.get_entity_search_system_prompt_by_id(db, 601)).chatParameters == '{"t": 2}'
+            assert (await crud.get_entity_search_system_prompt_by_id(db, 601, 1)).chatParameters == '{"t": 1}'
+            assert (await crud.get_active_prompt_by_name(db, "DbTestPrompt")).VersionNumber == 2
+            assert (await crud.get_navigation_by_name(db, "DbTestLink")).url == "/entity/'entityId'"
+            assert await crud.get_navigation_by_name(db, "DbTestInactive") is None
+    asyncio.run(run())
+
+
+def test_get_async_db_dependency_yields_and_closes_a_session(prompts):
+    async def run():
+        dependency = get_async_db()
+        db = await anext(dependency)
+        assert await crud.get_promptname_by_id(db, 601) == "DbTestPrompt"
+        with pytest.raises(StopAsyncIteration):
+            await anext(dependency)
+    asyncio.run(run())
@@ -0,0 +1,31 @@
+import asyncio
+import threading
+from app.Service.debugTraceStore import DebugTraceStore
+
+
+def test_traces_survive_a_restart(tmp_path):
+    store = DebugTraceStore(base_dir=str(tmp_path))
+    asyncio.run(store.start())
+    store.start_trace("first question", "s1")
+    store.append_response({"stage": "Chat"}, "s1")
+    store.close()
+
+    restarted = DebugTraceStore(base_dir=str(tmp_path))
+    asyncio.run(restarted.start())
+    assert restarted._loaded
+    trace = restarted.append_response({"stage": "Summary"}, "s1")
+    assert trace["userQuery"] == "first question"
+    assert [r["stage"] for r in trace["llmRequestResponse"]] == ["Chat", "Summary"]
+    restarted.close()
+
+
+def test_start_loads_off_the_event_loop(tmp_path, monkeypatch):
+    store = DebugTraceStore(base_dir=str(tmp_path))
+    load_threads = []
+    monkeypatch.setattr(store, "_load", lambda: load_threads.append(threading.get_ident()))
+
+    async def run():
+        await store.start()
+        return threading.get_ident()
+    loop_thread = asyncio.run(run())
+    assert load_threads and load_threads[0] != loop_thread
@@ -0,0 +1,27 @@
+import datetime
+from types import MappingProxyType
+import pytest
+from app.Utils import jsonCodec
+
+VALUES = [
+    {"a": 1, "b": [1.5, "x", None, True], "c": {"nested": "é"}},
+    {"nan": float("nan"), "inf": [float("inf"), float("-inf")], "ok": 2.0},
+    {"frozen": MappingProxyType({"k": (1, 2)})},
+    {"when": datetime.datetime(2024, 1, 2, 3, 4, 5, 6), "day": datetime.date(2024, 1, 2)},
+    {1: "int key"},
+]
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_stdlib_fallback_matches_orjson(value, monkeypatch):
+    if jsonCodec.orjson is None:
+        pytest.skip("orjson not installed")
+    expected = jsonCodec.dumps(value)
+    monkeypatch.setattr(jsonCodec, "orjson", None)
+    assert jsonCodec.dumps(value) == expected
+    assert jsonCodec.loads(expected) == jsonCodec.loads(jsonCodec.dumps(value))
+
+
+def test_non_finite_floats_become_null(monkeypatch):
+    monkeypatch.setattr(jsonCodec, "orjson", None)
+    assert jsonCodec.dumps([float("nan"), {"x": float("inf")}]) == "[null,{\"x\":null}]"
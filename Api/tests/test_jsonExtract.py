@@ -0,0 +1,92 @@
+import json
+import random
+from app.Utils.jsonExtract import iter_json_blocks
+
+STRINGS = ["", "plain", "brace } inside", "bracket ] [ {", 'quote " inside', "back\\slash", 'esc \\" mix',
+           "trailing backslash \\", "```not a fence```", "unicode é ☃", "tab\tnew\nline"]
+PROSE = ["Here is the answer:", "Sure!", "Result follows.", "Note: nothing else.", "", "ok", "thanks, let me know"]
+
+
+def random_value(rng, depth=0):
+    if depth >= 5 or (depth and rng.random() < 0.4):
+        return rng.choice([rng.choice(STRINGS), rng.randint(-99, 99), rng.random(), True, False, None])
+    if rng.random() < 0.5:
+        return {rng.choice(STRINGS) or "k": random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+    return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+
+
+def random_root(rng):
+    value = random_value(rng)
+    while not isinstance(value, (dict, list)):
+        value = random_value(rng)
+    return value
+
+
+def dump(rng, value):
+    return json.dumps(value, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5)
+
+
+def assert_well_formed(text, blocks):
+    # Every block is exactly what json.loads makes of its span; spans are ordered and don't overlap
+    last_end = 0
+    for block in blocks:
+        assert block.start >= last_end
+        assert block.value == json.loads(text[block.start:block.end])
+        last_end = block.end
+
+
+def test_random_documents_in_prose():
+    rng = random.Random(13)
+    for _ in range(500):
+        documents, parts, fenced = [], [], []
+        for _ in range(rng.randint(0, 4)):
+            document = random_root(rng)
+            documents.append(document)
+            parts.append(rng.choice(PROSE))
+            fence = rng.random() < 0.5
+            fenced.append(fence)
+            parts.append(f"```json\n{dump(rng, document)}\n```" if fence else dump(rng, document))
+        parts.append(rng.choice(PROSE))
+        text = "\n".join(parts)
+        blocks = list(iter_json_blocks(text))
+        assert [b.value for b in blocks] == documents
+        assert [b.fenced for b in blocks] == fenced
+        assert_well_formed(text, blocks)
+
+
+def test_braces_in_prose_are_skipped():
+    text = 'Use {curly braces} or [brackets] freely. {"answer": "{not prose}", "list": [1, 2]} done {'
+    assert [b.value for b in iter_json_blocks(text)] == [{"answer": "{not prose}", "list": [1, 2]}]
+
+
+def test_nested_valid_blocks_inside_invalid_span():
+    text = '{ prose {"a": 1} more prose [2, 3] }'
+    assert [b.value for b in iter_json_blocks(text)] == [{"a": 1}, [2, 3]]
+
+
+def test_truncated_input():
+    rng = random.Random(7)
+    for _ in range(300):
+        document = random_root(rng)
+        text = rng.choice(PROSE) + " " + dump(rng, document)
+        cut = text[:rng.randint(0, len(text))]
+        blocks = list(iter_json_blocks(cut))
+        assert_well_formed(cut, blocks)
+        if cut == text:
+            assert blocks[-1].value == document
+
+
+def test_random_structural_noise_never_raises():
+    rng = random.Random(21)
+    alphabet = '{}[]"\\`:, a1'
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        assert_well_formed(text, list(iter_json_blocks(text)))
+
+
+def test_deep_nesting_does_not_recurse():
+    depth = 100000
+    text = "[" * depth + "]" * depth
+    blocks = list(iter_json_blocks(text))
+    # Matched iteratively; whether the parser accepts this depth, the scan itself must not overflow
+    assert all(b.start >= 0 and b.end <= len(text) for b in blocks)
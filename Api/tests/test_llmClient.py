@@ -0,0 +1,52 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from app.Service import llmClient
+
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+
+def test_slow_call_times_out_with_504(monkeypatch):
+    async def create(**kwargs):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(llmClient.llm_router, "create", create)
+
+    async def run():
+        with pytest.raises(HTTPException) as raised:
+            await llmClient.create_chat_completion(timeout=0.05, model="m", messages=[{"role": "user", "content": "slow"}])
+        assert raised.value.status_code == 504
+        assert llmClient.llm_semaphore.in_flight() == 0
+    asyncio.run(run())
+
+
+def test_disconnected_client_cancels_the_call(monkeypatch):
+    monkeypatch.setattr(llmClient, "DISCONNECT_POLL_INTERVAL", 0.01)
+
+    class Request:
+        def __init__(self):
+            self.polls = 0
+
+        async def is_disconnected(self):
+            self.polls += 1
+            return self.polls > 2
+
+    async def run():
+        gone = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                gone.set()
+                raise
+
+        with pytest.raises(HTTPException) as raised:
+            await llmClient.run_until_disconnected(Request(), work())
+        assert raised.value.status_code == 499
+        await asyncio.wait_for(gone.wait(), 1)
+        assert await llmClient.run_until_disconnected(None, asyncio.sleep(0, result="done")) == "done"
+    asyncio.run(run())
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import time
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI
+from app.Service.llmRouter import ConcurrencyLimit, Deployment, LLMRouter, NoHealthyDeploymentError, parse_duration, retry_after
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class StubServer:
+    """OpenAI-compatible endpoint served in-process through an httpx transport."""
+
+    def __init__(self, name, status=200, headers=None):
+        self.name = name
+        self.status = status
+        self.headers = headers or {}
+        self.calls = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        body = json.loads(request.content)
+        if self.status != 200:
+            return httpx.Response(self.status, headers=self.headers, json={"error": {"message": f"{self.name} says no"}})
+        if body.get("stream"):
+            chunks = "".join(
+                "data: " + json.dumps({"id": "s", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                                       "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}) + "\n\n"
+                for word in (self.name, " streamed"))
+            return httpx.Response(200, headers={"content-type": "text/event-stream", **self.headers},
+                                  content=chunks + "data: [DONE]\n\n")
+        return httpx.Response(200, headers=self.headers, json={
+            "id": "s", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.name}, "finish_reason": "stop"}]})
+
+
+def deployment(server, **kwargs):
+    client = AsyncOpenAI(base_url=f"http://{server.name}/v1", api_key="test", max_retries=0,
+                         http_client=httpx.AsyncClient(transport=httpx.MockTransport(server)))
+    return Deployment(server.name, client, **kwargs)
+
+
+def router(*deployments, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    return LLMRouter({"m": list(deployments)}, default=deployments[0], **kwargs)
+
+
+async def reply(llm_router):
+    return (await llm_router.create(model="m", messages=MESSAGES)).choices[0].message.content
+
+
+def test_rate_limit_headers_are_parsed():
+    assert parse_duration("6m0s") == 360 and parse_duration("20ms") == 0.02 and parse_duration("1.5") == 1.5
+    assert parse_duration("soon") is None and parse_duration(None) is None
+    assert retry_after(httpx.Headers({"retry-after-ms": "250", "retry-after": "9"})) == 0.25
+    assert retry_after(httpx.Headers({"retry-after": "2"})) == 2
+
+
+def test_server_error_fails_over_to_the_next_deployment():
+    failing, healthy = StubServer("failing", 503), StubServer("healthy")
+
+    async def run():
+        primary, secondary = deployment(failing), deployment(healthy)
+        # Equal load: the first deployment of the pool is picked first
+        assert await reply(router(primary, secondary)) == "healthy"
+        return primary, secondary
+
+    primary, secondary = asyncio.run(run())
+    assert (failing.calls, healthy.calls) == (1, 1)
+    assert primary.stats["failures"] == 1 and primary.circuit == "closed"
+    assert primary.in_flight == secondary.in_flight == 0
+
+
+def test_rate_limited_deployment_is_retried_after_retry_after():
+    server = StubServer("only", 429, {"retry-after-ms": "100"})
+
+    async def run():
+        only = deployment(server)
+        llm_router = router(only)
+        pending = asyncio.create_task(reply(llm_router))
+        await asyncio.sleep(0.02)
+        # The 429 parks the deployment without counting a failure
+        assert server.calls == 1 and not only.available(time.monotonic()) and only.failures == 0
+        server.status = 200
+        started = time.monotonic()
+        assert await pending == "only"
+        return only, time.monotonic() - started
+
+    only, waited = asyncio.run(run())
+    assert server.calls == 2 and only.stats["throttled"] == 1
+    assert waited >= 0.05
+
+
+def test_client_errors_are_not_retried():
+    bad, other = StubServer("bad", 400), StubServer("other")
+
+    async def run():
+        first = deployment(bad)
+        with pytest.raises(openai.BadRequestError):
+            await reply(router(first, deployment(other)))
+        return first
+
+    first = asyncio.run(run())
+    assert (bad.calls, other.calls) == (1, 0)
+    assert first.failures == 0 and first.in_flight == 0
+
+
+def test_circuit_opens_after_repeated_failures_and_probes_after_cooldown():
+    server = StubServer("flaky", 500)
+
+    async def run():
+        flaky = deployment(server, failure_threshold=2, cooldown=0.1)
+        llm_router = router(flaky, max_attempts=1)
+        for _ in range(2):
+            with pytest.raises(openai.InternalServerError):
+                await reply(llm_router)
+        assert flaky.circuit == "open" and flaky.stats["circuit_opened"] == 1
+        # Open circuit: fail fast without reaching the endpoint
+        with pytest.raises(NoHealthyDeploymentError):
+            await reply(llm_router)
+        assert server.calls == 2
+        await asyncio.sleep(0.12)
+        assert flaky.circuit == "half_open"
+        server.status = 200
+        assert await reply(llm_router) == "flaky"
+        return flaky
+
+    flaky = asyncio.run(run())
+    assert flaky.circuit == "closed" and server.calls == 3
+
+
+def test_stream_fails_over_before_the_first_chunk():
+    failing, healthy = StubServer("failing", 502), StubServer("healthy")
+
+    async def run():
+        llm_router = router(deployment(failing), deployment(healthy))
+        return "".join([chunk.choices[0].delta.content async for chunk in llm_router.stream(model="m", messages=MESSAGES)])
+
+    assert asyncio.run(run()) == "healthy streamed"
+    assert (failing.calls, healthy.calls) == (1, 1)
+
+
+def test_quota_strategy_prefers_the_deployment_with_more_quota_left():
+    limits = {"x-ratelimit-limit-requests": "100", "x-ratelimit-reset-requests": "1m"}
+    low = StubServer("low", headers={**limits, "x-ratelimit-remaining-requests": "5"})
+    high = StubServer("high", headers={**limits, "x-ratelimit-remaining-requests": "90"})
+
+    async def run():
+        llm_router = router(deployment(low), deployment(high), strategy="quota")
+        # The first two calls learn each deployment's quota from the response headers
+        await reply(llm_router)
+        await reply(llm_router)
+        return [await reply(llm_router) for _ in range(5)]
+
+    assert asyncio.run(run()) == ["high"] * 5
+
+
+class SlowServer(StubServer):
+    """StubServer that takes 20 ms per request and records how many overlap."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.running = self.peak = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.02)
+        self.running -= 1
+        return super().__call__(request)
+
+
+def test_concurrent_attempts_are_bounded_by_the_limit():
+    server = SlowServer("busy")
+
+    async def run():
+        llm_router = router(deployment(server), limit=ConcurrencyLimit(3))
+        replies = await asyncio.gather(*(reply(llm_router) for _ in range(12)))
+        return replies, llm_router.limit.in_flight()
+
+    replies, in_flight = asyncio.run(run())
+    # The calls overlapped, up to the limit and no further
+    assert replies == ["busy"] * 12 and server.peak == 3 and in_flight == 0
+
+
+def test_backoff_does_not_hold_a_concurrency_slot():
+    throttled, healthy = StubServer("throttled", 429, {"retry-after-ms": "300"}), StubServer("healthy")
+
+    async def run():
+        waiting, other = deployment(throttled), deployment(healthy)
+        llm_router = LLMRouter({"m": [waiting], "n": [other]}, default=waiting, limit=ConcurrencyLimit(1))
+        pending = asyncio.create_task(reply(llm_router))
+        await asyncio.sleep(0.05)
+        # The 429'd call is waiting out Retry-After with the only slot free
+        assert throttled.calls == 1 and llm_router.limit.in_flight() == 0
+        started = time.monotonic()
+        other_reply = (await llm_router.create(model="n", messages=MESSAGES)).choices[0].message.content
+        served_in = time.monotonic() - started
+        throttled.status = 200
+        return other_reply, served_in, await pending, llm_router.limit.in_flight()
+
+    other_reply, served_in, first_reply, in_flight = asyncio.run(run())
+    assert other_reply == "healthy" and served_in < 0.2
+    assert first_reply == "throttled" and throttled.calls == 2 and in_flight == 0
+
+
+def test_stream_holds_its_slot_until_closed():
+    async def run():
+        llm_router = router(deployment(StubServer("streamer")), limit=ConcurrencyLimit(2))
+        chunks = llm_router.stream(model="m", messages=MESSAGES)
+        await anext(chunks)
+        held = llm_router.limit.in_flight()
+        await chunks.aclose()
+        return held, llm_router.limit.in_flight()
+
+    assert asyncio.run(run()) == (1, 0)
@@ -0,0 +1,49 @@
+import json
+import logging
+from app.Utils.logConfig import REDACTED, JsonFormatter, TextFormatter, bind_log_context, _ContextFilter
+
+
+def _record(message, extra=None, payload=None):
+    record = logging.LogRecord("chatbot", logging.INFO, __file__, 1, message, (), None)
+    for key, value in (extra or {}).items():
+        setattr(record, key, value)
+    if payload is not None:
+        record.payload = payload
+    _ContextFilter().filter(record)
+    return record
+
+
+def test_json_formatter_masks_message_and_payload():
+    record = _record("calling with sk-abcdefghijkl", payload={"api_key": "k", "messages": ["Bearer abc.def"]})
+    entry = json.loads(JsonFormatter().format(record))
+    assert "sk-abcdefghijkl" not in entry["message"]
+    assert REDACTED in entry["message"]
+    assert "abc.def" not in entry["payload"]
+    assert '"api_key":"***"' in entry["payload"]
+
+
+def test_json_formatter_masks_extra_fields():
+    record = _record("upstream call", extra={
+        "token": "plain-token-value",
+        "upstream": "key sk-abcdefghijkl",
+        "headers": {"Authorization": "Bearer abc.def", "accept": "json"},
+        "attempts": [{"password": "hunter2"}, "sk-zyxwvutsrqpo"],
+        "status": 200,
+    })
+    text = JsonFormatter().format(record)
+    entry = json.loads(text)
+    for secret in ("plain-token-value", "sk-abcdefghijkl", "abc.def", "hunter2", "sk-zyxwvutsrqpo"):
+        assert secret not in text
+    assert entry["token"] == REDACTED
+    assert entry["upstream"] == f"key {REDACTED}"
+    assert entry["headers"] == {"Authorization": REDACTED, "accept": "json"}
+    assert entry["attempts"] == [{"password": REDACTED}, REDACTED]
+    assert entry["status"] == 200
+
+
+def test_context_fields_are_attached():
+    bind_log_context(session_id="s1")
+    entry = json.loads(JsonFormatter().format(_record("hello")))
+    assert entry["session_id"] == "s1"
+    line = TextFormatter().format(_record("hello sk-abcdefghijkl"))
+    assert "session_id=s1" in line and "sk-abcdefghijkl" not in line
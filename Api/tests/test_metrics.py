@@ -0,0 +1,86 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+import pytest
+from app.Service.llmRouter import ConcurrencyLimit
+from app.Utils.metrics import CallbackMetric, Counter, Histogram, Registry, _Metric
+from app.Utils.utils import format_duration, format_timestamp, time_async_function
+
+
+def test_metric_base_is_abstract():
+    with pytest.raises(TypeError):
+        _Metric("x", "doc", registry=Registry())
+
+
+def test_render_exposition_format():
+    registry = Registry()
+    counter = Counter("requests_total", "Requests", ["endpoint"], registry=registry)
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1), registry=registry)
+    CallbackMetric("queue_depth", "Queue", lambda: 3, registry=registry)
+    counter.labels('/chat "x"').inc(2)
+    histogram.observe(0.5)
+    text = registry.render()
+    assert 'requests_total{endpoint="/chat \\"x\\""} 2.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "latency_seconds_count 1" in text
+    assert "queue_depth 3.0" in text
+    assert "# TYPE requests_total counter" in text
+
+
+def test_callback_metric_has_no_children():
+    metric = CallbackMetric("value", "Value", lambda: 1, registry=Registry())
+    with pytest.raises(TypeError):
+        metric.labels()
+
+
+def test_concurrency_limit_counts_holders():
+    async def run():
+        limit = ConcurrencyLimit(2)
+        release = asyncio.Event()
+        seen = []
+
+        async def hold():
+            async with limit:
+                seen.append(limit.in_flight())
+                await release.wait()
+        tasks = [asyncio.create_task(hold()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        in_flight = limit.in_flight()
+        release.set()
+        await asyncio.gather(*tasks)
+        return in_flight, limit.in_flight(), seen
+    in_flight, after, seen = asyncio.run(run())
+    assert in_flight == 2 and after == 0 and max(seen) == 2
+
+
+def test_debug_stamps_match_the_datetime_formats():
+    now = time.time()
+    assert abs(datetime.fromisoformat(format_timestamp(now)).timestamp() - now) < 2e-6
+    assert format_timestamp(1_700_000_000.25) == datetime.fromtimestamp(1_700_000_000.25).isoformat()
+    for seconds in (0.0, 0.25, 1.5, 59.75, 3725.5, 86399.0):
+        expected = str(timedelta(seconds=seconds))
+        assert format_duration(seconds) == (expected if "." in expected else expected + ".000000")
+
+
+def test_time_async_function_stays_within_its_budget():
+    """At most 5 us over a bare await, stamps and histogram included (best of five runs)."""
+    async def bare():
+        return {}
+
+    async def per_call(instrumented, calls=20_000):
+        started = time.perf_counter()
+        for _ in range(calls):
+            if instrumented:
+                await time_async_function(bare)
+            else:
+                await bare()
+        return (time.perf_counter() - started) / calls
+
+    async def overhead():
+        result = await time_async_function(bare)
+        assert set(result) == {"start_time", "end_time", "time_taken"}
+        return min([await per_call(True) - await per_call(False) for _ in range(5)])
+
+    assert asyncio.run(overhead()) < 5e-6
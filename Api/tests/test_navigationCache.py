@@ -0,0 +1,156 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from app.Service.navigationCache import NavigationLink, parse_entity_types
+from app.Utils import utils
+from app.Utils.chatUtils import get_warning_context, set_warning_context
+
+
+def link(supported, name="Launch Workflow"):
+    return NavigationLink.from_row(SimpleNamespace(
+        Id=1, name=name, url=None, responseText=None, type=None, EntityTypeSupported=supported,
+        RequiredId=None, Description=None, UpdatedAt=None
+    ))
+
+
+def entity(name, entity_type, key="entityType"):
+    return {"entityName": name, key: entity_type}
+
+
+def process(nav_link, data, monkeypatch):
+    class Cache:
+        async def get(self, db, name):
+            return nav_link
+
+    monkeypatch.setattr(utils, "navigation_cache", Cache())
+
+    async def run():
+        set_warning_context(None)
+        filtered, heading = await utils.process_nav_results_entity_specific(None, nav_link.name, data)
+        warning = get_warning_context()
+        return filtered, heading, warning["warning"] if warning else None
+    return asyncio.run(run())
+
+
+def test_parse_entity_types():
+    assert parse_entity_types("Affiliate, Fund ,Investor") == {"Affiliate", "Fund", "Investor"}
+    assert parse_entity_types("") is None and parse_entity_types(None) is None
+
+
+def test_partition_counts_removed_types_in_first_seen_order():
+    data = [entity("A", "Deal"), entity("B", "Fund", "Entity Type"), entity("C", "Other"), entity("D", "Deal"),
+            entity("E", None), {"entityName": "F"}]
+    kept, removed = link("Fund, Investor").partition_entities(data)
+    assert [e["entityName"] for e in kept] == ["B"]
+    assert list(removed.items()) == [("Deal", 2), ("Other", 1)]
+
+
+def test_link_without_supported_types_keeps_everything():
+    data = [entity("A", "Deal"), entity("B", None)]
+    assert link(None).partition_entities(data) == (data, {})
+
+
+def test_mixed_types(monkeypatch):
+    data = [entity("A", "Fund"), entity("B", "Deal"), entity("C", "Investor", "Entity Type"), entity("D", "Other")]
+    filtered, heading, warning = process(link("Fund, Investor"), data, monkeypatch)
+    assert [e["entityName"] for e in filtered] == ["A", "C"]
+    assert heading == "Launch Workflow for 'A', 'C'"
+    assert warning == ("Launch Workflow for Deal and Non-Affiliate are not possible and have been removed from the query."
+                       "\nClick the entity name to launch the Launch Workflow")
+
+
+def test_other_is_named_non_affiliate(monkeypatch):
+    _, _, warning = process(link("Fund"), [entity("A", "Other"), entity("B", "Fund")], monkeypatch)
+    assert warning.startswith("Launch Workflow for Non-Affiliate are not possible")
+
+
+def test_removed_types_follow_first_seen_order(monkeypatch):
+    data = [entity("A", "Investor"), entity("B", "Deal"), entity("C", "Investor"), entity("D", "Company")]
+    _, _, warning = process(link("Fund"), data, monkeypatch)
+    assert warning.startswith("Launch Workflow for Investor and Deal and Company are not possible")
+
+
+def test_all_supported_has_no_warning(monkeypatch):
+    data = [entity("A", "Fund"), entity("B", "Investor")]
+    filtered, heading, warning = process(link("Fund, Investor"), data, monkeypatch)
+    assert filtered == data and heading == "Launch Workflow for 'A', 'B'" and warning is None
+
+
+def test_all_removed_has_no_heading_or_click_hint(monkeypatch):
+    filtered, heading, warning = process(link("Fund"), [entity("A", "Deal"), entity("B", "Other")], monkeypatch)
+    assert filtered == [] and heading is None
+    assert warning == "Launch Workflow for Deal and Non-Affiliate are not possible and have been removed from the query."
+
+
+def test_only_untyped_entities_removed_gives_no_warning(monkeypatch):
+    filtered, heading, warning = process(link("Fund"), [entity("A", "Fund"), {"entityName": "B"}], monkeypatch)
+    assert [e["entityName"] for e in filtered] == ["A"]
+    assert heading == "Launch Workflow for 'A'" and warning is None
+
+
+@pytest.fixture(scope="module")
+def links(db_tables):
+    from app.DB import models
+    from app.DB.database import SessionLocal
+    with SessionLocal() as db:
+        db.add_all([models.NavigationLinks(Id=701, name="NavTestA", url="/a", IsActive=True),
+                    models.NavigationLinks(Id=702, name="NavTestB", url="/b", IsActive=True),
+                    models.NavigationLinks(Id=703, name="NavTestOff", url="/off", IsActive=False)])
+        db.commit()
+
+
+@pytest.fixture
+def statements():
+    from sqlalchemy import event
+    from app.DB.database import async_engine
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def test_cache_resolves_many_names_with_one_version_check_and_reloads_on_change(links, statements):
+    from app.DB import models
+    from app.DB.database import AsyncSessionLocal, SessionLocal
+    from app.Service.navigationCache import NavigationCache
+
+    cache = NavigationCache(check_interval=60)
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            first = await cache.get_many(db, ["NavTestA", "NavTestB", "NavTestOff", "NavTestMissing"])
+            loaded = len(statements)
+            second = await cache.get_many(db, ["NavTestA", "NavTestB"])
+            cached = len(statements) - loaded
+            with SessionLocal() as sync_db:
+                sync_db.add(models.NavigationLinks(Id=704, name="NavTestC", url="/c", IsActive=True))
+                sync_db.commit()
+            cache.invalidate()
+            third = await cache.get(db, "NavTestC")
+            return first, second, cached, third
+
+    first, second, cached, third = asyncio.run(run())
+    assert sorted(first) == ["NavTestA", "NavTestB"] and first["NavTestA"].url == "/a"
+    assert sorted(second) == ["NavTestA", "NavTestB"] and cached == 0
+    assert third is not None and third.url == "/c"
+    assert cache.stats["reloads"] == 2
+
+
+def test_disabled_snapshot_uses_one_in_query_per_call(links, statements):
+    from app.DB.database import AsyncSessionLocal
+    from app.Service.navigationCache import NavigationCache
+
+    cache = NavigationCache(check_interval=0)
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            await cache.get(db, "warm-up")
+            del statements[:]
+            return await cache.get_many(db, ["NavTestA", "NavTestB", "NavTestOff"])
+
+    found = asyncio.run(run())
+    assert sorted(found) == ["NavTestA", "NavTestB"]
+    assert len(statements) == 1 and " IN " in statements[0]
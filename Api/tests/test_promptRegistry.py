@@ -0,0 +1,65 @@
+import asyncio
+import time
+from types import MappingProxyType
+from app.Service.promptRegistry import PromptEntry, PromptRegistry, PromptSnapshot, PromptTemplate
+from app.Utils import utils
+
+
+def entry(name, version, parameters):
+    return PromptEntry(id=7, name=name, version=version, history_id=version, model="gpt-4o-mini",
+                       template=PromptTemplate("Answer for {role}"), chat_parameters=parameters, configurations=None,
+                       role_access=None, is_reading_cache=True, is_writing_cache=True)
+
+
+def registry_with(*entries):
+    registry = PromptRegistry()
+    registry._snapshot = PromptSnapshot(
+        by_name=MappingProxyType({e.name: e for e in entries}),
+        names_by_id=MappingProxyType({7: "LLM0"}),
+        by_version=MappingProxyType({(e.name, e.version): e for e in entries}),
+    )
+    # Skip the miss re-check, which would query the database
+    registry._checked_at = time.monotonic() + 3600
+    return registry
+
+
+def debug_data(version):
+    return {"promptId": 7, "promptVersion": version, "modelUsed": "gpt-4o-mini", "assistantMessage": "reply"}
+
+
+def test_template_keeps_json_braces_literal():
+    assert PromptTemplate('Reply like {"a": 1} for {role}').render({"role": "admin"}) == 'Reply like {"a": 1} for admin'
+
+
+def test_snapshot_lookups():
+    snapshot = registry_with(entry("LLM0", 2, {"temperature": 0.2})).current()
+    assert snapshot.get_name(7) == "LLM0" and snapshot.get_name("7") == "LLM0"
+    assert snapshot.get_name(8) is None and snapshot.get_name("x") is None
+    assert snapshot.get_by_id(7).version == 2
+    assert snapshot.get_by_id(7, 2).version == 2
+    assert snapshot.get_by_id(7, 1) is None
+
+
+def test_debug_response_names_the_prompt_whatever_its_version(monkeypatch):
+    monkeypatch.setattr(utils, "prompt_registry", registry_with(entry("LLM0", 2, {"temperature": 0.2})))
+
+    async def run():
+        known = await utils.storeApiDebugResponse(None, debugData=debug_data(2))
+        assert known["prompt_name"] == "LLM0"
+        assert known["prompt_parameters"] == {"temperature": 0.2}
+        # A version the registry no longer has: the name still resolves, only the parameters are unknown
+        unknown = await utils.storeApiDebugResponse(None, debugData=debug_data(1))
+        assert unknown["prompt_name"] == "LLM0"
+        assert unknown["prompt_version"] == 1
+        assert unknown["prompt_parameters"] == ""
+    asyncio.run(run())
+
+
+def test_registry_get_name_is_served_from_the_snapshot():
+    registry = registry_with(entry("LLM0", 2, None))
+
+    async def run():
+        assert await registry.get_name(7) == "LLM0"
+        assert await registry.get_name(99) is None
+    asyncio.run(run())
+    assert registry.stats["checks"] == 0
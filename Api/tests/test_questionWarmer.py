@@ -0,0 +1,121 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import delete, update
+from app.DB import models
+from app.DB.database import SessionLocal, async_engine
+from app.Service import questionWarmer
+from app.Service.questionWarmer import QuestionWarmer
+
+PROMPT = "WarmTestChat"
+
+
+@pytest.fixture
+def questions(db_tables):
+    """Questions 801-803 and the WarmTestChat prompt at version 1, reset for every test."""
+    with SessionLocal() as db:
+        db.execute(delete(models.Question).where(models.Question.Id.between(800, 899)))
+        db.execute(delete(models.PromptConfigurationsVersion).where(models.PromptConfigurationsVersion.Id == 801))
+        db.execute(delete(models.PromptConfigurationsHistory).where(models.PromptConfigurationsHistory.Id.in_([801, 802])))
+        if db.get(models.User, 801) is None:
+            db.add(models.User(Id=801, Name="warmer-tests"))
+        db.add(models.PromptConfigurationsHistory(Id=801, name=PROMPT, VersionNumber=1, UserId=801))
+        db.add(models.PromptConfigurationsVersion(Id=801, name=PROMPT, PromptHistoryId=801))
+        db.add_all([
+            models.Question(Id=801, Question="What is my  portfolio?", Platform="Web", UserRole="Analyst", Active=True),
+            models.Question(Id=802, Question="Show open tasks", Active=True),
+            models.Question(Id=803, Question="Retired question", Active=False),
+        ])
+        db.commit()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Stands in for the chat completion; `fail` makes every call raise."""
+    calls = SimpleNamespace(asked=[], fail=False)
+
+    async def create_chat_completion(**kwargs):
+        text = kwargs["messages"][-1]["content"]
+        calls.asked.append(text)
+        if calls.fail:
+            raise RuntimeError("LLM down")
+        reply = f"answer {len(calls.asked)} to {text}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+    monkeypatch.setattr(questionWarmer, "create_chat_completion", create_chat_completion)
+    return calls
+
+
+def refresh(warmer, force=False):
+    async def run():
+        await warmer.refresh(force)
+        await async_engine.dispose()
+    asyncio.run(run())
+
+
+def test_answers_are_scoped_by_platform_and_role(questions, llm):
+    warmer = QuestionWarmer(prompt_name=PROMPT)
+    refresh(warmer)
+    assert sorted(llm.asked) == ["Show open tasks", "What is my  portfolio?"]
+    assert warmer.prompt_version == 1
+
+    assert warmer.peek("what is my portfolio?", "web", " analyst ").reply.endswith("What is my  portfolio?")
+    assert warmer.peek("What is my portfolio?").tier == "warm"
+    assert warmer.peek("What is my portfolio?", "mobile", "analyst") is None
+    assert warmer.peek("What is my portfolio?", "web", "admin") is None
+    assert warmer.peek("show open tasks", "mobile", "admin") is not None
+    assert warmer.peek("Retired question") is None and warmer.peek("Not a catalog question") is None
+
+
+def test_lookup_counts_hits_and_peek_does_not(questions, llm):
+    warmer = QuestionWarmer(prompt_name=PROMPT)
+    refresh(warmer)
+    for _ in range(3):
+        assert warmer.peek("Show open tasks") is not None
+    assert warmer.stats["hits"] == 0
+    assert warmer.lookup("Show open tasks") is not None
+    assert warmer.lookup("Not a catalog question") is None
+    assert warmer.stats["hits"] == 1
+
+
+def test_answers_of_an_older_prompt_version_are_not_served(questions, llm):
+    warmer = QuestionWarmer(prompt_name=PROMPT)
+    refresh(warmer)
+    with SessionLocal() as db:
+        db.add(models.PromptConfigurationsHistory(Id=802, name=PROMPT, VersionNumber=2, UserId=801))
+        db.execute(update(models.PromptConfigurationsVersion).where(models.PromptConfigurationsVersion.Id == 801)
+                   .values(PromptHistoryId=802))
+        db.commit()
+    # Re-warming under version 2 fails: the version 1 answers must not stand in
+    llm.fail = True
+    refresh(warmer)
+    assert warmer.prompt_version == 2 and warmer.stats["failed"] == 2
+    assert warmer.peek("Show open tasks") is None
+    assert warmer.metrics()["stale"] == 2
+
+    llm.fail = False
+    refresh(warmer)
+    assert len(llm.asked) == 6 and warmer.peek("Show open tasks") is not None
+    assert warmer.metrics()["warm"] == 2
+
+
+def test_answers_older_than_max_age_are_warmed_again(questions, llm):
+    warmer = QuestionWarmer(prompt_name=PROMPT, max_age=0.2)
+    refresh(warmer)
+    refresh(warmer)
+    assert len(llm.asked) == 2
+    asyncio.run(asyncio.sleep(0.25))
+    refresh(warmer)
+    assert len(llm.asked) == 4 and warmer.stats["warmed"] == 4
+
+
+def test_answers_of_removed_questions_are_dropped(questions, llm):
+    warmer = QuestionWarmer(prompt_name=PROMPT)
+    refresh(warmer)
+    with SessionLocal() as db:
+        db.execute(update(models.Question).where(models.Question.Id == 802).values(Active=False))
+        db.commit()
+    refresh(warmer, force=True)
+    assert warmer.peek("Show open tasks") is None
+    assert "show open tasks" not in warmer._answers
+    assert warmer.metrics()["questions"] == 1 and len(llm.asked) == 2
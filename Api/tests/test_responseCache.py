@@ -0,0 +1,44 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from app.Service import responseCache
+from app.Service.responseCache import CachePolicy, ResponseCache, VectorIndex
+
+POLICY = CachePolicy(read=True, write=True, prompt_version=1)
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, model, input):
+        self.calls += 1
+        # Same vector for every text of the same length: enough to exercise the semantic tier
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(input)), 1.0, 0.0])])
+
+
+def test_miss_then_store_embeds_once(monkeypatch):
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(responseCache, "aiClient", SimpleNamespace(embeddings=embeddings))
+
+    async def run():
+        cache = ResponseCache(semantic=True, similarity_threshold=0.99)
+        messages = [{"role": "user", "content": "What is the fund size?"}]
+        assert await cache.lookup(POLICY, "m", messages, {}) is None
+        await cache.store(POLICY, "m", messages, {}, "42")
+        assert embeddings.calls == 1
+        hit = await cache.lookup(POLICY, "m", [{"role": "user", "content": "What is the fund SIZE!"}], {})
+        assert hit is not None and hit.tier == "semantic" and hit.reply == "42"
+    asyncio.run(run())
+
+
+def test_search_skips_expired_best_match():
+    index = VectorIndex(10, ttl_seconds=60)
+    index.add("p", "stale", [1.0, 0.0], "old reply")
+    index.add("p", "live", [0.98, 0.2], "live reply")
+    # Expire only the best-scoring entry
+    expires, value = index._entries._entries["stale"]
+    index._entries._entries["stale"] = (time.monotonic() - 1, value)
+    found = index.search("p", [1.0, 0.0], threshold=0.9)
+    assert found is not None and found[0] == "live reply"
+    assert index.search("p", [1.0, 0.0], threshold=0.999) is None
@@ -0,0 +1,58 @@
+import random
+from app.Utils.rowMapper import get_row_mapper
+
+
+def reference_map(fields, result):
+    """The label_to_ids scan fetch_and_map_navigation used before the row mapper."""
+    label_to_ids = {}
+    for field in fields:
+        label = field['label']
+        field_id = field['id'].lower()
+        modified_label = f"{field_id.split('_')[0]}_{label}"
+        label_to_ids.setdefault(modified_label, []).append(field_id)
+    mapped_result = []
+    for item in result:
+        new_item = {}
+        for key, value in item.items():
+            mapped_key = key.lower()
+            if 'id' in mapped_key:
+                new_item[key] = value
+            else:
+                found_label = None
+                for label, ids in label_to_ids.items():
+                    if mapped_key in ids:
+                        found_label = label
+                        break
+                new_item[found_label if found_label else key] = value
+        mapped_result.append(new_item)
+    return mapped_result
+
+
+def check(fields, result):
+    assert get_row_mapper(fields).map_rows(result) == reference_map(fields, result)
+
+
+def test_duplicate_id_maps_to_first_label_in_schema():
+    fields = [{"id": "a_1", "label": "L"}, {"id": "a_2", "label": "M"}, {"id": "a_2", "label": "L"}]
+    result = [{"a_1": 1, "a_2": 2}]
+    assert get_row_mapper(fields).map_rows(result) == [{"a_L": 2}]
+    check(fields, result)
+
+
+def test_edge_cases():
+    check([], [{"x": 1}])
+    check([{"id": "a_x", "label": "X"}], [])
+    # Keys differing only in case land on the same label; keys containing "id" are kept
+    check([{"id": "a_x", "label": "X"}], [{"A_X": 1, "a_x": 2, "entityId": 3, "other": 4}])
+
+
+def test_random_schemas_match_reference():
+    rng = random.Random(9)
+    labels = ["Name", "Type", "Region", "Owner", "Status"]
+    for _ in range(300):
+        ids = [f"{rng.choice('abc')}_{rng.randint(0, 6)}" for _ in range(rng.randint(0, 12))]
+        fields = [{"id": rng.choice([i, i.upper()]), "label": rng.choice(labels)} for i in ids]
+        keys = ids + ["entityid", "unknown_key", "c_9"]
+        result = [{rng.choice([k, k.upper()]): n for n, k in enumerate(rng.sample(keys, rng.randint(0, len(keys))))}
+                  for _ in range(rng.randint(0, 4))]
+        check(fields, result)
@@ -0,0 +1,84 @@
+import asyncio
+import time
+import fakeredis.aioredis
+import pytest
+from app.Service.sessionStore import MemorySessionStore, RedisSessionStore, SQLiteSessionStore
+
+
+def test_memory_store_append_and_replace():
+    async def run():
+        store = MemorySessionStore()
+        await store.append("s", [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}])
+        await store.append("s", [{"role": "user", "content": "again"}])
+        assert [m["content"] for m in await store.get("s")] == ["hi", "hello", "again"]
+        await store.replace("s", [{"role": "system", "content": "summary"}])
+        assert list(await store.get("s")) == [{"role": "system", "content": "summary"}]
+        assert list(await store.get("unknown")) == []
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "redis"])
+def test_concurrent_turns_on_one_session_do_not_interleave(backend, tmp_path):
+    async def turn(store, i):
+        async with store.lock("s"):
+            await store.get("s")
+            await asyncio.sleep(0.001)
+            await store.append("s", [{"role": "user", "content": str(i)}, {"role": "assistant", "content": str(i)}])
+
+    async def run():
+        store = {
+            "memory": MemorySessionStore,
+            "sqlite": lambda: SQLiteSessionStore(str(tmp_path / "sessions.db")),
+            "redis": lambda: RedisSessionStore(fakeredis.aioredis.FakeRedis()),
+        }[backend]()
+        await asyncio.gather(*(turn(store, i) for i in range(30)))
+        history = list(await store.get("s"))
+        assert len(history) == 60
+        # Each turn's user and assistant messages stay adjacent
+        assert all(history[k]["content"] == history[k + 1]["content"] for k in range(0, 60, 2))
+        await store.delete("s")
+        assert list(await store.get("s")) == []
+    asyncio.run(run())
+
+
+def test_memory_store_stays_bounded():
+    async def run():
+        store = MemorySessionStore(max_sessions=100, ttl_seconds=3600)
+        for i in range(1000):
+            async with store.lock(f"s{i}"):
+                await store.append(f"s{i}", [{"role": "user", "content": "hello"}])
+        assert len(store) == 100
+        assert list(await store.get("s0")) == [] and len(await store.get("s999")) == 1
+        # Locks are dropped once no turn holds them
+        assert len(store._local_locks) == 0
+
+        short = MemorySessionStore(max_sessions=100, ttl_seconds=0.05)
+        await short.append("s", [{"role": "user", "content": "hello"}])
+        time.sleep(0.06)
+        assert list(await short.get("s")) == []
+    asyncio.run(run())
+
+
+def test_sqlite_lease_is_renewed_while_the_turn_runs(tmp_path):
+    async def run():
+        path = str(tmp_path / "sessions.db")
+        worker_a, worker_b = SQLiteSessionStore(path), SQLiteSessionStore(path)
+        worker_a.LEASE_SECONDS = 0.3
+        async with worker_a.lock("s"):
+            # Well past the lease; without renewal the other worker would take the session over
+            await asyncio.sleep(1.0)
+            assert not await worker_b._run(worker_b._try_lease, "s", "worker-b")
+        assert await worker_b._run(worker_b._try_lease, "s", "worker-b")
+    asyncio.run(run())
+
+
+def test_redis_lock_is_renewed_while_the_turn_runs():
+    async def run():
+        client = fakeredis.aioredis.FakeRedis()
+        store = RedisSessionStore(client)
+        store.LOCK_TIMEOUT = 0.3
+        async with store.lock("s"):
+            await asyncio.sleep(1.0)
+            assert await client.exists(store.LOCK_PREFIX + "s")
+        assert not await client.exists(store.LOCK_PREFIX + "s")
+    asyncio.run(run())
@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.Service import llmClient
+from app.Service.singleFlight import SingleFlight
+
+MESSAGES = [{"role": "user", "content": "What is my leave balance?"}]
+
+
+def _completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+
+def test_identical_concurrent_calls_make_one_upstream_call(monkeypatch):
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.05)
+        return _completion(f"reply {len(calls)}")
+
+    monkeypatch.setattr(llmClient.llm_router, "create", create)
+
+    async def run():
+        responses = await asyncio.gather(*(
+            llmClient.create_chat_completion(stage="LLM0", prompt_version=3, model="gpt-4o-mini",
+                                             messages=MESSAGES, temperature=0)
+            for _ in range(100)))
+        assert len(calls) == 1
+        assert {r.choices[0].message.content for r in responses} == {"reply 1"}
+        # A different prompt version determines a different output: its own call
+        await llmClient.create_chat_completion(stage="LLM0", prompt_version=4, model="gpt-4o-mini",
+                                               messages=MESSAGES, temperature=0)
+        assert len(calls) == 2
+    asyncio.run(run())
+
+
+def test_identical_concurrent_streams_make_one_upstream_call(monkeypatch):
+    calls = []
+
+    async def stream(**kwargs):
+        calls.append(kwargs)
+        for word in ("one ", "two ", "three"):
+            await asyncio.sleep(0.01)
+            yield _chunk(word)
+
+    monkeypatch.setattr(llmClient.llm_router, "stream", stream)
+
+    async def consume():
+        return "".join([chunk.choices[0].delta.content async for chunk in
+                        llmClient.stream_chat_completion(stage="Chat", model="gpt-4o-mini", messages=MESSAGES)])
+
+    async def run():
+        texts = await asyncio.gather(*(consume() for _ in range(100)))
+        assert len(calls) == 1
+        assert set(texts) == {"one two three"}
+    asyncio.run(run())
+
+
+def test_do_cancelling_some_waiters_does_not_fail_the_others():
+    async def run():
+        flights, started = SingleFlight(), []
+
+        async def work():
+            started.append(1)
+            await asyncio.sleep(0.05)
+            return "done"
+
+        tasks = [asyncio.create_task(flights.do("k", work)) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        tasks[0].cancel()
+        tasks[1].cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert [type(r) for r in results[:2]] == [asyncio.CancelledError] * 2
+        assert results[2:] == ["done", "done"]
+        assert len(started) == 1 and flights.in_flight() == 0
+    asyncio.run(run())
+
+
+def test_do_caller_arriving_after_the_last_waiter_left_starts_a_new_flight():
+    async def run():
+        flights, started = SingleFlight(), []
+
+        async def work():
+            started.append(1)
+            await asyncio.sleep(0.05)
+            return len(started)
+
+        abandoned = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0.01)
+        abandoned.cancel()
+        # One loop step: the waiter has left and cancelled the flight, which has not yet wound down
+        await asyncio.sleep(0)
+        assert await flights.do("k", work) == 2
+        with pytest.raises(asyncio.CancelledError):
+            await abandoned
+        assert flights.stats == {"calls": 2, "coalesced": 0}
+    asyncio.run(run())
+
+
+def test_stream_caller_arriving_after_the_last_waiter_left_starts_a_new_flight():
+    async def run():
+        flights, started = SingleFlight(), []
+
+        async def chunks():
+            started.append(1)
+            for i in range(3):
+                await asyncio.sleep(0.02)
+                yield f"{len(started)}.{i}"
+
+        async def consume():
+            return [chunk async for chunk in flights.stream("k", chunks)]
+
+        abandoned = asyncio.create_task(consume())
+        await asyncio.sleep(0.03)
+        abandoned.cancel()
+        await asyncio.sleep(0)
+        assert await consume() == ["2.0", "2.1", "2.2"]
+        with pytest.raises(asyncio.CancelledError):
+            await abandoned
+        assert flights.stats == {"calls": 2, "coalesced": 0}
+        assert flights.in_flight() == 0
+    asyncio.run(run())
@@ -0,0 +1,116 @@
+import asyncio
+import time
+import pytest
+from app.Service.stageGraph import Stage, StageFailed, StageGraph
+
+
+def sleeper(name, seconds, log=None):
+    async def run(**inputs):
+        if log is not None:
+            log.append((name, dict(inputs)))
+        await asyncio.sleep(seconds)
+        return name
+    return run
+
+
+async def fail(**inputs):
+    raise RuntimeError("service down")
+
+
+def test_independent_stages_overlap_and_receive_their_inputs():
+    log = []
+    graph = StageGraph([
+        Stage("a", sleeper("a", 0.2, log)),
+        Stage("b", sleeper("b", 0.2, log)),
+        Stage("c", sleeper("c", 0.05, log), ("a", "b", "seed")),
+    ], seeds=["seed"])
+
+    started = time.perf_counter()
+    results = asyncio.run(graph.run(seed=1))
+    elapsed = time.perf_counter() - started
+    # The critical path (a or b, then c) rather than the sum of the three
+    assert 0.25 <= elapsed < 0.4
+    assert {name: r.value for name, r in results.items()} == {"a": "a", "b": "b", "c": "c"}
+    assert log[-1] == ("c", {"a": "a", "b": "b", "seed": 1})
+    assert results["c"].started_at >= max(results["a"].ended_at, results["b"].ended_at)
+
+
+def test_optional_stage_failure_or_timeout_resolves_to_its_fallback():
+    async def reply(policy, cached):
+        return policy, cached
+
+    graph = StageGraph([
+        Stage("policy", sleeper("policy", 5), timeout=0.02, required=False, fallback="default"),
+        Stage("cached", fail, required=False),
+        Stage("reply", reply, ("policy", "cached")),
+    ])
+    results = asyncio.run(graph.run())
+    assert results["reply"].value == ("default", None)
+    assert isinstance(results["policy"].error, asyncio.TimeoutError) and not results["policy"].ok
+    assert isinstance(results["cached"].error, RuntimeError)
+
+
+def test_required_failure_cancels_siblings_and_skips_dependants():
+    cancelled = []
+
+    async def long(**inputs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    graph = StageGraph([
+        Stage("a", sleeper("a", 0)),
+        Stage("b", fail, ("a",)),
+        Stage("c", long),
+        Stage("d", sleeper("d", 0), ("b",)),
+    ])
+
+    async def run():
+        with pytest.raises(StageFailed) as raised:
+            await graph.run()
+        await asyncio.sleep(0)
+        return raised.value
+
+    failed = asyncio.run(run())
+    assert failed.stage == "b" and isinstance(failed.error, RuntimeError)
+    assert [name for name, r in failed.results.items() if r.ok] == ["a"]
+    assert "d" not in failed.results
+    assert cancelled == [True] and isinstance(failed.results["c"].error, asyncio.CancelledError)
+
+
+def test_cancelled_run_cancels_running_stages():
+    cancelled = []
+
+    async def long(**inputs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    graph = StageGraph([Stage("a", long), Stage("b", long)])
+
+    async def run():
+        task = asyncio.create_task(graph.run())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [True, True]
+
+
+def test_invalid_graphs_are_rejected_when_built():
+    ok = sleeper("ok", 0)
+    with pytest.raises(ValueError, match="depend on each other"):
+        StageGraph([Stage("x", ok, ("y",)), Stage("y", ok, ("x",))])
+    with pytest.raises(ValueError, match="unknown inputs"):
+        StageGraph([Stage("x", ok, ("nope",))])
+    with pytest.raises(ValueError, match="Duplicate"):
+        StageGraph([Stage("x", ok), Stage("x", ok)])
+    with pytest.raises(ValueError, match="Missing seed"):
+        asyncio.run(StageGraph([Stage("x", ok, ("seed",))], seeds=["seed"]).run())
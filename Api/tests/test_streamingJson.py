@@ -0,0 +1,63 @@
+import json
+import random
+import time
+from app.Utils.streamingJson import StreamingJsonParser
+
+
+def parse_in_chunks(text, sizes):
+    parser = StreamingJsonParser()
+    pos = 0
+    for size in sizes:
+        parser.feed(text[pos:pos + size])
+        pos += size
+    parser.feed(text[pos:])
+    return parser.close()
+
+
+def random_document(rng, depth=0):
+    kind = rng.choice(["obj", "arr"] if depth == 0 else ["obj", "arr", "str", "num", "lit", "lit"] if depth < 4 else ["str", "num", "lit"])
+    if kind == "obj":
+        return {f"k{i}": random_document(rng, depth + 1) for i in range(rng.randint(0, 4))}
+    if kind == "arr":
+        return [random_document(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    if kind == "str":
+        return rng.choice(["", "plain", 'quote " inside', "brace { [ ]", "back\\slash", "unicode é ☃", "line\nbreak"])
+    if kind == "num":
+        return rng.choice([0, -3, 17, 2.5, -0.125, 1e21])
+    return rng.choice([True, False, None])
+
+
+def test_chunked_parse_matches_json_loads():
+    rng = random.Random(12)
+    for _ in range(200):
+        document = random_document(rng)
+        text = "```json\n" + json.dumps(document, indent=rng.choice([None, 2])) + "\n```"
+        sizes = [rng.randint(1, 7) for _ in range(len(text))]
+        result = parse_in_chunks(text, sizes)
+        assert result.error is None and result.complete
+        assert result.value == document
+
+
+def test_literals_split_across_chunks():
+    text = '{"a": true, "b": false, "c": null}'
+    for cut in range(len(text)):
+        result = parse_in_chunks(text, [cut])
+        assert result.value == {"a": True, "b": False, "c": None}
+
+
+def test_invalid_literal_is_an_error():
+    result = parse_in_chunks('[nul]', [])
+    assert result.error is not None
+
+
+def test_literal_heavy_document_parses_in_linear_time():
+    def one_shot(count):
+        text = "[" + ",".join(["null"] * count) + "]"
+        started = time.perf_counter()
+        parser = StreamingJsonParser()
+        result = parser.feed(text)
+        assert result.complete and len(result.value) == count
+        return time.perf_counter() - started
+    small, large = min(one_shot(20000) for _ in range(3)), min(one_shot(80000) for _ in range(3))
+    # 4x the input; a quadratic scan would take ~16x
+    assert large < small * 8
@@ -1,6 +1,7 @@
 import { Injectable } from '@angular/core';
 import { environment as env } from '../../environments/environment';
 import { HttpClient, HttpHeaders } from '@angular/common/http';
+import { Observable } from 'rxjs';
 
 @Injectable({
   providedIn: 'root'
@@ -22,6 +23,46 @@ export class ApiService {
     );
   }
 
+  // Streams the bot reply as NDJSON deltas so the widget can render from the first token
+  chatStream(body: { user_message: string, session_id?: string | null }, baseUrl: string = env.BotApiServer.trim()): Observable<{ content: string, is_last: boolean, session_id?: string }> {
+    return new Observable(observer => {
+      const controller = new AbortController();
+      fetch(baseUrl + '/chat/stream?format=ndjson', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'application/x-ndjson' },
+        body: JSON.stringify(body),
+        signal: controller.signal
+      }).then(async response => {
+        // 4xx/5xx bodies are a JSON error, not a stream
+        if (!response.ok || !response.body) {
+          observer.error({ status: response.status, error: await response.text() });
+          return;
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          const lines = buffer.split('\n');
+          buffer = lines.pop()!;
+          for (const line of lines) {
+            if (!line.trim()) continue;
+            const event = JSON.parse(line);
+            if (event.event === 'error') {
+              observer.error(event.data);
+              return;
+            }
+            observer.next(event.data);
+          }
+        }
+        observer.complete();
+      }).catch(err => observer.error(err));
+      return () => controller.abort();
+    });
+  }
+
   // region(){
   //   let headers = new HttpHeaders({
   //     'Content-Type': 'application/json',
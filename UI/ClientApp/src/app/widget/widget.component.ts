@@ -1,8 +1,11 @@
 
 
-import { AfterViewInit, Component } from '@angular/core';
+import { AfterViewInit, Component, OnDestroy } from '@angular/core';
 import { Router } from '@angular/router';
 import { HttpClient } from '@angular/common/http';
+import { EMPTY, Subject, Subscription } from 'rxjs';
+import { catchError, debounceTime, distinctUntilChanged, switchMap } from 'rxjs/operators';
+import { ApiService } from '../services/api.service';
 
 interface ChatMessage {
   text: string;
@@ -10,9 +13,9 @@ interface ChatMessage {
   time: string;
 }
 
-interface ChatResponse {
+interface ChatPrefetchResponse {
   session_id: string;
-  reply: string;
+  status: string;
 }
 
 @Component({
@@ -20,11 +23,37 @@ interface ChatResponse {
   templateUrl: './widget.component.html',
   styleUrl: './widget.component.scss'
 })
-export class WidgetComponent{
+export class WidgetComponent implements OnDestroy{
  
- constructor(private http: HttpClient){
+ // Text typed so far; once the user pauses, the API starts computing the reply speculatively
+ private typing = new Subject<string>();
+ private prefetchSubscription: Subscription;
+ private readonly botApi = 'http://127.0.0.1:8000';
+
+ constructor(private http: HttpClient, private api: ApiService){
   console.log('Hello! WidgetComponent component has been loaded.');
+  this.prefetchSubscription = this.typing.pipe(
+    debounceTime(400),
+    distinctUntilChanged(),
+    switchMap(text => {
+      // The prefetch is kept under this session, so /chat/stream must send the same id
+      this.sessionId = this.sessionId || crypto.randomUUID();
+      return this.http.post<ChatPrefetchResponse>(this.botApi + '/chat/prefetch', {
+        user_message: text,
+        session_id: this.sessionId
+      }).pipe(catchError(() => EMPTY));
+    })
+  ).subscribe();
+ }
+
+ ngOnDestroy() {
+  this.prefetchSubscription.unsubscribe();
+ }
 
+ onInputChange(text: string) {
+  if (text.trim()) {
+    this.typing.next(text);
+  }
  }
 messages: ChatMessage[] = [
     {
@@ -51,30 +80,31 @@ messages: ChatMessage[] = [
       session_id: this.sessionId // send session id if available
     };
 
-    // Call FastAPI backend
-    this.http.post<ChatResponse>('http://127.0.0.1:8000/chat', payload).subscribe({
-      next: (response) => {
-        // Save session id (first time)
-        if (!this.sessionId) {
-          this.sessionId = response.session_id;
+    // Stream the reply so it renders from the first token
+    let botMessage: ChatMessage | null = null;
+    this.api.chatStream(payload, this.botApi).subscribe({
+      next: (frame) => {
+        if (frame.is_last) {
+          // Save session id (first time)
+          if (!this.sessionId && frame.session_id) {
+            this.sessionId = frame.session_id;
+          }
+          return;
         }
-
-        const botMessage: ChatMessage = {
-          text: response.reply,
-          sender: 'bot',
-          time: this.getCurrentTime()
-        };
-
-        this.messages.push(botMessage);
+        if (!botMessage) {
+          botMessage = { text: '', sender: 'bot', time: this.getCurrentTime() };
+          this.messages.push(botMessage);
+        }
+        botMessage.text += frame.content;
       },
       error: (err) => {
         console.error('Chat API error:', err);
-        const botMessage: ChatMessage = {
+        const errorMessage: ChatMessage = {
           text: "Oops! I couldn't reach the server. Please try again later.",
           sender: 'bot',
           time: this.getCurrentTime()
         };
-        this.messages.push(botMessage);
+        this.messages.push(errorMessage);
       }
     });
 